@@ -8,6 +8,7 @@ from .models import (
     ShoppingList,
     Tag,
 )
+from .shopping_list import apply_recipe_change, get_recipe_amounts
 
 
 @admin.register(Tag)
@@ -33,10 +34,18 @@ class RecipeAdmin(admin.ModelAdmin):
     list_display = ["id", "name", "author", "get_favorites_count"]
     search_fields = ["name", "author__username"]
     list_filter = ["tags"]
+    readonly_fields = ["favorites_count"]
     inlines = [RecipeIngredientInline]
 
+    def save_related(self, request, form, formsets, change):
+        recipe = form.instance
+        old_amounts = get_recipe_amounts([recipe.id])[recipe.id]
+        super().save_related(request, form, formsets, change)
+        if change:
+            apply_recipe_change(recipe.id, old_amounts)
+
     def get_favorites_count(self, obj):
-        return obj.favorited_by.count()
+        return obj.favorites_count
 
     get_favorites_count.short_description = "Количество добавлений в избранное"
 
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class FoodConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "food"
+
+    def ready(self):
+        from food import signals  # noqa: F401
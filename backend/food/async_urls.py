@@ -0,0 +1,33 @@
+from django.urls import path
+
+from food import async_views
+
+# Асинхронные версии читающих эндпоинтов; остальные методы и маршруты
+# обслуживает food.urls.
+urlpatterns = [
+    path(
+        "s/<str:short_hash>/",
+        async_views.redirect_short_link,
+        name="short_link",
+    ),
+    path("recipes/", async_views.recipe_list, name="recipe-list"),
+    path(
+        "recipes/<int:pk>/", async_views.recipe_detail, name="recipe-detail"
+    ),
+    path("tags/", async_views.catalog_view("tag-list"), name="tag-list"),
+    path(
+        "tags/<int:pk>/",
+        async_views.catalog_view("tag-detail"),
+        name="tag-detail",
+    ),
+    path(
+        "ingredients/",
+        async_views.catalog_view("ingredient-list"),
+        name="ingredient-list",
+    ),
+    path(
+        "ingredients/<int:pk>/",
+        async_views.catalog_view("ingredient-detail"),
+        name="ingredient-detail",
+    ),
+]
@@ -0,0 +1,157 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.db.models import aprefetch_related_objects
+from django.http import Http404, HttpResponse, HttpResponseNotModified
+from django.shortcuts import redirect
+from django.utils.cache import patch_vary_headers
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import APIException
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from food.catalog import catalog
+from food.models import get_recipe_prefetches
+from food.short_links import short_link_resolver
+from food.urls import router
+from food.views import (
+    RecipeViewSet,
+    catalog_response,
+    get_catalog_etag,
+    is_not_modified,
+)
+from users.authentication import get_signed_token_user
+
+# Синхронные представления роутера: им уходят запись, браузерный API и
+# все случаи, когда нужен ответ DRF об ошибке.
+SYNC_VIEWS = {pattern.name: pattern.callback for pattern in router.urls}
+
+
+def delegate(name, request, **kwargs):
+    return sync_to_async(SYNC_VIEWS[name])(request, **kwargs)
+
+
+def wants_json(request):
+    if request.method != "GET" or "format" in request.GET:
+        return False
+    accept = request.headers.get("Accept", "")
+    return "html" not in accept and "indent" not in accept
+
+
+async def authenticate(request):
+    # То же, что классы аутентификации DRF; None — пусть решает
+    # синхронное представление.
+    header = request.headers.get("Authorization", "").split()
+    if not header:
+        return AnonymousUser()
+    if len(header) == 2 and "." in header[1]:
+        return await sync_to_async(get_signed_token_user)(request)
+    if len(header) != 2 or header[0].lower() != "token":
+        return None
+    token = (
+        await Token.objects.select_related("user")
+        .filter(key=header[1])
+        .afirst()
+    )
+    if token is None or not token.user.is_active:
+        return None
+    return token.user
+
+
+def json_response(data, view):
+    response = HttpResponse(
+        JSONRenderer().render(data), content_type="application/json"
+    )
+    response["Allow"] = ", ".join(view.allowed_methods)
+    patch_vary_headers(response, ["Accept"])
+    return response
+
+
+async def get_view(request, action, **kwargs):
+    user = await authenticate(request)
+    if user is None:
+        return None
+    drf_request = Request(request)
+    drf_request.user = user
+    return RecipeViewSet(
+        request=drf_request,
+        args=(),
+        kwargs=kwargs,
+        format_kwarg=None,
+        action=action,
+        headers={},
+    )
+
+
+@csrf_exempt
+async def recipe_list(request):
+    view = await get_view(request, "list") if wants_json(request) else None
+    if view is None:
+        return await delegate("recipe-list", request)
+    queryset = view.filter_queryset(view.get_queryset())
+    try:
+        page = await view.paginator.apaginate_queryset(
+            queryset, view.request, view
+        )
+    except APIException:
+        return await delegate("recipe-list", request)
+    serializer = view.get_serializer(page, many=True)
+    return json_response(
+        view.paginator.get_paginated_response(serializer.data).data, view
+    )
+
+
+@csrf_exempt
+async def recipe_detail(request, pk):
+    view = (
+        await get_view(request, "retrieve", pk=pk)
+        if wants_json(request)
+        else None
+    )
+    if view is None:
+        return await delegate("recipe-detail", request, pk=pk)
+    instance = (
+        await view.get_queryset().prefetch_related(None).filter(pk=pk).afirst()
+    )
+    if instance is None:
+        return await delegate("recipe-detail", request, pk=pk)
+    view.check_object_permissions(view.request, instance)
+    await catalog.aget_version()
+    response = view.get_conditional_response(instance)
+    if response is None:
+        await aprefetch_related_objects([instance], *get_recipe_prefetches())
+        response = json_response(view.get_serializer(instance).data, view)
+    return view.set_cache_headers(response, instance)
+
+
+def catalog_view(name):
+    @csrf_exempt
+    async def view(request, **kwargs):
+        if not wants_json(request):
+            return await delegate(name, request, **kwargs)
+        version = await catalog.aget_version()
+        etag = get_catalog_etag(version)
+        if is_not_modified(request, etag):
+            return catalog_response(HttpResponseNotModified(), etag)
+        body = catalog.get_body(
+            version, (request.get_full_path(), "application/json")
+        )
+        if body is None:
+            # Первый запрос строит и кладёт тело в кэш синхронно.
+            return await delegate(name, request, **kwargs)
+        content, content_type = body
+        return catalog_response(
+            HttpResponse(content, content_type=content_type), etag
+        )
+
+    # Имя для метрик: tag_list, ingredient_detail и т. п.
+    view.__name__ = name.replace("-", "_")
+    return view
+
+
+async def redirect_short_link(request, short_hash):
+    recipe_id = await short_link_resolver.aresolve(short_hash)
+    if recipe_id is None:
+        raise Http404
+    return redirect(f"{settings.BASE_URL}recipes/{recipe_id}/")
@@ -0,0 +1,26 @@
+ALPHABET = "0123456789abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ"
+BASE = len(ALPHABET)
+DIGITS = {char: value for value, char in enumerate(ALPHABET)}
+
+
+def encode(number):
+    if number < 0:
+        raise ValueError("Нельзя закодировать отрицательное число")
+    code = []
+    while True:
+        number, digit = divmod(number, BASE)
+        code.append(ALPHABET[digit])
+        if not number:
+            return "".join(reversed(code))
+
+
+def decode(code):
+    if not code or (len(code) > 1 and code[0] == ALPHABET[0]):
+        raise ValueError(f"Некорректный код: {code!r}")
+    number = 0
+    for char in code:
+        try:
+            number = number * BASE + DIGITS[char]
+        except KeyError:
+            raise ValueError(f"Некорректный код: {code!r}")
+    return number
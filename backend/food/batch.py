@@ -0,0 +1,88 @@
+from django.conf import settings
+from django.db import connections, router
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+
+
+class BatchSerializer(serializers.Serializer):
+    add = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), default=list
+    )
+    remove = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), default=list
+    )
+
+    def validate(self, data):
+        ids = data["add"] + data["remove"]
+        if not ids:
+            raise ValidationError("Nothing to add or remove.")
+        if len(ids) > settings.BATCH_MAX_SIZE:
+            raise ValidationError(
+                f"Too many ids: {len(ids)}, "
+                f"maximum is {settings.BATCH_MAX_SIZE}."
+            )
+        if len(set(ids)) != len(ids):
+            raise ValidationError("Each id may appear only once.")
+        return data
+
+
+def plan_batch(add, remove, found, existing, forbidden=frozenset()):
+    # Возвращает результат по каждому id и списки id, которые нужно
+    # действительно добавить и удалить.
+    results, added, removed = [], [], []
+    for target_id in add:
+        if target_id not in found:
+            result = "not_found"
+        elif target_id in forbidden:
+            result = "forbidden"
+        elif target_id in existing:
+            result = "exists"
+        else:
+            result = "added"
+            added.append(target_id)
+        results.append({"id": target_id, "action": "add", "status": result})
+    for target_id in remove:
+        if target_id not in found:
+            result = "not_found"
+        elif target_id not in existing:
+            result = "absent"
+        else:
+            result = "removed"
+            removed.append(target_id)
+        results.append({"id": target_id, "action": "remove", "status": result})
+    return results, added, removed
+
+
+def get_batch(request):
+    serializer = BatchSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    add = serializer.validated_data["add"]
+    remove = serializer.validated_data["remove"]
+    return add, remove, add + remove
+
+
+def lock_user(user):
+    # Пачки одного пользователя применяются по очереди, иначе две
+    # параллельные могли бы вставить одну и ту же связь.
+    list(
+        type(user)
+        .objects.select_for_update()
+        .filter(pk=user.pk)
+        .values_list("pk", flat=True)
+    )
+
+
+def delete_rows(queryset):
+    # Удаление одним DELETE без сигналов pre_delete и post_delete: пакетные
+    # представления вызывают те же функции последствий, что и сигналы
+    # (favorites_deleted, subscriptions_deleted), один раз на всю пачку.
+    model = queryset.model
+    connection = connections[router.db_for_write(model)]
+    sql, params = queryset.values("pk").query.sql_with_params()
+    table = connection.ops.quote_name(model._meta.db_table)
+    column = connection.ops.quote_name(model._meta.pk.column)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {table} WHERE {column} IN ({sql})", params
+        )
+        return cursor.rowcount
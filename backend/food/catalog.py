@@ -0,0 +1,106 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+
+from food.models import CatalogVersion, Tag
+from foodgram.metrics import observe_cache
+
+CATALOG_VERSION_ID = 1
+
+
+class Catalog:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._checked_at = 0.0
+        self._bodies = OrderedDict()
+        self._tag_ids = None
+
+    def invalidate(self):
+        with self._lock:
+            self._version = None
+            self._bodies.clear()
+            self._tag_ids = None
+
+    def is_stale(self):
+        return (
+            self._version is None
+            or time.monotonic() - self._checked_at
+            > settings.CATALOG_VERSION_TTL
+        )
+
+    def set_version(self, version):
+        with self._lock:
+            if version != self._version:
+                self._bodies.clear()
+                self._tag_ids = None
+            self._version = version
+            self._checked_at = time.monotonic()
+
+    def get_version(self):
+        # Версия перечитывается из базы не чаще раза в
+        # CATALOG_VERSION_TTL секунд; свои изменения процесс видит сразу.
+        # Кэши заполняются из основной базы: реплика может отставать от
+        # версии, под которой сохраняются данные.
+        if self.is_stale():
+            version, _ = CatalogVersion.objects.using("default").get_or_create(
+                pk=CATALOG_VERSION_ID
+            )
+            self.set_version(version.version)
+        return self._version
+
+    async def aget_version(self):
+        if self.is_stale():
+            version, _ = await CatalogVersion.objects.using(
+                "default"
+            ).aget_or_create(pk=CATALOG_VERSION_ID)
+            self.set_version(version.version)
+        return self._version
+
+    def bump(self):
+        updated = CatalogVersion.objects.filter(pk=CATALOG_VERSION_ID).update(
+            version=F("version") + 1
+        )
+        if not updated:
+            CatalogVersion.objects.get_or_create(
+                pk=CATALOG_VERSION_ID, defaults={"version": 2}
+            )
+        self.invalidate()
+        transaction.on_commit(self.invalidate)
+
+    def get_body(self, version, key):
+        with self._lock:
+            body = None
+            if self._version == version and key in self._bodies:
+                self._bodies.move_to_end(key)
+                body = self._bodies[key]
+        observe_cache("catalog", body is not None)
+        return body
+
+    def set_body(self, version, key, body):
+        with self._lock:
+            if self._version != version:
+                return
+            self._bodies[key] = body
+            while len(self._bodies) > settings.CATALOG_CACHE_SIZE:
+                self._bodies.popitem(last=False)
+
+    def get_tag_ids(self):
+        # Множество id тегов для проверки рецептов, живёт до смены версии.
+        version = self.get_version()
+        tag_ids = self._tag_ids
+        if tag_ids is None:
+            tag_ids = frozenset(
+                Tag.objects.using("default").values_list("id", flat=True)
+            )
+            with self._lock:
+                if self._version == version:
+                    self._tag_ids = tag_ids
+        return tag_ids
+
+
+catalog = Catalog()
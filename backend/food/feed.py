@@ -0,0 +1,130 @@
+from django.conf import settings
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+
+from food.models import FeedEntry, Recipe
+from users.models import CustomUser, Subscription
+
+
+def fan_out_recipe(recipe):
+    # У автора сверх FEED_FANOUT_LIMIT подписчиков выборка пуста.
+    follower_ids = Subscription.objects.filter(
+        subscribed_to_id=recipe.author_id,
+        subscribed_to__subscribers_count__lte=settings.FEED_FANOUT_LIMIT,
+    ).values_list("user_id", flat=True)
+    FeedEntry.objects.bulk_create(
+        (
+            FeedEntry(
+                user_id=user_id,
+                recipe=recipe,
+                author_id=recipe.author_id,
+                created_at=recipe.created_at,
+            )
+            for user_id in follower_ids
+        ),
+        batch_size=settings.FEED_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def add_authors(user_id, author_ids):
+    # Новая подписка: в ленту попадают последние рецепты автора, если
+    # их раскладывают по лентам при публикации.
+    if not author_ids:
+        return
+    recipes = (
+        Recipe.objects.filter(
+            author_id__in=author_ids,
+            author__subscribers_count__lte=settings.FEED_FANOUT_LIMIT,
+        )
+        .annotate(
+            position=Window(
+                RowNumber(),
+                partition_by=F("author_id"),
+                order_by=[F("created_at").desc(), F("id").desc()],
+            )
+        )
+        .filter(position__lte=settings.FEED_BACKFILL_SIZE)
+        .values_list("pk", "author_id", "created_at")
+    )
+    FeedEntry.objects.bulk_create(
+        (
+            FeedEntry(
+                user_id=user_id,
+                recipe_id=recipe_id,
+                author_id=author_id,
+                created_at=created_at,
+            )
+            for recipe_id, author_id, created_at in recipes
+        ),
+        batch_size=settings.FEED_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def remove_authors(user_id, author_ids):
+    if not author_ids:
+        return
+    # У FeedEntry нет сигналов и зависимых моделей: delete() обходится
+    # одним запросом DELETE.
+    FeedEntry.objects.filter(
+        user_id=user_id, author_id__in=author_ids
+    ).delete()
+
+
+def backfill_authors(author_ids):
+    # Вызывается после уменьшения счётчика подписчиков. Автор, у которого
+    # их стало ровно FEED_FANOUT_LIMIT, снова раскладывает рецепты при
+    # публикации: его последние рецепты, вышедшие, пока ленты читали их
+    # напрямую, добавляются всем подписчикам, в том числе пришедшим за
+    # это время без заполнения ленты.
+    authors = CustomUser.objects.filter(
+        pk__in=author_ids, subscribers_count=settings.FEED_FANOUT_LIMIT
+    ).values_list("pk", flat=True)
+    for author_id in authors:
+        recipes = list(
+            Recipe.objects.filter(author_id=author_id)
+            .order_by("-created_at", "-id")
+            .values_list("pk", "created_at")[: settings.FEED_BACKFILL_SIZE]
+        )
+        if not recipes:
+            continue
+        follower_ids = Subscription.objects.filter(
+            subscribed_to_id=author_id
+        ).values_list("user_id", flat=True)
+        FeedEntry.objects.bulk_create(
+            (
+                FeedEntry(
+                    user_id=user_id,
+                    recipe_id=recipe_id,
+                    author_id=author_id,
+                    created_at=created_at,
+                )
+                for user_id in follower_ids
+                for recipe_id, created_at in recipes
+            ),
+            batch_size=settings.FEED_BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+
+
+def get_feed_sources(user):
+    # Лента — записи таблицы FeedEntry и рецепты авторов сверх
+    # FEED_FANOUT_LIMIT подписчиков (fan-out on read). Обе выборки
+    # отдают created_at и recipe_id и пролистываются одним курсором.
+    timeline = FeedEntry.objects.filter(user=user).only(
+        "created_at", "recipe_id"
+    )
+    popular = (
+        Recipe.objects.filter(
+            author__in=Subscription.objects.filter(
+                user=user,
+                subscribed_to__subscribers_count__gt=(
+                    settings.FEED_FANOUT_LIMIT
+                ),
+            ).values("subscribed_to")
+        )
+        .annotate(recipe_id=F("id"))
+        .only("created_at")
+    )
+    return timeline, popular
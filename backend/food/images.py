@@ -0,0 +1,191 @@
+import io
+import logging
+import posixpath
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from PIL import Image, ImageOps
+
+logger = logging.getLogger("foodgram.images")
+
+# Модель -> (поле с оригиналом, поле с именами производных файлов).
+IMAGE_FIELDS = {
+    "food.Recipe": ("image", "image_variants"),
+    "users.CustomUser": ("avatar", "avatar_variants"),
+}
+FORMATS = {
+    "webp": ("WEBP", "webp", {"quality": 80, "method": 4}),
+    "jpeg": ("JPEG", "jpg", {"quality": 85, "optimize": True}),
+    "png": ("PNG", "png", {"optimize": True}),
+}
+
+
+def variant_name(name, variant, extension):
+    directory, filename = posixpath.split(name)
+    stem = posixpath.splitext(filename)[0]
+    return posixpath.join(
+        directory, "variants", f"{stem}_{variant}.{extension}"
+    )
+
+
+def open_image(name, storage=default_storage):
+    with storage.open(name) as source:
+        image = Image.open(source)
+        if image.width * image.height > settings.IMAGE_MAX_PIXELS:
+            raise ValueError(
+                f"{name}: {image.width}x{image.height} больше "
+                f"IMAGE_MAX_PIXELS"
+            )
+        image = ImageOps.exif_transpose(image)
+    has_alpha = image.mode in ("RGBA", "LA") or (
+        image.mode == "P" and "transparency" in image.info
+    )
+    return image.convert("RGBA" if has_alpha else "RGB"), has_alpha
+
+
+def render_variants(name, storage=default_storage):
+    image, has_alpha = open_image(name, storage)
+    # Запасной формат для клиентов без WebP; PNG сохраняет прозрачность.
+    formats = {"webp": "webp", "fallback": "png" if has_alpha else "jpeg"}
+    variants = {"source": name}
+    for variant, size in settings.IMAGE_VARIANTS.items():
+        resized = image.copy()
+        # Изображение только уменьшается, пропорции сохраняются.
+        resized.thumbnail(size, Image.LANCZOS)
+        variants[variant] = {}
+        for key, format_name in formats.items():
+            pil_format, extension, params = FORMATS[format_name]
+            buffer = io.BytesIO()
+            resized.save(buffer, format=pil_format, **params)
+            path = variant_name(name, variant, extension)
+            # Перезапись, а не новое имя с суффиксом от storage.
+            storage.delete(path)
+            variants[variant][key] = storage.save(
+                path, ContentFile(buffer.getvalue())
+            )
+    return variants
+
+
+def variant_files(variants):
+    return [
+        path
+        for variant, formats in (variants or {}).items()
+        if variant != "source"
+        for path in formats.values()
+    ]
+
+
+def is_referenced(name):
+    return any(
+        apps.get_model(label)._default_manager.filter(**{field: name}).exists()
+        for label, (field, _) in IMAGE_FIELDS.items()
+    )
+
+
+def discard_variants(variants, keep=(), storage=default_storage):
+    # Один файл может быть у нескольких записей (например, у
+    # сгенерированных рецептов), тогда копии остаются.
+    if not variants or is_referenced(variants.get("source")):
+        return
+    for path in variant_files(variants):
+        if path not in keep:
+            storage.delete(path)
+
+
+def store_variants(label, pks, variants):
+    model = apps.get_model(label)
+    field, variants_field = IMAGE_FIELDS[label]
+    previous = list(
+        model._default_manager.filter(pk__in=pks)
+        .exclude(**{f"{variants_field}__source": variants["source"]})
+        .values_list(variants_field, flat=True)
+    )
+    # Изображение могло смениться, пока строились производные.
+    updated = model._default_manager.filter(
+        pk__in=pks, **{field: variants["source"]}
+    ).update(**{variants_field: variants})
+    for stale in previous:
+        discard_variants(stale, keep=variant_files(variants))
+    if not updated:
+        discard_variants(variants)
+    return updated
+
+
+def variant_urls(image, variants, build_url):
+    if not image:
+        return None
+    if (variants or {}).get("source") != image.name:
+        # Производные ещё не готовы: отдаётся оригинал.
+        url = build_url(image.url)
+        return {
+            variant: {"webp": url, "fallback": url}
+            for variant in settings.IMAGE_VARIANTS
+        }
+    return {
+        variant: {
+            key: build_url(default_storage.url(path))
+            for key, path in variants[variant].items()
+        }
+        for variant in settings.IMAGE_VARIANTS
+        if variant in variants
+    }
+
+
+class ImagePipeline:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=settings.IMAGE_WORKERS,
+                    thread_name_prefix="image-variants",
+                )
+            return self._executor
+
+    def schedule(self, instance, update_fields=None):
+        label = instance._meta.label
+        field, variants_field = IMAGE_FIELDS[label]
+        if update_fields and field not in update_fields:
+            return
+        image = getattr(instance, field)
+        variants = getattr(instance, variants_field)
+        if not image:
+            if variants:
+                type(instance)._default_manager.filter(pk=instance.pk).update(
+                    **{variants_field: {}}
+                )
+                setattr(instance, variants_field, {})
+                transaction.on_commit(lambda: discard_variants(variants))
+            return
+        if (variants or {}).get("source") == image.name:
+            return
+        task = (label, instance.pk, image.name)
+        transaction.on_commit(lambda: self.submit(*task))
+
+    def submit(self, label, pk, name):
+        if not settings.IMAGE_WORKERS:
+            return self.process(label, pk, name)
+        return self._get_executor().submit(self.process, label, pk, name)
+
+    def process(self, label, pk, name):
+        try:
+            return store_variants(label, [pk], render_variants(name))
+        except Exception:
+            # Ошибка обработки не должна ломать запрос: остаётся оригинал.
+            logger.exception("Не удалось построить производные для %s", name)
+            return 0
+        finally:
+            if settings.IMAGE_WORKERS:
+                # Соединение потока пула не переживает задачу.
+                connections.close_all()
+
+
+image_pipeline = ImagePipeline()
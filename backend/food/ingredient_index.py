@@ -0,0 +1,115 @@
+import heapq
+import re
+import threading
+import time
+from bisect import bisect_left
+
+from django.conf import settings
+
+from food.catalog import catalog
+from food.models import Ingredient
+
+WORD_START = re.compile(r"(?<=[\s\-(,])\w")
+
+
+class IngredientIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._state = None
+        self._built_at = 0.0
+        self._version = None
+
+    def invalidate(self):
+        self._state = None
+
+    def _is_stale(self):
+        return (
+            self._state is None
+            or time.monotonic() - self._built_at
+            > settings.INGREDIENT_INDEX_TTL
+            # Справочник изменён в другом процессе.
+            or self._version != catalog.get_version()
+        )
+
+    def _build(self):
+        items = sorted(
+            Ingredient.objects.using("default").values(
+                "id", "name", "measurement_unit"
+            ),
+            key=lambda item: (item["name"].casefold(), item["id"]),
+        )
+        names = [item["name"].casefold() for item in items]
+        words = sorted(
+            (name[match.start():], position)
+            for position, name in enumerate(names)
+            for match in WORD_START.finditer(name)
+        )
+        by_id = {item["id"]: item for item in items}
+        return items, names, words, by_id
+
+    def _get_state(self):
+        if self._is_stale():
+            with self._lock:
+                if self._is_stale():
+                    self._version = catalog.get_version()
+                    self._state = self._build()
+                    self._built_at = time.monotonic()
+        return self._state
+
+    def search(self, query, limit=None):
+        # Сначала названия, начинающиеся с запроса, затем названия, где
+        # с запроса начинается одно из слов («сах» — «кость сахарная»).
+        limit = limit or settings.INGREDIENT_SEARCH_LIMIT
+        prefix = query.strip().casefold()
+        if not prefix:
+            return []
+        items, names, words, _ = self._get_state()
+
+        found = []
+        position = bisect_left(names, prefix)
+        while (
+            position < len(names)
+            and len(found) < limit
+            and names[position].startswith(prefix)
+        ):
+            found.append(position)
+            position += 1
+
+        if len(found) < limit:
+            seen = set(found)
+            matches = set()
+            index = bisect_left(words, (prefix,))
+            while index < len(words) and words[index][0].startswith(prefix):
+                if words[index][1] not in seen:
+                    matches.add(words[index][1])
+                index += 1
+            found.extend(heapq.nsmallest(limit - len(found), matches))
+
+        return [items[position] for position in found]
+
+    def get_many(self, ingredient_ids):
+        by_id = self._get_state()[3]
+        found = {
+            ingredient_id: by_id[ingredient_id]
+            for ingredient_id in ingredient_ids
+            if ingredient_id in by_id
+        }
+        missing = set(ingredient_ids) - found.keys()
+        if missing:
+            # Ингредиент мог быть добавлен в другом процессе: дочитываем
+            # только недостающие id, не перестраивая весь индекс.
+            found.update(
+                (item["id"], item)
+                for item in Ingredient.objects.using("default")
+                .filter(pk__in=missing)
+                .values("id", "name", "measurement_unit")
+            )
+        return found
+
+    def get_unknown(self, ingredient_ids):
+        # id, которых нет в индексе; без перестройки — новый ингредиент
+        # из другого процесса проверяется запросом только по этим id.
+        return set(ingredient_ids) - self._get_state()[3].keys()
+
+
+ingredient_index = IngredientIndex()
@@ -0,0 +1,136 @@
+import time
+from wsgiref.util import setup_testing_defaults
+
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.backends.postgresql.psycopg_any import is_psycopg3
+
+from food.management.commands.benchmark_http import percentile
+from food.models import Recipe
+from foodgram.db_backend.base import get_connection_stats
+
+# Режим: (CONN_MAX_AGE, настройки пула).
+MODES = {
+    "fresh": (0, None),
+    "persistent": (None, None),
+    "pool": (0, {"min_size": 1, "max_size": 2}),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает задержку запросов с новым соединением на каждый "
+        "запрос, постоянными соединениями и пулом psycopg"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--path",
+            action="append",
+            help="Путь для запросов, можно указать несколько раз",
+        )
+        parser.add_argument("--requests", type=int, default=500)
+        parser.add_argument("--mode", choices=list(MODES), action="append")
+        parser.add_argument("--token", help="Токен для Authorization")
+        parser.add_argument("--database", default="default")
+
+    def handle(self, *args, **options):
+        self.connection = connections[options["database"]]
+        if self.connection.vendor != "postgresql":
+            raise CommandError("Нужна база PostgreSQL")
+        modes = options["mode"] or list(MODES)
+        if "pool" in modes and not is_psycopg3:
+            raise CommandError("Пул соединений требует psycopg 3")
+        paths = options["path"] or self.get_default_paths()
+        self.options = options
+        original = (
+            self.connection.settings_dict["CONN_MAX_AGE"],
+            self.connection.settings_dict["OPTIONS"].get("pool"),
+        )
+        self.handler = WSGIHandler()
+        results = {}
+        try:
+            for mode in modes:
+                self.configure(*MODES[mode])
+                self.run(paths, options["requests"] // 10)
+                stats = get_connection_stats(self.connection.alias)
+                checkouts, total = stats.checkouts, stats.checkout_time
+                latencies = self.run(paths, options["requests"])
+                results[mode] = latencies
+                self.report(
+                    mode,
+                    latencies,
+                    stats.checkouts - checkouts,
+                    stats.checkout_time - total,
+                )
+        finally:
+            self.configure(*original)
+        if "fresh" in results:
+            base = percentile(results.pop("fresh"), 0.5)
+            for mode, latencies in results.items():
+                saved = base - percentile(latencies, 0.5)
+                self.stdout.write(
+                    self.style.SUCCESS(
+                        f"{mode}: экономия {saved * 1000:.2f} мс "
+                        f"на запрос (p50)"
+                    )
+                )
+
+    def get_default_paths(self):
+        recipe = Recipe.objects.order_by("pk").first()
+        if recipe is None:
+            raise CommandError("Нет рецептов, запустите create_recipes")
+        return [f"/api/recipes/{recipe.pk}/", "/api/recipes/?limit=6"]
+
+    def configure(self, max_age, pool):
+        self.connection.close()
+        self.connection.close_pool()
+        settings_dict = self.connection.settings_dict
+        options = {
+            key: value
+            for key, value in settings_dict["OPTIONS"].items()
+            if key != "pool"
+        }
+        if pool:
+            options["pool"] = pool
+        settings_dict["OPTIONS"] = options
+        settings_dict["CONN_MAX_AGE"] = max_age
+
+    def run(self, paths, count):
+        latencies = []
+        for number in range(count):
+            path, _, query = paths[number % len(paths)].partition("?")
+            environ = {}
+            setup_testing_defaults(environ)
+            environ.update(
+                PATH_INFO=path,
+                QUERY_STRING=query,
+                HTTP_ACCEPT="application/json",
+            )
+            if self.options["token"]:
+                environ["HTTP_AUTHORIZATION"] = (
+                    f"Token {self.options['token']}"
+                )
+            status = []
+            start = time.perf_counter()
+            response = self.handler(
+                environ, lambda code, headers: status.append(code)
+            )
+            b"".join(response)
+            # close() шлёт request_finished: как и на сервере, по нему
+            # соединение закрывается или возвращается в пул.
+            response.close()
+            latencies.append(time.perf_counter() - start)
+            if not status[0].startswith("2"):
+                raise CommandError(f"{path}: {status[0]}")
+        return latencies
+
+    def report(self, mode, latencies, checkouts, checkout_time):
+        average = checkout_time / checkouts * 1000 if checkouts else 0
+        self.stdout.write(
+            f"{mode}: p50 {percentile(latencies, 0.5) * 1000:.2f} мс, "
+            f"p99 {percentile(latencies, 0.99) * 1000:.2f} мс, "
+            f"получено соединений {checkouts}, "
+            f"в среднем {average:.2f} мс"
+        )
@@ -0,0 +1,219 @@
+import http.client
+import itertools
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from urllib.parse import quote, urlsplit
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+DEFAULT_PATHS = (
+    "/api/recipes/",
+    "/api/recipes/?limit=6&page=2",
+    "/api/tags/",
+    "/api/ingredients/?name=со",
+)
+SERVERS = {
+    "wsgi": ["foodgram.wsgi"],
+    "asgi": [
+        "foodgram.asgi:application",
+        "--worker-class",
+        "uvicorn.workers.UvicornWorker",
+    ],
+}
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def get_free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class Load:
+    def __init__(self, base_url, paths, headers):
+        parts = urlsplit(base_url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.paths = paths
+        self.headers = headers
+        self.latencies = defaultdict(list)
+        self.errors = 0
+        self.lock = threading.Lock()
+
+    def request(self, connection, path):
+        connection.request(
+            "GET", quote(path, safe="/?=&"), headers=self.headers
+        )
+        response = connection.getresponse()
+        response.read()
+        if response.will_close:
+            connection.close()
+        return response.status
+
+    def worker(self, deadline, offset):
+        connection = http.client.HTTPConnection(self.host, self.port)
+        latencies, errors = defaultdict(list), 0
+        paths = itertools.islice(itertools.cycle(self.paths), offset, None)
+        while time.monotonic() < deadline:
+            path = next(paths)
+            started = time.perf_counter()
+            try:
+                status = self.request(connection, path)
+            except (OSError, http.client.HTTPException):
+                connection.close()
+                status = None
+            if status is None or status >= 400:
+                errors += 1
+            else:
+                latencies[path].append(time.perf_counter() - started)
+        connection.close()
+        with self.lock:
+            for path, values in latencies.items():
+                self.latencies[path].extend(values)
+            self.errors += errors
+
+    def run(self, concurrency, duration):
+        deadline = time.monotonic() + duration
+        threads = [
+            threading.Thread(target=self.worker, args=(deadline, number))
+            for number in range(concurrency)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return self
+
+
+class Command(BaseCommand):
+    help = (
+        "Нагрузочный тест читающих эндпоинтов: пропускная способность и "
+        "задержки (p50/p99) синхронного WSGI- и асинхронного "
+        "ASGI-развёртывания с одинаковым числом воркеров"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--url",
+            help="Адрес уже запущенного сервера; без него тестируются "
+            "оба развёртывания, запускаемые самой командой",
+        )
+        parser.add_argument(
+            "--server",
+            choices=sorted(SERVERS),
+            action="append",
+            help="Какие развёртывания запускать (по умолчанию оба)",
+        )
+        parser.add_argument(
+            "--path",
+            action="append",
+            help="Путь для запросов, можно указать несколько раз",
+        )
+        parser.add_argument("--workers", type=int, default=2)
+        parser.add_argument("--concurrency", type=int, default=32)
+        parser.add_argument(
+            "--duration", type=float, default=10, help="Секунд на замер"
+        )
+        parser.add_argument(
+            "--warmup", type=float, default=2, help="Секунд прогрева"
+        )
+        parser.add_argument("--token", help="Токен для Authorization")
+
+    def handle(self, *args, **options):
+        self.options = options
+        paths = options["path"] or DEFAULT_PATHS
+        headers = {"Accept": "application/json"}
+        if options["token"]:
+            headers["Authorization"] = f"Token {options['token']}"
+        if options["url"]:
+            load = self.measure(options["url"], paths, headers)
+            self.report(options["url"], load)
+            return
+        for name in options["server"] or ("wsgi", "asgi"):
+            with self.serve(name) as base_url:
+                self.report(
+                    f"{name}, воркеров: {options['workers']}",
+                    self.measure(base_url, paths, headers),
+                )
+
+    def measure(self, base_url, paths, headers):
+        if self.options["warmup"]:
+            Load(base_url, paths, headers).run(
+                self.options["concurrency"], self.options["warmup"]
+            )
+        return Load(base_url, paths, headers).run(
+            self.options["concurrency"], self.options["duration"]
+        )
+
+    def report(self, title, load):
+        latencies = [
+            value for values in load.latencies.values() for value in values
+        ]
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{title}: {len(latencies) / self.options['duration']:.0f} "
+                f"запросов в секунду, p50 "
+                f"{percentile(latencies, 0.5) * 1000:.1f} мс, p99 "
+                f"{percentile(latencies, 0.99) * 1000:.1f} мс, "
+                f"ошибок {load.errors}"
+            )
+        )
+        for path, values in sorted(load.latencies.items()):
+            self.stdout.write(
+                f"  {path}: {len(values)} запросов, p99 "
+                f"{percentile(values, 0.99) * 1000:.1f} мс"
+            )
+
+    @contextmanager
+    def serve(self, name):
+        port = get_free_port()
+        process = subprocess.Popen(
+            [
+                sys.executable,
+                "-m",
+                "gunicorn",
+                *SERVERS[name],
+                "--bind",
+                f"127.0.0.1:{port}",
+                "--workers",
+                str(self.options["workers"]),
+                "--log-level",
+                "warning",
+            ],
+            cwd=settings.BASE_DIR,
+            env={
+                **os.environ,
+                "ASYNC_VIEWS": "true" if name == "asgi" else "false",
+            },
+        )
+        try:
+            self.wait_for_port(port, process)
+            yield f"http://127.0.0.1:{port}"
+        finally:
+            process.terminate()
+            process.wait()
+
+    @staticmethod
+    def wait_for_port(port, process, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise CommandError("Сервер завершился при запуске")
+            try:
+                with socket.create_connection(("127.0.0.1", port), 0.2):
+                    return
+            except OSError:
+                time.sleep(0.1)
+        raise CommandError("Сервер не начал принимать соединения")
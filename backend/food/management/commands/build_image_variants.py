@@ -0,0 +1,99 @@
+import multiprocessing
+import os
+import time
+from collections import defaultdict
+
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from food.images import IMAGE_FIELDS, render_variants, store_variants
+
+
+def render_task(name):
+    try:
+        return name, render_variants(name), None
+    except Exception as error:
+        return name, None, str(error)
+
+
+class Command(BaseCommand):
+    help = (
+        "Построение уменьшенных копий (WebP и запасной формат) для уже "
+        "загруженных изображений рецептов и аватаров"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="Количество процессов для обработки изображений",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Количество записей, читаемых из базы за один запрос",
+        )
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Перестроить копии даже там, где они уже есть",
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        processed = failed = 0
+        for label in IMAGE_FIELDS:
+            for pending in self.pending(label, options):
+                for name, variants, error in self.render(pending, options):
+                    if error is not None:
+                        failed += len(pending[name])
+                        self.stderr.write(f"{name}: {error}")
+                    else:
+                        processed += store_variants(
+                            label, pending[name], variants
+                        )
+        elapsed = max(time.monotonic() - started, 1e-6)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Обработано изображений: {processed}, ошибок: {failed} "
+                f"за {elapsed:.1f} с ({processed / elapsed:.1f} в секунду)"
+            )
+        )
+
+    def pending(self, label, options):
+        model = apps.get_model(label)
+        field, variants_field = IMAGE_FIELDS[label]
+        last_id = 0
+        while True:
+            rows = list(
+                model._default_manager.filter(pk__gt=last_id)
+                .exclude(**{field: ""})
+                .exclude(**{f"{field}__isnull": True})
+                .order_by("pk")
+                .values_list("pk", field, variants_field)[
+                    :options["batch_size"]
+                ]
+            )
+            if not rows:
+                return
+            last_id = rows[-1][0]
+            # Общий для нескольких записей файл обрабатывается один раз.
+            pending = defaultdict(list)
+            for pk, name, variants in rows:
+                if options["force"] or (variants or {}).get("source") != name:
+                    pending[name].append(pk)
+            if pending:
+                yield pending
+
+    def render(self, pending, options):
+        if options["workers"] < 2 or len(pending) < 2:
+            return map(render_task, pending)
+        # Дочерним процессам база не нужна: они только читают и пишут
+        # файлы, а результат сохраняет родительский процесс.
+        connections.close_all()
+        context = multiprocessing.get_context("fork")
+        with context.Pool(options["workers"]) as pool:
+            return pool.map(render_task, pending)
@@ -1,38 +1,342 @@
-import base64
-import csv
-from random import choice, randint, sample
+import multiprocessing
+import os
+import time
+from decimal import Decimal
+from itertools import accumulate
+from random import Random
 
 from django.contrib.auth import get_user_model
-from django.core.files.base import ContentFile
-from django.core.management.base import BaseCommand
+from django.contrib.auth.hashers import make_password
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections, transaction
+from django.db.models import Max
 
-from food.models import Ingredient, Recipe, RecipeIngredient, Tag
+from food.base62 import encode
+from food.models import (
+    FavoriteRecipe,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    ShoppingList,
+    Tag,
+)
+from food.shopping_list import ShoppingListRecipe, compute_totals
+from users.models import Subscription
+
+RecipeTag = Recipe.tags.through
+
+TAG_NAMES = ["Соленый", "Жареный", "Острый", "Кислый", "Сладкий"]
+AMOUNTS = [Decimal(amount) for amount in ("0.5", "1", "2", "3", "50", "100")]
+IMAGE_NAME = "recipes/images/sample_recipe.png"
+
+# Состояние воркера: заполняется в init_worker, чтобы не передавать
+# большие списки идентификаторов с каждой задачей.
+STATE = {}
+
+
+# Выборка с распределением Ципфа: немногие авторы, рецепты и
+# ингредиенты популярны, остальные встречаются редко.
+class Skewed:
+    def __init__(self, population, exponent, rng):
+        self.population = list(population)
+        rng.shuffle(self.population)
+        self.cum_weights = list(
+            accumulate(
+                1 / rank**exponent
+                for rank in range(1, len(self.population) + 1)
+            )
+        )
+
+    def draw(self, rng, k=1):
+        return rng.choices(self.population, cum_weights=self.cum_weights, k=k)
+
+    def draw_distinct(self, rng, k):
+        k = min(k, len(self.population))
+        chosen = dict.fromkeys(self.draw(rng, k))
+        while len(chosen) < k:
+            chosen.update(dict.fromkeys(self.draw(rng, k - len(chosen))))
+        return list(chosen)
+
+
+def init_worker(state):
+    STATE.update(state)
+
+
+def chunk_rng(kind, start):
+    # Зерно зависит только от номера пачки, поэтому результат не зависит
+    # от количества воркеров.
+    return Random(f"{STATE['seed']}:{kind}:{start}")
+
+
+def reserve_ids(model, count):
+    # На PostgreSQL ключи берутся из последовательности заранее, чтобы
+    # короткие ссылки попали в ту же вставку без отдельного UPDATE.
+    if connection.vendor != "postgresql":
+        return [None] * count
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT nextval(pg_get_serial_sequence(%s, %s)) "
+            "FROM generate_series(1, %s)",
+            [model._meta.db_table, model._meta.pk.column, count],
+        )
+        return [pk for pk, in cursor.fetchall()]
+
+
+def create_recipes(start, count):
+    rng = chunk_rng("recipes", start)
+    options = STATE["options"]
+    recipes = [
+        Recipe(
+            pk=pk,
+            short_link=pk and encode(pk),
+            name=f"Рецепт {start + i + 1}",
+            author_id=author_id,
+            text=f"Описание рецепта {start + i + 1}",
+            cooking_time=max(1, int(rng.triangular(5, 180, 30))),
+            image=STATE["image"],
+        )
+        for i, (pk, author_id) in enumerate(
+            zip(reserve_ids(Recipe, count), STATE["authors"].draw(rng, count))
+        )
+    ]
+    with transaction.atomic():
+        Recipe.objects.bulk_create(recipes)
+        if recipes[0].short_link is None:
+            for recipe in recipes:
+                recipe.short_link = encode(recipe.pk)
+            Recipe.objects.bulk_update(recipes, ["short_link"])
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(
+                recipe=recipe,
+                ingredient_id=ingredient_id,
+                amount=rng.choice(AMOUNTS),
+            )
+            for recipe in recipes
+            for ingredient_id in STATE["ingredients"].draw_distinct(
+                rng, rng.randint(1, options["ingredients_per_recipe"])
+            )
+        )
+        RecipeTag.objects.bulk_create(
+            RecipeTag(recipe_id=recipe.pk, tag_id=tag_id)
+            for recipe in recipes
+            for tag_id in rng.sample(STATE["tags"], rng.randint(1, 3))
+        )
+        Recipe.objects.filter(
+            pk__in=[recipe.pk for recipe in recipes]
+        ).update_search_vector()
+    return [recipe.pk for recipe in recipes]
+
+
+def draw_pairs(rng, users, targets, count, distinct=False):
+    # Пары сортируются, чтобы параллельные вставки брали блокировки
+    # уникального индекса в одном порядке и не попадали в deadlock.
+    return sorted(
+        {
+            (user_id, target_id)
+            for user_id, target_id in zip(
+                users.draw(rng, count), targets.draw(rng, count)
+            )
+            if not distinct or user_id != target_id
+        }
+    )
+
+
+def create_favorites(start, count):
+    rng = chunk_rng("favorites", start)
+    pairs = draw_pairs(rng, STATE["readers"], STATE["recipes"], count)
+    FavoriteRecipe.objects.bulk_create(
+        (
+            FavoriteRecipe(user_id=user_id, recipe_id=recipe_id)
+            for user_id, recipe_id in pairs
+        ),
+        ignore_conflicts=True,
+    )
+    return count
+
+
+def create_subscriptions(start, count):
+    rng = chunk_rng("subscriptions", start)
+    pairs = draw_pairs(
+        rng, STATE["readers"], STATE["authors"], count, distinct=True
+    )
+    Subscription.objects.bulk_create(
+        (
+            Subscription(user_id=user_id, subscribed_to_id=author_id)
+            for user_id, author_id in pairs
+        ),
+        ignore_conflicts=True,
+    )
+    return count
+
+
+def create_carts(start, count):
+    rng = chunk_rng("carts", start)
+    user_ids = STATE["cart_owners"][start:start + count]
+    with transaction.atomic():
+        shopping_lists = ShoppingList.objects.bulk_create(
+            ShoppingList(user_id=user_id) for user_id in user_ids
+        )
+        ShoppingListRecipe.objects.bulk_create(
+            ShoppingListRecipe(
+                shoppinglist_id=shopping_list.pk, recipe_id=recipe_id
+            )
+            for shopping_list in shopping_lists
+            for recipe_id in STATE["recipes"].draw_distinct(
+                rng, rng.randint(1, STATE["options"]["cart_size"])
+            )
+        )
+        totals = compute_totals([item.pk for item in shopping_lists])
+        for shopping_list in shopping_lists:
+            shopping_list.ingredients = totals[shopping_list.pk]
+        ShoppingList.objects.bulk_update(shopping_lists, ["ingredients"])
+    return len(shopping_lists)
 
 
 class Command(BaseCommand):
     help = (
-        "Load data into the database from CSV "
-        "and image files and create a superuser"
+        "Генерация синтетических данных для нагрузочного тестирования: "
+        "пользователи, рецепты, избранное, корзины и подписки"
     )
 
     def add_arguments(self, parser):
         parser.add_argument(
-            "--ingredients", type=str, help="Path to the ingredients CSV file"
+            "--ingredients",
+            type=str,
+            help="Путь к файлу ингредиентов для предварительной загрузки",
+        )
+        parser.add_argument(
+            "--image",
+            type=str,
+            help="Путь к изображению, общему для всех рецептов",
+        )
+        parser.add_argument("--users", type=int, default=5)
+        parser.add_argument("--recipes", type=int, default=10)
+        parser.add_argument(
+            "--ingredients-per-recipe",
+            type=int,
+            default=5,
+            help="Максимальное количество ингредиентов в рецепте",
+        )
+        parser.add_argument("--favorites", type=int, default=0)
+        parser.add_argument(
+            "--carts",
+            type=int,
+            default=0,
+            help="Количество пользователей с непустой корзиной",
+        )
+        parser.add_argument(
+            "--cart-size",
+            type=int,
+            default=5,
+            help="Максимальное количество рецептов в корзине",
         )
+        parser.add_argument("--subscriptions", type=int, default=0)
         parser.add_argument(
-            "--image", type=str, help="Path to the example image file"
+            "--skew",
+            type=float,
+            default=1.1,
+            help="Показатель распределения Ципфа для популярности",
+        )
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=2000,
+            help="Количество объектов в одной пачке вставки",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count(),
+            help="Количество процессов (для SQLite всегда 1)",
         )
 
     def handle(self, *args, **options):
-        ingredients_path = options["ingredients"]
-        image_path = options["image"]
+        self.options = options
+        self.workers = max(1, options["workers"])
+        if connection.vendor == "sqlite":
+            self.workers = 1
+        rng = Random(options["seed"])
 
-        def convert_image_to_base64(image_path):
-            with open(image_path, "rb") as image_file:
-                return base64.b64encode(image_file.read()).decode("utf-8")
+        self.create_superuser()
+        if options["ingredients"]:
+            call_command(
+                "load_ingredients", options["ingredients"], stdout=self.stdout
+            )
+        ingredient_ids = list(Ingredient.objects.values_list("id", flat=True))
+        if not ingredient_ids:
+            raise CommandError(
+                "Нет ингредиентов: передайте --ingredients или выполните "
+                "load_ingredients"
+            )
+        tag_ids = self.create_tags()
+        image = self.store_image(options["image"])
+        user_ids = self.create_users(options["users"])
+        if not user_ids:
+            raise CommandError("Нужен хотя бы один пользователь")
 
-        sample_image_base64 = convert_image_to_base64(image_path)
+        state = {
+            "seed": options["seed"],
+            "options": options,
+            "image": image,
+            "tags": tag_ids,
+            "ingredients": Skewed(ingredient_ids, options["skew"], rng),
+            "authors": Skewed(user_ids, options["skew"], rng),
+            "readers": Skewed(user_ids, options["skew"], rng),
+        }
+        chunks = self.run("Рецепты", create_recipes, "recipes", state)
+        recipe_ids = [pk for pks in chunks for pk in pks]
+        if recipe_ids:
+            state["recipes"] = Skewed(recipe_ids, options["skew"], rng)
+            state["cart_owners"] = rng.sample(
+                user_ids, min(options["carts"], len(user_ids))
+            )
+            self.run("Избранное", create_favorites, "favorites", state)
+            self.run("Подписки", create_subscriptions, "subscriptions", state)
+            self.run("Корзины", create_carts, "carts", state)
+        # Массовая вставка обходит сигналы, поэтому счётчики
+        # пересчитываются одним проходом в конце.
+        call_command("reconcile_counters", stdout=self.stdout)
 
+        self.stdout.write(
+            self.style.SUCCESS("All recipes created successfully!")
+        )
+
+    def run(self, title, task, option, state):
+        total = self.options[option]
+        if option == "carts":
+            total = len(state["cart_owners"])
+        batch_size = self.options["batch_size"]
+        chunks = [
+            (start, min(batch_size, total - start))
+            for start in range(0, total, batch_size)
+        ]
+        started = time.monotonic()
+        if self.workers == 1 or len(chunks) < 2:
+            init_worker(state)
+            results = [task(*chunk) for chunk in chunks]
+        else:
+            # Соединения закрываются до fork, чтобы каждый процесс открыл
+            # своё собственное.
+            connections.close_all()
+            context = multiprocessing.get_context("fork")
+            with context.Pool(
+                self.workers, initializer=init_worker, initargs=(state,)
+            ) as pool:
+                results = pool.starmap(task, chunks)
+        elapsed = max(time.monotonic() - started, 1e-6)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{title}: {total} за {elapsed:.1f} с "
+                f"({total / elapsed:.0f} в секунду)"
+            )
+        )
+        return results
+
+    def create_superuser(self):
         User = get_user_model()
         superuser_email = "admin@example.com"
         superuser_password = "admin"
@@ -55,39 +359,9 @@ class Command(BaseCommand):
         else:
             self.stdout.write(self.style.WARNING("Superuser already exists."))
 
-        ingredients = []
-        with open(ingredients_path, newline="", encoding="utf-8") as csvfile:
-            reader = csv.reader(csvfile, delimiter=",")
-            for row in reader:
-                if len(row) == 2:
-                    name, measurement_unit = row
-                    name = name.strip()
-                    measurement_unit = measurement_unit.strip()
-                    ingredient, created = Ingredient.objects.get_or_create(
-                        name=name, measurement_unit=measurement_unit
-                    )
-                    ingredients.append(ingredient)
-
-        users = []
-        for i in range(5):
-            email = f"user{i}@example.com"
-            user, created = User.objects.get_or_create(
-                email=email,
-                defaults={
-                    "username": f"user{i}",
-                    "first_name": f"First{i}",
-                    "last_name": f"Last{i}",
-                },
-            )
-            if created:
-                user.set_password("password")
-                user.save()
-                self.stdout.write(self.style.SUCCESS(f"Created user: {email}"))
-            users.append(user)
-
-        tag_names = ["Соленый", "Жареный", "Острый", "Кислый", "Сладкий"]
+    def create_tags(self):
         tags = []
-        for tag_name in tag_names:
+        for tag_name in TAG_NAMES:
             slug = tag_name.lower().replace(" ", "_")
             tag, created = Tag.objects.get_or_create(
                 name=tag_name, defaults={"slug": slug}
@@ -96,37 +370,43 @@ class Command(BaseCommand):
                 self.stdout.write(
                     self.style.SUCCESS(f"Created tag: {tag_name}")
                 )
-            tags.append(tag)
-
-        for i in range(10):
-            author = choice(users)
+            tags.append(tag.pk)
+        return tags
 
-            image_data = base64.b64decode(sample_image_base64)
-            image = ContentFile(image_data, name=f"recipe_image_{i}.png")
+    def store_image(self, image_path):
+        if not image_path:
+            return None
+        if default_storage.exists(IMAGE_NAME):
+            return IMAGE_NAME
+        with open(image_path, "rb") as image_file:
+            return default_storage.save(IMAGE_NAME, File(image_file))
 
-            recipe = Recipe.objects.create(
-                name=f"Recipe {i}",
-                author=author,
-                text=f"Delicious recipe {i}",
-                cooking_time=randint(5, 60),
-                image=image,
-            )
-
-            num_ingredients = randint(2, 5)
-            selected_ingredients = sample(ingredients, num_ingredients)
-            for ingredient in selected_ingredients:
-                RecipeIngredient.objects.create(
-                    recipe=recipe, ingredient=ingredient, amount=randint(1, 10)
+    def create_users(self, count):
+        User = get_user_model()
+        # Номера продолжают уже существующие, чтобы повторный запуск
+        # не конфликтовал по email.
+        offset = (User.objects.aggregate(Max("id"))["id__max"] or 0) + 1
+        password = make_password("password")
+        started = time.monotonic()
+        user_ids = []
+        batch_size = self.options["batch_size"]
+        for start in range(0, count, batch_size):
+            users = User.objects.bulk_create(
+                User(
+                    email=f"user{offset + number}@example.com",
+                    username=f"user{offset + number}",
+                    first_name=f"First{offset + number}",
+                    last_name=f"Last{offset + number}",
+                    password=password,
                 )
-
-            num_tags = randint(1, 3)
-            selected_tags = sample(tags, num_tags)
-            recipe.tags.add(*selected_tags)
-
-            self.stdout.write(
-                self.style.SUCCESS(f"Created recipe: {recipe.name}")
+                for number in range(start, min(start + batch_size, count))
             )
-
+            user_ids.extend(user.pk for user in users)
+        elapsed = max(time.monotonic() - started, 1e-6)
         self.stdout.write(
-            self.style.SUCCESS("All recipes created successfully!")
+            self.style.SUCCESS(
+                f"Пользователи: {count} за {elapsed:.1f} с "
+                f"({count / elapsed:.0f} в секунду)"
+            )
         )
+        return user_ids
@@ -0,0 +1,54 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from food.models import Recipe
+
+
+class Command(BaseCommand):
+    help = (
+        "Выгрузка коротких ссылок в файл map для nginx, "
+        "чтобы редиректы обслуживались без обращения к бэкенду"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--output",
+            default=settings.SHORT_LINK_MAP_PATH,
+            help="Путь к файлу map (по умолчанию SHORT_LINK_MAP_PATH)",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=5000,
+            help="Количество рецептов, читаемых из базы за один запрос",
+        )
+
+    def handle(self, *args, **options):
+        output = options["output"]
+        os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+        links = (
+            Recipe.objects.exclude(short_link__isnull=True)
+            .exclude(short_link="")
+            .order_by("pk")
+            .values_list("short_link", "pk")
+            .iterator(chunk_size=options["batch_size"])
+        )
+        count = 0
+        # Запись во временный файл и замена, чтобы nginx при reload
+        # никогда не прочитал файл наполовину.
+        temporary = f"{output}.tmp"
+        with open(temporary, "w", encoding="utf-8") as map_file:
+            for short_link, pk in links:
+                map_file.write(
+                    f"/api/s/{short_link}/ "
+                    f'"{settings.BASE_URL}recipes/{pk}/";\n'
+                )
+                count += 1
+        os.replace(temporary, output)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Выгружено коротких ссылок: {count} в {output}"
+            )
+        )
@@ -1,6 +1,72 @@
-from django.core.management.base import BaseCommand
+import csv
+import io
+import json
+import os
+import time
+from itertools import islice
 
-from food.models import Ingredient
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from food.catalog import catalog
+from food.ingredient_index import ingredient_index
+from food.models import MAX_LENGTH, Ingredient
+
+READ_SIZE = 1 << 16
+
+
+def read_csv(file):
+    for row in csv.reader(file):
+        if not row:
+            continue
+        if len(row) < 2:
+            raise ValueError(f"Нет единицы измерения: {row!r}")
+        # Запятые в названии без кавычек относятся к названию.
+        *name, measurement_unit = row
+        yield ",".join(name), measurement_unit
+
+
+def read_json(file):
+    # Массив объектов разбирается по одному элементу, не загружая
+    # весь файл в память.
+    decoder = json.JSONDecoder()
+    buffer, position, started = "", 0, False
+    while True:
+        chunk = file.read(READ_SIZE)
+        buffer = buffer[position:] + chunk
+        position = 0
+        while True:
+            while position < len(buffer) and buffer[position] in " \t\r\n,":
+                position += 1
+            if not started and position < len(buffer):
+                if buffer[position] != "[":
+                    raise ValueError("Ожидается массив ингредиентов")
+                started = True
+                position += 1
+                continue
+            if buffer.startswith("]", position):
+                return
+            try:
+                item, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if not chunk:
+                    raise
+                break
+            yield item["name"], item["measurement_unit"]
+        if not chunk:
+            raise ValueError("Неожиданный конец файла")
+
+
+READERS = {"csv": read_csv, "json": read_json}
+
+
+def copy_escape(value):
+    return (
+        value.replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
 
 
 class Command(BaseCommand):
@@ -8,20 +74,109 @@ class Command(BaseCommand):
 
     def add_arguments(self, parser):
         parser.add_argument(
-            "file_path", type=str, help="Путь до csv файла ингредиентов"
+            "file_path",
+            type=str,
+            help="Путь до csv или json файла ингредиентов",
+        )
+        parser.add_argument(
+            "--format",
+            choices=READERS,
+            help="Формат файла (по умолчанию определяется по расширению)",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=5000,
+            help="Количество строк в одной пачке вставки",
         )
 
     def handle(self, *args, **kwargs):
         file_path = kwargs["file_path"]
+        file_format = kwargs["format"] or (
+            os.path.splitext(file_path)[1].lstrip(".").lower()
+        )
+        if file_format not in READERS:
+            raise CommandError(
+                f"Неизвестный формат файла: {file_path}. "
+                "Укажите --format csv или --format json"
+            )
 
+        started = time.monotonic()
         with open(file_path, "r", encoding="utf-8") as file:
-            for line in file:
-                line = line.strip()
-                if line:
-                    name, measurement_unit = line.rsplit(",", 1)
-                    Ingredient.objects.get_or_create(
-                        name=name.strip(),
-                        measurement_unit=measurement_unit.strip(),
+            try:
+                with transaction.atomic():
+                    counts = self.load(
+                        READERS[file_format](file), kwargs["batch_size"]
                     )
+            except (ValueError, KeyError, TypeError) as error:
+                raise CommandError(f"Ошибка в файле {file_path}: {error!r}")
+        if counts["inserted"]:
+            catalog.bump()
+            ingredient_index.invalidate()
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Ингредиенты успешно загружены: "
+                f"прочитано {counts['read']}, "
+                f"добавлено {counts['inserted']}, "
+                f"пропущено дубликатов {counts['skipped']}, "
+                f"некорректных строк {counts['invalid']} "
+                f"({counts['read'] / max(elapsed, 1e-6):.0f} строк/с)"
+            )
+        )
+
+    def load(self, rows, batch_size):
+        use_copy = connection.vendor == "postgresql"
+        if use_copy:
+            # Параллельный запуск дождётся окончания этой загрузки
+            # и увидит уже вставленные строки.
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"LOCK TABLE {self.table} IN SHARE ROW EXCLUSIVE MODE"
+                )
+        existing = set(
+            Ingredient.objects.values_list(
+                "name", "measurement_unit"
+            ).iterator(chunk_size=batch_size)
+        )
+        counts = dict.fromkeys(("read", "inserted", "skipped", "invalid"), 0)
+        while chunk := list(islice(rows, batch_size)):
+            counts["read"] += len(chunk)
+            new = []
+            for name, measurement_unit in chunk:
+                key = (name.strip(), measurement_unit.strip())
+                if not all(key) or any(len(part) > MAX_LENGTH for part in key):
+                    counts["invalid"] += 1
+                elif key in existing:
+                    counts["skipped"] += 1
+                else:
+                    existing.add(key)
+                    new.append(key)
+            if use_copy:
+                self.copy(new)
+            else:
+                Ingredient.objects.bulk_create(
+                    Ingredient(name=name, measurement_unit=measurement_unit)
+                    for name, measurement_unit in new
+                )
+            counts["inserted"] += len(new)
+        return counts
+
+    def copy(self, rows):
+        if not rows:
+            return
+        buffer = io.StringIO()
+        for name, measurement_unit in rows:
+            buffer.write(
+                f"{copy_escape(name)}\t{copy_escape(measurement_unit)}\n"
+            )
+        with connection.cursor() as cursor:
+            with cursor.copy(
+                f"COPY {self.table} (name, measurement_unit) FROM STDIN"
+            ) as copy:
+                copy.write(buffer.getvalue())
 
-        self.stdout.write(self.style.SUCCESS("Ингредиенты успешно загружены"))
+    @property
+    def table(self):
+        return connection.ops.quote_name(Ingredient._meta.db_table)
@@ -0,0 +1,32 @@
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from food.feed import add_authors
+from food.models import FeedEntry
+from users.models import Subscription
+
+
+class Command(BaseCommand):
+    help = (
+        "Заполнение лент подписчиков по существующим подпискам: "
+        "последние рецепты каждого автора, кроме популярных"
+    )
+
+    def handle(self, *args, **options):
+        authors = defaultdict(list)
+        for user_id, author_id in Subscription.objects.values_list(
+            "user_id", "subscribed_to_id"
+        ).iterator():
+            authors[user_id].append(author_id)
+        for user_id, author_ids in authors.items():
+            with transaction.atomic():
+                FeedEntry.objects.filter(user_id=user_id).delete()
+                add_authors(user_id, author_ids)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Ленты заполнены: {len(authors)} подписчиков, "
+                f"{FeedEntry.objects.count()} записей"
+            )
+        )
@@ -0,0 +1,72 @@
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from food.models import ShoppingList
+from food.shopping_list import compute_totals
+
+
+def normalize(totals):
+    return {key: Decimal(amount) for key, amount in totals.items()}
+
+
+class Command(BaseCommand):
+    help = "Пересчёт и проверка агрегатов ингредиентов в списках покупок"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Только проверить агрегаты, не исправляя их",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Количество списков покупок в одной пачке",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        checked = mismatched = 0
+        last_id = 0
+        while True:
+            with transaction.atomic():
+                shopping_lists = list(
+                    ShoppingList.objects.select_for_update()
+                    .filter(pk__gt=last_id)
+                    .order_by("pk")
+                    .only("ingredients")[:batch_size]
+                )
+                if not shopping_lists:
+                    break
+                last_id = shopping_lists[-1].pk
+                totals = compute_totals(
+                    [shopping_list.pk for shopping_list in shopping_lists]
+                )
+                stale = []
+                for shopping_list in shopping_lists:
+                    expected = totals[shopping_list.pk]
+                    if normalize(shopping_list.ingredients) != normalize(
+                        expected
+                    ):
+                        shopping_list.ingredients = expected
+                        stale.append(shopping_list)
+                if stale and not options["check"]:
+                    ShoppingList.objects.bulk_update(stale, ["ingredients"])
+            checked += len(shopping_lists)
+            mismatched += len(stale)
+
+        message = (
+            f"Проверено списков покупок: {checked}, "
+            f"расхождений: {mismatched}"
+        )
+        if options["check"]:
+            if mismatched:
+                raise CommandError(message)
+            self.stdout.write(self.style.SUCCESS(message))
+            return
+        self.stdout.write(
+            self.style.SUCCESS(f"{message}, исправлено: {mismatched}")
+        )
@@ -0,0 +1,92 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from food.models import FavoriteRecipe, Recipe
+from users.models import CustomUser, Subscription
+
+COUNTERS = (
+    (Recipe, "favorites_count", FavoriteRecipe, "recipe"),
+    (CustomUser, "recipes_count", Recipe, "author"),
+    (CustomUser, "subscribers_count", Subscription, "subscribed_to"),
+)
+
+
+def count_related(related_model, foreign_key):
+    return Coalesce(
+        Subquery(
+            related_model.objects.filter(**{foreign_key: OuterRef("pk")})
+            .order_by()
+            .values(foreign_key)
+            .annotate(count=Count("pk"))
+            .values("count")
+        ),
+        0,
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        "Пересчёт денормализованных счётчиков: избранное у рецептов, "
+        "рецепты и подписчики у пользователей"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Только проверить счётчики, не исправляя их",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=5000,
+            help="Количество записей в одной пачке",
+        )
+
+    def handle(self, *args, **options):
+        total_mismatched = 0
+        for model, field, related_model, foreign_key in COUNTERS:
+            checked, mismatched = self.reconcile(
+                model,
+                field,
+                count_related(related_model, foreign_key),
+                options["batch_size"],
+                options["check"],
+            )
+            total_mismatched += mismatched
+            self.stdout.write(
+                f"{model._meta.verbose_name_plural}.{field}: "
+                f"проверено {checked}, расхождений {mismatched}"
+            )
+        if options["check"] and total_mismatched:
+            raise CommandError(f"Расхождений в счётчиках: {total_mismatched}")
+        self.stdout.write(self.style.SUCCESS("Счётчики согласованы"))
+
+    def reconcile(self, model, field, expected, batch_size, check):
+        checked = mismatched = 0
+        last_id = 0
+        while True:
+            with transaction.atomic():
+                ids = list(
+                    model.objects.filter(pk__gt=last_id)
+                    .order_by("pk")
+                    .values_list("pk", flat=True)[:batch_size]
+                )
+                if not ids:
+                    break
+                last_id = ids[-1]
+                stale = list(
+                    model.objects.filter(pk__in=ids)
+                    .annotate(expected=expected)
+                    .exclude(**{field: F("expected")})
+                    .values_list("pk", flat=True)
+                )
+                if stale and not check:
+                    model.objects.filter(pk__in=stale).update(
+                        **{field: expected}
+                    )
+            checked += len(ids)
+            mismatched += len(stale)
+        return checked, mismatched
@@ -0,0 +1,55 @@
+# Generated by Django 5.1 on 2026-10-17 04:07
+
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+INDEXES = {
+    "food_recipe_search_vector_gin": "USING gin (search_vector)",
+    "food_recipe_name_trgm_gin": "USING gin (name gin_trgm_ops)",
+}
+
+
+def create_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for name, definition in INDEXES.items():
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {name} "
+            f"ON food_recipe {definition}"
+        )
+    Recipe = apps.get_model("food", "Recipe")
+    Recipe.objects.update(
+        search_vector=django.contrib.postgres.search.SearchVector(
+            "name", weight="A", config="russian"
+        )
+        + django.contrib.postgres.search.SearchVector(
+            "text", weight="B", config="russian"
+        )
+    )
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for name in INDEXES:
+        schema_editor.execute(f"DROP INDEX IF EXISTS {name}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("food", "0003_rename_recipes_shoppinglist_recipe_and_more"),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name="recipe",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True, verbose_name="Поисковый вектор"
+            ),
+        ),
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
@@ -0,0 +1,35 @@
+from collections import defaultdict
+
+from django.db import migrations
+from django.db.models import Sum
+
+
+def fill_ingredients(apps, schema_editor):
+    ShoppingList = apps.get_model("food", "ShoppingList")
+    RecipeIngredient = apps.get_model("food", "RecipeIngredient")
+    totals = defaultdict(dict)
+    rows = (
+        RecipeIngredient.objects.filter(recipe__shopping_lists__isnull=False)
+        .values_list("recipe__shopping_lists", "ingredient_id")
+        .annotate(total_amount=Sum("amount"))
+        .order_by()
+    )
+    for list_id, ingredient_id, total_amount in rows:
+        totals[list_id][str(ingredient_id)] = str(total_amount)
+    shopping_lists = list(ShoppingList.objects.only("ingredients"))
+    for shopping_list in shopping_lists:
+        shopping_list.ingredients = totals[shopping_list.pk]
+    ShoppingList.objects.bulk_update(
+        shopping_lists, ["ingredients"], batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("food", "0004_recipe_search_vector"),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_ingredients, migrations.RunPython.noop),
+    ]
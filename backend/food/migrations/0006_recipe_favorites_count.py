@@ -0,0 +1,58 @@
+# Generated by Django 5.1 on 2026-10-17 04:33
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+COUNTERS = (
+    ("food", "Recipe", "favorites_count", "food", "FavoriteRecipe", "recipe"),
+    ("users", "CustomUser", "recipes_count", "food", "Recipe", "author"),
+    (
+        "users",
+        "CustomUser",
+        "subscribers_count",
+        "users",
+        "Subscription",
+        "subscribed_to",
+    ),
+)
+
+
+def fill_counters(apps, schema_editor):
+    for app, model, field, related_app, related_model, foreign_key in COUNTERS:
+        related = apps.get_model(related_app, related_model).objects
+        apps.get_model(app, model).objects.update(
+            **{
+                field: Coalesce(
+                    Subquery(
+                        related.filter(**{foreign_key: OuterRef("pk")})
+                        .order_by()
+                        .values(foreign_key)
+                        .annotate(count=Count("pk"))
+                        .values("count")
+                    ),
+                    0,
+                )
+            }
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("food", "0005_fill_shopping_list_ingredients"),
+        ("users", "0003_user_counters"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="recipe",
+            name="favorites_count",
+            field=models.PositiveIntegerField(
+                default=0,
+                editable=False,
+                verbose_name="Количество добавлений в избранное",
+            ),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.1 on 2026-10-17 04:36
+
+from django.db import migrations, models
+
+
+def create_catalog_version(apps, schema_editor):
+    CatalogVersion = apps.get_model("food", "CatalogVersion")
+    CatalogVersion.objects.get_or_create(pk=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("food", "0006_recipe_favorites_count"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CatalogVersion",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "version",
+                    models.PositiveBigIntegerField(
+                        default=1, verbose_name="Версия справочников"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Версия справочников",
+                "verbose_name_plural": "Версии справочников",
+            },
+        ),
+        migrations.RunPython(
+            create_catalog_version, migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.1 on 2026-10-17 06:19
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("food", "0010_feed_entries"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="recipe",
+            name="created_at",
+            field=models.DateTimeField(
+                auto_now_add=True, verbose_name="Дата создания"
+            ),
+        ),
+        migrations.AlterField(
+            model_name="recipe",
+            name="updated_at",
+            field=models.DateTimeField(
+                auto_now=True, verbose_name="Дата изменения"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="recipe",
+            index=models.Index(
+                fields=["-created_at", "-id"], name="recipe_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="recipe",
+            index=models.Index(
+                fields=["-updated_at", "-id"], name="recipe_updated_idx"
+            ),
+        ),
+    ]
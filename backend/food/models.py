@@ -1,12 +1,31 @@
-import hashlib
-
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    SearchVector,
+    SearchVectorField,
+    TrigramSimilarity,
+)
 from django.core.validators import MinValueValidator
-from django.db import models
-from django.db.models import JSONField, UniqueConstraint
-
-from users.models import CustomUser
+from django.db import connections, models, transaction
+from django.db.models import (
+    Case,
+    Exists,
+    F,
+    FloatField,
+    JSONField,
+    OuterRef,
+    Q,
+    UniqueConstraint,
+    Value,
+    When,
+)
+
+from food.base62 import encode
+from users.counters import CounterFieldsMixin
+from users.models import CustomUser, Subscription
 
 MAX_LENGTH = 150
+SEARCH_CONFIG = "russian"
 
 
 class Tag(models.Model):
@@ -39,7 +58,100 @@ class Ingredient(models.Model):
         return f"{self.name} ({self.measurement_unit})"
 
 
-class Recipe(models.Model):
+class CatalogVersion(models.Model):
+    # Единственная строка; номер увеличивается при любом изменении тегов
+    # и ингредиентов и служит ETag для справочников.
+    version = models.PositiveBigIntegerField(
+        default=1, verbose_name="Версия справочников"
+    )
+
+    class Meta:
+        verbose_name = "Версия справочников"
+        verbose_name_plural = "Версии справочников"
+
+    def __str__(self):
+        return f"Версия справочников {self.version}"
+
+
+def get_recipe_prefetches():
+    return [
+        "tags",
+        models.Prefetch(
+            "recipeingredient_set",
+            queryset=RecipeIngredient.objects.select_related("ingredient"),
+        ),
+    ]
+
+
+class RecipeQuerySet(models.QuerySet):
+    def with_related(self):
+        return (
+            self.select_related("author")
+            .defer("search_vector")
+            .prefetch_related(*get_recipe_prefetches())
+        )
+
+    def with_user_flags(self, user):
+        if not user.is_authenticated:
+            return self
+        return self.annotate(
+            is_favorited=Exists(
+                FavoriteRecipe.objects.filter(user=user, recipe=OuterRef("pk"))
+            ),
+            is_in_shopping_cart=Exists(
+                ShoppingList.objects.filter(user=user, recipe=OuterRef("pk"))
+            ),
+            is_author_subscribed=Exists(
+                Subscription.objects.filter(
+                    user=user, subscribed_to=OuterRef("author")
+                )
+            ),
+        )
+
+    def is_postgresql(self):
+        return connections[self.db].vendor == "postgresql"
+
+    def search(self, query):
+        if not self.is_postgresql():
+            return (
+                self.filter(
+                    Q(name__icontains=query) | Q(text__icontains=query)
+                )
+                .annotate(
+                    rank=Case(
+                        When(name__icontains=query, then=Value(1.0)),
+                        default=Value(0.5),
+                        output_field=FloatField(),
+                    )
+                )
+                .order_by("-rank", "-id")
+            )
+        search_query = SearchQuery(
+            query, config=SEARCH_CONFIG, search_type="websearch"
+        )
+        return (
+            self.filter(
+                Q(search_vector=search_query) | Q(name__trigram_similar=query)
+            )
+            .annotate(
+                rank=SearchRank(F("search_vector"), search_query)
+                + TrigramSimilarity("name", query)
+            )
+            .order_by("-rank", "-id")
+        )
+
+    def update_search_vector(self):
+        if not self.is_postgresql():
+            return 0
+        return self.update(
+            search_vector=(
+                SearchVector("name", weight="A", config=SEARCH_CONFIG)
+                + SearchVector("text", weight="B", config=SEARCH_CONFIG)
+            )
+        )
+
+
+class Recipe(CounterFieldsMixin, models.Model):
     name = models.CharField(
         max_length=MAX_LENGTH, verbose_name="Название рецепта"
     )
@@ -56,6 +168,12 @@ class Recipe(models.Model):
         blank=True,
         verbose_name="Изображение рецепта",
     )
+    image_variants = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        verbose_name="Уменьшенные копии изображения",
+    )
     tags = models.ManyToManyField(
         Tag, related_name="recipes", blank=True, verbose_name="Теги"
     )
@@ -70,27 +188,59 @@ class Recipe(models.Model):
         null=True,
         verbose_name="Короткая ссылка",
     )
+    search_vector = SearchVectorField(
+        null=True, editable=False, verbose_name="Поисковый вектор"
+    )
+    favorites_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Количество добавлений в избранное",
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True, verbose_name="Дата создания"
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True, verbose_name="Дата изменения"
+    )
+
+    objects = RecipeQuerySet.as_manager()
+
+    counter_fields = ("favorites_count",)
 
     class Meta:
         verbose_name = "Рецепт"
         verbose_name_plural = "Рецепты"
+        indexes = [
+            # Курсор KeysetPagination ищет по паре (ключ сортировки, id).
+            models.Index(
+                fields=["-created_at", "-id"], name="recipe_created_idx"
+            ),
+            models.Index(
+                fields=["-updated_at", "-id"], name="recipe_updated_idx"
+            ),
+            # Ленты подписчиков читают свежие рецепты популярных авторов
+            # напрямую.
+            models.Index(
+                fields=["author", "-created_at", "-id"],
+                name="recipe_author_created_idx",
+            ),
+        ]
 
     def get_short_link(self):
         return self.short_link
 
     def save(self, *args, **kwargs):
-        if not self.short_link:
-            self.short_link = self.generate_short_link()
-        super().save(*args, **kwargs)
-
-    def generate_short_link(self):
-        hash_object = hashlib.md5(f"{self.id}{self.name}".encode())
-        short_hash = hash_object.hexdigest()[:6]
-
-        while Recipe.objects.filter(short_link=short_hash).exists():
-            short_hash = hashlib.md5(short_hash.encode()).hexdigest()[:6]
-
-        return short_hash
+        if not self.short_link and self.pk is not None:
+            self.short_link = encode(self.pk)
+        if self.short_link:
+            return super().save(*args, **kwargs)
+        # Код выводится из первичного ключа, поэтому назначается сразу
+        # после INSERT в той же транзакции (внутри внешней — без точки
+        # сохранения).
+        with transaction.atomic(using=kwargs.get("using"), savepoint=False):
+            super().save(*args, **kwargs)
+            self.short_link = encode(self.pk)
+            super().save(using=self._state.db, update_fields=["short_link"])
 
     def __str__(self):
         return f"Рецепт: {self.name} (Автор: {self.author.username})"
@@ -178,3 +328,49 @@ class FavoriteRecipe(models.Model):
             f"Рецепт {self.recipe.name} добавлен"
             f" в избранное пользователем {self.user.username}"
         )
+
+
+class FeedEntry(models.Model):
+    # Рецепт в ленте подписчика; строки добавляются при публикации
+    # (fan-out on write), для авторов с множеством подписчиков лента
+    # читает их рецепты напрямую.
+    user = models.ForeignKey(
+        CustomUser,
+        on_delete=models.CASCADE,
+        related_name="feed_entries",
+        verbose_name="Подписчик",
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name="feed_entries",
+        verbose_name="Рецепт",
+    )
+    author = models.ForeignKey(
+        CustomUser,
+        on_delete=models.CASCADE,
+        related_name="+",
+        verbose_name="Автор",
+    )
+    created_at = models.DateTimeField(verbose_name="Дата публикации")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "recipe"], name="unique_feed_entry"
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=["user", "-created_at", "-recipe"],
+                name="feed_entry_user_created_idx",
+            ),
+            models.Index(
+                fields=["user", "author"], name="feed_entry_user_author_idx"
+            ),
+        ]
+        verbose_name = "Запись ленты"
+        verbose_name_plural = "Записи ленты"
+
+    def __str__(self):
+        return f"{self.recipe_id} в ленте {self.user_id}"
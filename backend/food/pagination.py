@@ -1,20 +1,286 @@
-from rest_framework.pagination import PageNumberPagination
+import binascii
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime
+from operator import attrgetter
+
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ValidationError
+from django.core.paginator import InvalidPage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def estimate_count(queryset):
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return None
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
 
 
-class CustomPageNumberPagination(PageNumberPagination):
+class KeysetPagination(BasePagination):
+    cursor_query_param = "cursor"
+    count_query_param = "count"
     page_size_query_param = "limit"
-    page_query_param = "page"
-    max_page_size = (
-        1000  # Установите максимальный размер страницы, если необходимо
-    )
+    page_size = api_settings.PAGE_SIZE
+    max_page_size = 100
+    ordering = ("-pk",)
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.prepare(request, view)
+        self.count = self.get_count(queryset, request)
+        queryset, position, reverse = self.get_page_queryset(queryset)
+        return self.set_page(list(queryset), position, reverse)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        self.prepare(request, view)
+        self.count = await self.aget_count(queryset, request)
+        queryset, position, reverse = self.get_page_queryset(queryset)
+        results = [item async for item in queryset]
+        return self.set_page(results, position, reverse)
+
+    def prepare(self, request, view):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(view)
+
+    def get_page_queryset(self, queryset):
+        position, reverse = self.decode_cursor(self.request)
+        ordering = self.ordering
+        if reverse:
+            ordering = [self.invert(field) for field in ordering]
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            values = self.to_python(queryset, position)
+            queryset = queryset.filter(self.seek(ordering, values))
+        return queryset[: self.page_size + 1], position, reverse
+
+    def set_page(self, results, position, reverse):
+        has_more = len(results) > self.page_size
+        results = results[: self.page_size]
+        if reverse:
+            results.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = position is not None
+
+        self.page = results
+        return results
 
     def get_paginated_response(self, data):
         return Response(
             {
-                "count": self.page.paginator.count,
+                "count": self.count,
                 "next": self.get_next_link(),
                 "previous": self.get_previous_link(),
                 "results": data,
             }
         )
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def get_ordering(self, view):
+        if hasattr(view, "get_cursor_ordering"):
+            return view.get_cursor_ordering()
+        return getattr(view, "cursor_ordering", self.ordering)
+
+    def get_count(self, queryset, request):
+        mode = request.query_params.get(self.count_query_param, "exact")
+        if mode == "none":
+            return None
+        if mode == "estimate":
+            return estimate_count(queryset)
+        return queryset.count()
+
+    async def aget_count(self, queryset, request):
+        mode = request.query_params.get(self.count_query_param, "exact")
+        if mode == "none":
+            return None
+        if mode == "estimate":
+            return await sync_to_async(estimate_count)(queryset)
+        return await queryset.acount()
+
+    @staticmethod
+    def invert(field):
+        return field[1:] if field.startswith("-") else f"-{field}"
+
+    @staticmethod
+    def seek(ordering, position):
+        # (a, b) > (x, y)  <=>  a > x OR (a = x AND b > y)
+        condition = Q()
+        equal = {}
+        for field, value in zip(ordering, position):
+            name = field.lstrip("-")
+            lookup = "lt" if field.startswith("-") else "gt"
+            condition |= Q(**equal, **{f"{name}__{lookup}": value})
+            equal[name] = value
+        return condition
+
+    @staticmethod
+    def get_field(queryset, name):
+        if name in queryset.query.annotations:
+            return queryset.query.annotations[name].output_field
+        if name == "pk":
+            return queryset.model._meta.pk
+        return queryset.model._meta.get_field(name)
+
+    def to_python(self, queryset, position):
+        # Значения курсора приходят от клиента: приводим их к типам полей
+        # сортировки, чтобы мусор давал 404, а не ошибку в запросе.
+        try:
+            values = [
+                self.get_field(queryset, field.lstrip("-")).to_python(value)
+                for field, value in zip(self.ordering, position)
+            ]
+        except (ValidationError, TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if any(value is None for value in values):
+            raise NotFound(self.invalid_cursor_message)
+        return values
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            cursor = json.loads(urlsafe_b64decode(encoded.encode()))
+            position, reverse = cursor["p"], bool(cursor.get("r"))
+        except (binascii.Error, ValueError, KeyError, TypeError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != len(
+            self.ordering
+        ):
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    def encode_cursor(self, instance, reverse):
+        # DjangoJSONEncoder округляет время до миллисекунд, и курсор
+        # указывал бы раньше последней записи страницы.
+        position = [
+            self.encode_value(getattr(instance, field.lstrip("-")))
+            for field in self.ordering
+        ]
+        cursor = json.dumps(
+            {"p": position, "r": int(reverse)}, cls=DjangoJSONEncoder
+        )
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, "page")
+        return replace_query_param(
+            url,
+            self.cursor_query_param,
+            urlsafe_b64encode(cursor.encode()).decode(),
+        )
+
+    @staticmethod
+    def encode_value(value):
+        if isinstance(value, datetime):
+            return value.isoformat()
+        return value
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+
+class FeedPagination(KeysetPagination):
+    # Курсор по нескольким выборкам с полями created_at и recipe_id:
+    # из каждой читается страница после курсора, результаты сливаются.
+    ordering = ("-created_at", "-recipe_id")
+
+    def get_ordering(self, view):
+        return self.ordering
+
+    def paginate_sources(self, sources, request, view=None):
+        self.prepare(request, view)
+        self.count = None
+        merged = {}
+        for queryset in sources:
+            queryset, position, reverse = self.get_page_queryset(queryset)
+            for item in queryset:
+                merged.setdefault(item.recipe_id, item)
+        results = sorted(
+            merged.values(),
+            key=attrgetter("created_at", "recipe_id"),
+            reverse=not reverse,
+        )
+        return self.set_page(results, position, reverse)
+
+
+class KeysetOptInMixin:
+    keyset_pagination_class = KeysetPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        keyset_class = self.keyset_pagination_class
+        if keyset_class.cursor_query_param not in request.query_params:
+            return super().paginate_queryset(queryset, request, view)
+        self.keyset = keyset_class()
+        return self.keyset.paginate_queryset(queryset, request, view)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        keyset_class = self.keyset_pagination_class
+        if keyset_class.cursor_query_param in request.query_params:
+            self.keyset = keyset_class()
+            return await self.keyset.apaginate_queryset(
+                queryset, request, view
+            )
+        # Повторяет PageNumberPagination.paginate_queryset, но число
+        # записей и страница читаются асинхронным ORM.
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+        paginator = self.django_paginator_class(queryset, page_size)
+        paginator.count = await queryset.acount()
+        page_number = self.get_page_number(request, paginator)
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            raise NotFound(
+                self.invalid_page_message.format(
+                    page_number=page_number, message=str(exc)
+                )
+            )
+        self.page.object_list = [item async for item in self.page.object_list]
+        self.request = request
+        return list(self.page)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+
+class CustomPageNumberPagination(KeysetOptInMixin, PageNumberPagination):
+    page_size_query_param = "limit"
+    page_query_param = "page"
+    max_page_size = (
+        1000  # Установите максимальный размер страницы, если необходимо
+    )
@@ -0,0 +1,23 @@
+import json
+
+from rest_framework.renderers import BaseRenderer
+
+
+class FileRenderer(BaseRenderer):
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # Используется только для ошибок: сам файл отдаётся потоком.
+        if isinstance(data, str):
+            return data.encode(self.charset)
+        return json.dumps(data, ensure_ascii=False).encode(self.charset)
+
+
+class PlainTextRenderer(FileRenderer):
+    media_type = "text/plain"
+    format = "txt"
+
+
+class CSVRenderer(FileRenderer):
+    media_type = "text/csv"
+    format = "csv"
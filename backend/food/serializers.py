@@ -1,7 +1,14 @@
-from drf_extra_fields.fields import Base64ImageField
+import json
+from decimal import Decimal
+
+from django.db import transaction
+from django.http import QueryDict
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
 
+from food.catalog import catalog
+from food.images import variant_urls
+from food.ingredient_index import ingredient_index
 from food.models import (
     FavoriteRecipe,
     Ingredient,
@@ -10,8 +17,31 @@ from food.models import (
     ShoppingList,
     Tag,
 )
+from food.shopping_list import apply_recipe_change
+from food.uploads import ImageUploadField
 from users.models import Subscription
 
+# Те же ограничения, что у RecipeIngredient.amount.
+AMOUNT_FIELD = serializers.DecimalField(
+    max_digits=6, decimal_places=2, min_value=Decimal("0.01")
+)
+# Дробные id (1.9) отклоняются, а не усекаются.
+ID_FIELD = serializers.IntegerField()
+
+
+class ImageVariantsField(serializers.Field):
+    def __init__(self, image_field, **kwargs):
+        self.image_field = image_field
+        super().__init__(source="*", read_only=True, **kwargs)
+
+    def to_representation(self, instance):
+        request = self.context.get("request")
+        return variant_urls(
+            getattr(instance, self.image_field),
+            getattr(instance, f"{self.image_field}_variants"),
+            request.build_absolute_uri if request else str,
+        )
+
 
 class TagSerializer(serializers.ModelSerializer):
     class Meta:
@@ -44,7 +74,8 @@ class RecipeSerializer(serializers.ModelSerializer):
     )
     author = serializers.SerializerMethodField()
     tags = TagSerializer(many=True, read_only=True)
-    image = Base64ImageField(required=False, allow_null=True)
+    image = ImageUploadField(required=False, allow_null=True)
+    image_variants = ImageVariantsField("image")
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
 
@@ -59,6 +90,7 @@ class RecipeSerializer(serializers.ModelSerializer):
             "is_in_shopping_cart",
             "name",
             "image",
+            "image_variants",
             "text",
             "cooking_time",
         ]
@@ -70,6 +102,8 @@ class RecipeSerializer(serializers.ModelSerializer):
         return serializer.data
 
     def get_is_favorited(self, obj):
+        if hasattr(obj, "is_favorited"):
+            return obj.is_favorited
         request = self.context.get("request")
         if request and request.user.is_authenticated:
             return FavoriteRecipe.objects.filter(
@@ -78,6 +112,8 @@ class RecipeSerializer(serializers.ModelSerializer):
         return False
 
     def get_is_in_shopping_cart(self, obj):
+        if hasattr(obj, "is_in_shopping_cart"):
+            return obj.is_in_shopping_cart
         request = self.context.get("request")
         if request and request.user.is_authenticated:
             return ShoppingList.objects.filter(
@@ -85,101 +121,220 @@ class RecipeSerializer(serializers.ModelSerializer):
             ).exists()
         return False
 
+    def get_nested(self, name):
+        data = self.context["request"].data
+        if not isinstance(data, QueryDict):
+            return data.get(name, [])
+        # В multipart/form-data теги передаются повторяющимся полем,
+        # ингредиенты — JSON-строкой.
+        values = data.getlist(name)
+        if len(values) == 1 and values[0].lstrip().startswith("["):
+            try:
+                return json.loads(values[0])
+            except ValueError:
+                raise ValidationError(f"{name}: invalid JSON.")
+        return values
+
+    def has_nested(self, name):
+        return name in self.context["request"].data
+
     def validate(self, data):
         if self.instance is None and not data.get("image"):
             raise ValidationError("An image is required.")
 
-        tags_data = self.context["request"].data.get("tags", [])
-        ingredients_data = self.context["request"].data.get("ingredients", [])
+        # PATCH без тегов или ингредиентов оставляет их как есть.
+        if not self.partial or self.has_nested("tags"):
+            data["tags"] = self.get_tag_ids(self.get_nested("tags"))
+        if not self.partial or self.has_nested("ingredients"):
+            data["ingredients"] = self.get_ingredient_amounts(
+                self.get_nested("ingredients")
+            )
+        return data
 
+    def get_ids(self, values, error):
+        try:
+            return [ID_FIELD.to_internal_value(value) for value in values]
+        except (TypeError, ValidationError):
+            raise ValidationError(error)
+
+    def check_unknown(self, model, unknown, error):
+        # Справочники сверяются с кэшем в памяти; к базе — только если
+        # id нет в кэше (добавлен в другом процессе или не существует).
+        if not unknown:
+            return
+        if model.objects.filter(id__in=unknown).count() != len(unknown):
+            raise ValidationError(error)
+
+    def get_tag_ids(self, tags_data):
         if not tags_data:
             raise ValidationError("At least one tag is required.")
 
-        existing_tags = Tag.objects.filter(id__in=tags_data)
-        if len(existing_tags) != len(tags_data):
-            raise ValidationError("One or more tags do not exist.")
+        error = "One or more tags do not exist."
+        tag_ids = set(self.get_ids(tags_data, error))
+        self.check_unknown(Tag, tag_ids - catalog.get_tag_ids(), error)
+        return tag_ids
 
+    def get_ingredient_amounts(self, ingredients_data):
         if not ingredients_data:
             raise ValidationError("At least one ingredient is required.")
 
-        ingredient_ids = [ingredient["id"] for ingredient in ingredients_data]
-        existing_ingredients = Ingredient.objects.filter(id__in=ingredient_ids)
-        if len(existing_ingredients) != len(ingredient_ids):
-            raise ValidationError("One or more ingredients do not exist.")
-
-        seen_ingredient_ids = set()
-        for ingredient_data in ingredients_data:
-            if int(ingredient_data["amount"]) < 1:
-                raise ValidationError("Ingredient amount must be at least 1.")
-            if ingredient_data["id"] in seen_ingredient_ids:
-                raise ValidationError("Duplicate ingredients are not allowed.")
-            seen_ingredient_ids.add(ingredient_data["id"])
-
-        return data
-
-    def create_recipe_ingredients(self, recipe, ingredients_data):
-        recipe_ingredients = [
+        error = "One or more ingredients do not exist."
+        try:
+            ingredient_ids = self.get_ids(
+                [ingredient["id"] for ingredient in ingredients_data], error
+            )
+            raw_amounts = [
+                ingredient["amount"] for ingredient in ingredients_data
+            ]
+        except (KeyError, TypeError):
+            raise ValidationError("Each ingredient needs an id and an amount.")
+        if len(set(ingredient_ids)) != len(ingredient_ids):
+            raise ValidationError("Duplicate ingredients are not allowed.")
+        self.check_unknown(
+            Ingredient, ingredient_index.get_unknown(ingredient_ids), error
+        )
+
+        amounts = {}
+        for ingredient_id, amount in zip(ingredient_ids, raw_amounts):
+            try:
+                amounts[ingredient_id] = AMOUNT_FIELD.run_validation(amount)
+            except ValidationError as amount_error:
+                raise ValidationError(
+                    f"Ingredient {ingredient_id} amount: "
+                    f"{amount_error.detail[0]}"
+                )
+        return amounts
+
+    def update_tags(self, recipe, tag_ids, current_ids):
+        # Пишется только разница: оставшиеся связи не удаляются и не
+        # вставляются заново.
+        through = Recipe.tags.through
+        removed = current_ids - tag_ids
+        if removed:
+            through.objects.filter(recipe=recipe, tag_id__in=removed).delete()
+        through.objects.bulk_create(
+            through(recipe=recipe, tag_id=tag_id)
+            for tag_id in tag_ids - current_ids
+        )
+        return current_ids != tag_ids
+
+    def update_ingredients(self, recipe, amounts, current):
+        # current — строки RecipeIngredient по id ингредиента.
+        removed = [
+            row.pk
+            for ingredient_id, row in current.items()
+            if ingredient_id not in amounts
+        ]
+        changed = []
+        for ingredient_id, row in current.items():
+            if (
+                ingredient_id in amounts
+                and row.amount != amounts[ingredient_id]
+            ):
+                row.amount = amounts[ingredient_id]
+                changed.append(row)
+        added = [
             RecipeIngredient(
-                recipe=recipe,
-                ingredient_id=ingredient["id"],
-                amount=ingredient["amount"],
+                recipe=recipe, ingredient_id=ingredient_id, amount=amount
             )
-            for ingredient in ingredients_data
+            for ingredient_id, amount in amounts.items()
+            if ingredient_id not in current
         ]
-        RecipeIngredient.objects.bulk_create(recipe_ingredients)
-
+        if removed:
+            RecipeIngredient.objects.filter(pk__in=removed).delete()
+        if changed:
+            RecipeIngredient.objects.bulk_update(changed, ["amount"])
+        RecipeIngredient.objects.bulk_create(added)
+        return bool(removed or changed or added)
+
+    @transaction.atomic
     def create(self, validated_data):
-        tags_data = self.context["request"].data.get("tags", [])
-        ingredients_data = self.context["request"].data.get("ingredients", [])
+        tag_ids = validated_data.pop("tags")
+        amounts = validated_data.pop("ingredients")
 
         recipe = Recipe.objects.create(**validated_data)
 
-        recipe.tags.set(tags_data)
-        self.create_recipe_ingredients(recipe, ingredients_data)
+        self.update_tags(recipe, tag_ids, set())
+        self.update_ingredients(recipe, amounts, {})
 
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
-        tags_data = self.context["request"].data.get("tags", [])
-        ingredients_data = self.context["request"].data.get("ingredients", [])
+        tag_ids = validated_data.pop("tags", None)
+        amounts = validated_data.pop("ingredients", None)
 
         image = validated_data.pop("image", None)
+        update_fields = [
+            name
+            for name, value in validated_data.items()
+            if getattr(instance, name) != value
+        ]
+        for name in update_fields:
+            setattr(instance, name, validated_data[name])
         if image is not None:
             instance.image = image
-
-        instance = super().update(instance, validated_data)
-
-        # Обновляем теги и ингредиенты
-        instance.tags.set(tags_data)
-        instance.recipeingredient_set.all().delete()
-        self.create_recipe_ingredients(instance, ingredients_data)
+            update_fields.append("image")
+
+        related_changed = False
+        if tag_ids is not None or amounts is not None:
+            # Параллельные правки одного рецепта сравниваются с текущими
+            # строками по очереди.
+            list(
+                Recipe.objects.select_for_update()
+                .filter(pk=instance.pk)
+                .values_list("pk", flat=True)
+            )
+        if tag_ids is not None:
+            current_ids = set(
+                Recipe.tags.through.objects.filter(
+                    recipe=instance
+                ).values_list("tag_id", flat=True)
+            )
+            related_changed |= self.update_tags(instance, tag_ids, current_ids)
+        if amounts is not None:
+            current = {
+                row.ingredient_id: row
+                for row in RecipeIngredient.objects.filter(
+                    recipe=instance
+                ).only("id", "ingredient_id", "amount")
+            }
+            old_amounts = {
+                ingredient_id: row.amount
+                for ingredient_id, row in current.items()
+            }
+            if self.update_ingredients(instance, amounts, current):
+                related_changed = True
+                apply_recipe_change(instance.id, old_amounts, amounts)
+
+        if update_fields or related_changed:
+            # updated_at меняется и при правке одних тегов или
+            # ингредиентов: от него зависит ETag.
+            instance.save(update_fields=[*update_fields, "updated_at"])
 
         return instance
 
     def to_representation(self, instance):
         representation = super().to_representation(instance)
 
-        ingredients = instance.recipeingredient_set.all()
-        ingredients_representation = RecipeIngredientSerializer(
-            ingredients, many=True
-        ).data
-        representation["ingredients"] = ingredients_representation
-
         request = self.context.get("request")
         if request and request.user.is_authenticated:
-            author = instance.author
-            is_subscribed = Subscription.objects.filter(
-                user=request.user, subscribed_to=author
-            ).exists()
+            is_subscribed = getattr(instance, "is_author_subscribed", None)
+            if is_subscribed is None:
+                is_subscribed = Subscription.objects.filter(
+                    user=request.user, subscribed_to=instance.author
+                ).exists()
             representation["author"]["is_subscribed"] = is_subscribed
 
         return representation
 
 
 class RecipeShortSerializer(serializers.ModelSerializer):
+    image_variants = ImageVariantsField("image")
+
     class Meta:
         model = Recipe
-        fields = ["id", "name", "image", "cooking_time"]
+        fields = ["id", "name", "image", "image_variants", "cooking_time"]
 
 
 class FavoriteRecipeSerializer(serializers.ModelSerializer):
@@ -0,0 +1,178 @@
+import csv
+import json
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db.models import Sum
+
+from food.ingredient_index import ingredient_index
+from food.models import RecipeIngredient, ShoppingList
+
+HEADERS = ("Ингредиент", "Единица измерения", "Количество")
+BATCH_SIZE = 500
+
+ShoppingListRecipe = ShoppingList.recipe.through
+
+
+def get_recipe_amounts(recipe_ids):
+    amounts = defaultdict(lambda: defaultdict(Decimal))
+    for recipe_id, ingredient_id, amount in RecipeIngredient.objects.filter(
+        recipe_id__in=recipe_ids
+    ).values_list("recipe_id", "ingredient_id", "amount"):
+        amounts[recipe_id][ingredient_id] += amount
+    return amounts
+
+
+def merge_amounts(totals, amounts, sign=1):
+    for ingredient_id, amount in amounts.items():
+        key = str(ingredient_id)
+        total = Decimal(totals.get(key, 0)) + sign * amount
+        if total > 0:
+            totals[key] = str(total)
+        else:
+            totals.pop(key, None)
+
+
+def update_shopping_lists(list_ids, update):
+    list_ids = list(list_ids)
+    for start in range(0, len(list_ids), BATCH_SIZE):
+        shopping_lists = (
+            ShoppingList.objects.select_for_update()
+            .only("ingredients")
+            .in_bulk(list_ids[start:start + BATCH_SIZE])
+        )
+        for shopping_list in shopping_lists.values():
+            update(shopping_list)
+        ShoppingList.objects.bulk_update(
+            shopping_lists.values(), ["ingredients"]
+        )
+
+
+def apply_recipes(pairs, sign):
+    # pairs — пары (id списка покупок, id рецепта); sign=-1 вычитает.
+    pairs = list(pairs)
+    recipes_by_list = defaultdict(list)
+    for list_id, recipe_id in pairs:
+        recipes_by_list[list_id].append(recipe_id)
+    if not recipes_by_list:
+        return
+    amounts = get_recipe_amounts({recipe_id for _, recipe_id in pairs})
+
+    def update(shopping_list):
+        for recipe_id in recipes_by_list[shopping_list.id]:
+            merge_amounts(shopping_list.ingredients, amounts[recipe_id], sign)
+
+    update_shopping_lists(recipes_by_list, update)
+
+
+def apply_recipe_change(recipe_id, old_amounts, new_amounts=None):
+    if new_amounts is None:
+        new_amounts = get_recipe_amounts([recipe_id])[recipe_id]
+    delta = {
+        ingredient_id: new_amounts.get(ingredient_id, 0)
+        - old_amounts.get(ingredient_id, 0)
+        for ingredient_id in old_amounts.keys() | new_amounts.keys()
+    }
+    delta = {key: value for key, value in delta.items() if value}
+    if not delta:
+        return
+    list_ids = ShoppingListRecipe.objects.filter(
+        recipe_id=recipe_id
+    ).values_list("shoppinglist_id", flat=True)
+    update_shopping_lists(
+        list_ids,
+        lambda shopping_list: merge_amounts(shopping_list.ingredients, delta),
+    )
+
+
+def compute_totals(list_ids):
+    totals = {list_id: {} for list_id in list_ids}
+    rows = (
+        RecipeIngredient.objects.filter(recipe__shopping_lists__in=list_ids)
+        .values_list("recipe__shopping_lists", "ingredient_id")
+        .annotate(total_amount=Sum("amount"))
+        .order_by()
+    )
+    for list_id, ingredient_id, total_amount in rows:
+        if total_amount > 0:
+            totals[list_id][str(ingredient_id)] = str(total_amount)
+    return totals
+
+
+def get_shopping_list(user):
+    totals = (
+        ShoppingList.objects.filter(user=user)
+        .values_list("ingredients", flat=True)
+        .first()
+    ) or {}
+    ingredients = ingredient_index.get_many([int(key) for key in totals])
+    rows = defaultdict(Decimal)
+    for key, amount in totals.items():
+        ingredient = ingredients.get(int(key))
+        if ingredient is not None:
+            rows[
+                ingredient["name"], ingredient["measurement_unit"]
+            ] += Decimal(amount)
+    return sorted(
+        (name, measurement_unit, total_amount)
+        for (name, measurement_unit), total_amount in rows.items()
+    )
+
+
+def format_amount(amount):
+    if amount == amount.to_integral_value():
+        return f"{int(amount)}"
+    return f"{amount:.2f}"
+
+
+def iter_txt(rows, user):
+    max_len_name = max([len(HEADERS[0]), *(len(row[0]) for row in rows)])
+    max_len_unit = max([len(HEADERS[1]), *(len(row[1]) for row in rows)])
+    max_len_amount = max(
+        [len(HEADERS[2]), *(len(f"{row[2]:.2f}") for row in rows)]
+    )
+
+    yield f"Список покупок для пользователя: {user.email}\n\n"
+    yield (
+        f"{HEADERS[0].ljust(max_len_name)} | "
+        f"{HEADERS[1].ljust(max_len_unit)}"
+        f" | {HEADERS[2].rjust(max_len_amount)}\n"
+    )
+    yield "-" * (max_len_name + max_len_unit + max_len_amount + 6) + "\n"
+    for name, measurement_unit, total_amount in rows:
+        yield (
+            f"{name.ljust(max_len_name)} | "
+            f"{measurement_unit.ljust(max_len_unit)} | "
+            f"{format_amount(total_amount).rjust(max_len_amount)}\n"
+        )
+
+
+class Echo:
+    def write(self, value):
+        return value
+
+
+def iter_csv(rows, user):
+    writer = csv.writer(Echo())
+    yield writer.writerow(HEADERS)
+    for name, measurement_unit, total_amount in rows:
+        yield writer.writerow(
+            (name, measurement_unit, format_amount(total_amount))
+        )
+
+
+def iter_json(rows, user):
+    yield json.dumps(
+        [
+            {
+                "name": name,
+                "measurement_unit": measurement_unit,
+                "amount": json.loads(format_amount(total_amount)),
+            }
+            for name, measurement_unit, total_amount in rows
+        ],
+        ensure_ascii=False,
+    )
+
+
+WRITERS = {"txt": iter_txt, "csv": iter_csv, "json": iter_json}
@@ -0,0 +1,62 @@
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+
+from food.models import Recipe
+from foodgram.metrics import observe_cache
+
+
+class ShortLinkResolver:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()
+
+    def get_cached(self, code):
+        with self._lock:
+            recipe_id = None
+            if code in self._cache:
+                self._cache.move_to_end(code)
+                recipe_id = self._cache[code]
+        observe_cache("short_links", recipe_id is not None)
+        return recipe_id
+
+    def remember(self, code, recipe_id):
+        if recipe_id is None:
+            return None
+        with self._lock:
+            self._cache[code] = recipe_id
+            self._cache.move_to_end(code)
+            while len(self._cache) > settings.SHORT_LINK_CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return recipe_id
+
+    def get_queryset(self, code):
+        return Recipe.objects.filter(short_link=code).values_list(
+            "id", flat=True
+        )
+
+    def resolve(self, code):
+        recipe_id = self.get_cached(code)
+        if recipe_id is None:
+            recipe_id = self.remember(code, self.get_queryset(code).first())
+        return recipe_id
+
+    async def aresolve(self, code):
+        recipe_id = self.get_cached(code)
+        if recipe_id is None:
+            recipe_id = self.remember(
+                code, await self.get_queryset(code).afirst()
+            )
+        return recipe_id
+
+    def discard(self, code):
+        with self._lock:
+            self._cache.pop(code, None)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+
+short_link_resolver = ShortLinkResolver()
@@ -0,0 +1,125 @@
+from django.db import transaction
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+)
+from django.dispatch import receiver
+
+from food.catalog import catalog
+from food.feed import fan_out_recipe
+from food.images import discard_variants, image_pipeline
+from food.ingredient_index import ingredient_index
+from food.models import FavoriteRecipe, Ingredient, Recipe, Tag
+from food.shopping_list import ShoppingListRecipe, apply_recipes
+from food.short_links import short_link_resolver
+from users.counters import change_counter, change_counters
+from users.models import CustomUser
+
+
+@receiver([post_save, post_delete], sender=Ingredient)
+def invalidate_ingredient_index(sender, **kwargs):
+    ingredient_index.invalidate()
+
+
+@receiver([post_save, post_delete], sender=Tag)
+@receiver([post_save, post_delete], sender=Ingredient)
+def bump_catalog_version(sender, **kwargs):
+    catalog.bump()
+
+
+@receiver(post_save, sender=Recipe)
+def update_recipe_search_vector(sender, instance, update_fields, **kwargs):
+    if update_fields and not {"name", "text"} & set(update_fields):
+        return
+    Recipe.objects.filter(pk=instance.pk).update_search_vector()
+
+
+@receiver(post_save, sender=Recipe)
+def build_recipe_image_variants(sender, instance, update_fields, **kwargs):
+    image_pipeline.schedule(instance, update_fields)
+
+
+@receiver(post_delete, sender=Recipe)
+def delete_recipe_image_variants(sender, instance, **kwargs):
+    variants = instance.image_variants
+    transaction.on_commit(lambda: discard_variants(variants))
+
+
+@receiver(post_delete, sender=Recipe)
+def forget_recipe_short_link(sender, instance, **kwargs):
+    short_link_resolver.discard(instance.short_link)
+
+
+@receiver(m2m_changed, sender=ShoppingListRecipe)
+def update_shopping_list_totals(
+    sender, instance, action, reverse, pk_set, **kwargs
+):
+    if action not in ("post_add", "pre_remove", "pre_clear"):
+        return
+    if action == "post_add":
+        # pk_set содержит только действительно добавленные связи.
+        pairs = [
+            (pk, instance.pk) if reverse else (instance.pk, pk)
+            for pk in pk_set
+        ]
+        apply_recipes(pairs, sign=1)
+        return
+    if reverse:
+        pairs = ShoppingListRecipe.objects.filter(recipe_id=instance.pk)
+        if pk_set is not None:
+            pairs = pairs.filter(shoppinglist_id__in=pk_set)
+    else:
+        pairs = ShoppingListRecipe.objects.filter(shoppinglist_id=instance.pk)
+        if pk_set is not None:
+            pairs = pairs.filter(recipe_id__in=pk_set)
+    apply_recipes(pairs.values_list("shoppinglist_id", "recipe_id"), sign=-1)
+
+
+@receiver(pre_delete, sender=Recipe)
+def remove_recipe_from_shopping_lists(sender, instance, **kwargs):
+    apply_recipes(
+        ShoppingListRecipe.objects.filter(recipe_id=instance.pk).values_list(
+            "shoppinglist_id", "recipe_id"
+        ),
+        sign=-1,
+    )
+
+
+@receiver(post_save, sender=Recipe)
+def count_created_recipe(sender, instance, created, **kwargs):
+    if created:
+        change_counter(CustomUser, instance.author_id, "recipes_count", 1)
+
+
+@receiver(post_delete, sender=Recipe)
+def count_deleted_recipe(sender, instance, **kwargs):
+    change_counter(CustomUser, instance.author_id, "recipes_count", -1)
+
+
+# Последствия добавления и удаления избранного. Их вызывают и сигналы, и
+# пакетное представление, которое пишет без сигналов.
+def favorites_created(recipe_ids):
+    change_counters(Recipe, recipe_ids, "favorites_count", 1)
+
+
+def favorites_deleted(recipe_ids):
+    change_counters(Recipe, recipe_ids, "favorites_count", -1)
+
+
+@receiver(post_save, sender=FavoriteRecipe)
+def count_created_favorite(sender, instance, created, **kwargs):
+    if created:
+        favorites_created([instance.recipe_id])
+
+
+@receiver(post_delete, sender=FavoriteRecipe)
+def count_deleted_favorite(sender, instance, **kwargs):
+    favorites_deleted([instance.recipe_id])
+
+
+@receiver(post_save, sender=Recipe)
+def add_recipe_to_feeds(sender, instance, created, **kwargs):
+    if created:
+        fan_out_recipe(instance)
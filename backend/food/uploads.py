@@ -0,0 +1,74 @@
+import base64
+import binascii
+import io
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from drf_extra_fields.fields import Base64ImageField
+from PIL import Image
+from rest_framework.exceptions import ValidationError
+from rest_framework.fields import ImageField
+
+ALLOWED_FORMATS = {"JPEG", "PNG", "GIF", "WEBP"}
+# Сколько base64-символов декодируется для чтения заголовка.
+HEADER_CHARS = 64 * 1024
+
+
+def check_image_size(size):
+    if size > settings.IMAGE_UPLOAD_MAX_SIZE:
+        raise ValidationError(
+            f"Image is too large: {size} bytes, "
+            f"maximum is {settings.IMAGE_UPLOAD_MAX_SIZE}."
+        )
+
+
+def check_image_header(file):
+    # Image.open читает только заголовок: формат и размеры известны
+    # до декодирования пикселей.
+    try:
+        image = Image.open(file)
+    except Image.DecompressionBombError:
+        raise ValidationError("Image is too large.")
+    except (OSError, SyntaxError):
+        return False
+    if image.format not in ALLOWED_FORMATS:
+        raise ValidationError(f"Unsupported image format: {image.format}.")
+    if image.width * image.height > settings.IMAGE_MAX_PIXELS:
+        raise ValidationError(
+            f"Image is too large: {image.width}x{image.height} pixels."
+        )
+    return True
+
+
+class ImageUploadField(Base64ImageField):
+    # Принимает и base64-строку в JSON, и файл из multipart/form-data.
+    def to_internal_value(self, data):
+        if isinstance(data, UploadedFile):
+            check_image_size(data.size)
+            if not check_image_header(data):
+                raise ValidationError(self.INVALID_FILE_MESSAGE)
+            data.seek(0)
+            return ImageField.to_internal_value(self, data)
+        if isinstance(data, str) and data:
+            encoded = data.partition(";base64,")[2] or data
+            check_image_size(len(encoded) * 3 // 4)
+            prefix = encoded[:HEADER_CHARS - HEADER_CHARS % 4]
+            try:
+                header = base64.b64decode(prefix)
+            except (binascii.Error, ValueError):
+                raise ValidationError(self.INVALID_FILE_MESSAGE)
+            if (
+                not check_image_header(io.BytesIO(header))
+                and len(prefix) == len(encoded)
+            ):
+                raise ValidationError(self.INVALID_FILE_MESSAGE)
+        return super().to_internal_value(data)
+
+
+class TemporaryFileUploadMixin:
+    # Загружаемые файлы сразу пишутся во временный файл кусками, а не
+    # копятся в памяти процесса.
+    def initialize_request(self, request, *args, **kwargs):
+        request.upload_handlers = [TemporaryFileUploadHandler(request)]
+        return super().initialize_request(request, *args, **kwargs)
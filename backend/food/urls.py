@@ -2,6 +2,8 @@ from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
 from food.views import (
+    BatchFavoriteView,
+    BatchShoppingCartView,
     DownloadShoppingCart,
     FavoriteRecipeViewSet,
     GetShortLinkView,
@@ -48,5 +50,15 @@ urlpatterns = [
         DownloadShoppingCart.as_view(),
         name="download-shopping-cart",
     ),
+    path(
+        "recipes/shopping_cart/batch/",
+        BatchShoppingCartView.as_view(),
+        name="shopping-cart-batch",
+    ),
+    path(
+        "recipes/favorite/batch/",
+        BatchFavoriteView.as_view(),
+        name="favorite-batch",
+    ),
     path("", include(router.urls)),
 ]
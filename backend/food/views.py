@@ -1,32 +1,120 @@
-import os
+import hashlib
 
 from django.conf import settings
-from django.db.models import Sum
-from django.http import HttpResponse
-from django.shortcuts import get_object_or_404, redirect
+from django.db import transaction
+from django.db.models import prefetch_related_objects
+from django.http import (
+    Http404,
+    HttpResponse,
+    HttpResponseNotModified,
+    StreamingHttpResponse,
+)
+from django.shortcuts import redirect
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import parse_etags, quote_etag
 from rest_framework import status, viewsets
-from rest_framework.filters import SearchFilter
+from rest_framework.decorators import action
+from rest_framework.generics import get_object_or_404
 from rest_framework.permissions import (
     AllowAny,
     IsAuthenticated,
     IsAuthenticatedOrReadOnly,
 )
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 from rest_framework.views import APIView, View
 
-from food.models import FavoriteRecipe, Ingredient, Recipe, ShoppingList, Tag
-from food.pagination import CustomPageNumberPagination
+from food.batch import delete_rows, get_batch, lock_user, plan_batch
+from food.catalog import catalog
+from food.feed import get_feed_sources
+from food.ingredient_index import ingredient_index
+from food.models import (
+    FavoriteRecipe,
+    Ingredient,
+    Recipe,
+    ShoppingList,
+    Tag,
+    get_recipe_prefetches,
+)
+from food.pagination import CustomPageNumberPagination, FeedPagination
 from food.permissions import IsAuthorOrReadOnly
+from food.renderers import CSVRenderer, PlainTextRenderer
 from food.serializers import (
     IngredientSerializer,
-    RecipeIngredient,
     RecipeSerializer,
     RecipeShortSerializer,
     TagSerializer,
 )
+from food.shopping_list import WRITERS, get_shopping_list
+from food.short_links import short_link_resolver
+from food.signals import favorites_created, favorites_deleted
+from food.uploads import TemporaryFileUploadMixin
+
+USER_FLAGS = ("is_favorited", "is_in_shopping_cart", "is_author_subscribed")
+AUTHOR_FIELDS = (
+    "email",
+    "username",
+    "first_name",
+    "last_name",
+    "avatar",
+    "avatar_variants",
+)
+RECIPE_ORDERINGS = {"created_at", "-created_at", "updated_at", "-updated_at"}
+
+
+def get_catalog_etag(version):
+    return quote_etag(f"catalog-{version}")
+
+
+def is_not_modified(request, etag):
+    if_none_match = request.headers.get("If-None-Match", "")
+    return etag in parse_etags(if_none_match) or if_none_match == "*"
+
+
+def catalog_response(response, etag):
+    response["ETag"] = etag
+    response["Cache-Control"] = "no-cache"
+    patch_vary_headers(response, ["Accept"])
+    return response
+
 
+class CatalogCacheMixin:
+    # Ответ не зависит от пользователя, поэтому аутентификация не нужна,
+    # и условный GET обслуживается без обращения к базе.
+    authentication_classes = []
 
-class TagViewSet(viewsets.ModelViewSet):
+    def get_queryset(self):
+        # Тело кэшируется под версией из основной базы, поэтому и
+        # читается оттуда, а не с отстающей реплики.
+        return super().get_queryset().using("default")
+
+    def list(self, request, *args, **kwargs):
+        return self.get_cached(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_cached(super().retrieve, request, *args, **kwargs)
+
+    def get_cached(self, handler, request, *args, **kwargs):
+        version = catalog.get_version()
+        etag = get_catalog_etag(version)
+        if is_not_modified(request, etag):
+            return catalog_response(HttpResponseNotModified(), etag)
+        key = (request.get_full_path(), request.accepted_media_type)
+        body = catalog.get_body(version, key)
+        if body is None:
+            response = self.finalize_response(
+                request, handler(request, *args, **kwargs)
+            )
+            response.render()
+            body = response.content, response["Content-Type"]
+            catalog.set_body(version, key, body)
+        content, content_type = body
+        return catalog_response(
+            HttpResponse(content, content_type=content_type), etag
+        )
+
+
+class TagViewSet(CatalogCacheMixin, viewsets.ModelViewSet):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
@@ -34,34 +122,38 @@ class TagViewSet(viewsets.ModelViewSet):
     http_method_names = ["get"]
 
 
-class IngredientViewSet(viewsets.ModelViewSet):
+class IngredientViewSet(CatalogCacheMixin, viewsets.ModelViewSet):
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
     pagination_class = None
-
-    filter_backends = [SearchFilter]
-    search_fields = ["^name"]
-
     http_method_names = ["get"]
 
-    def get_queryset(self):
-        queryset = super().get_queryset()
-        name = self.request.query_params.get("name")
+    def list(self, request, *args, **kwargs):
+        name = request.query_params.get(
+            "name", request.query_params.get("search")
+        )
         if name:
-            name = name.lower()
-            queryset = queryset.filter(name__istartswith=name)
-        return queryset
+            return self.get_cached(self.search, request, name)
+        return super().list(request, *args, **kwargs)
+
+    def search(self, request, name):
+        return Response(ingredient_index.search(name))
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(TemporaryFileUploadMixin, viewsets.ModelViewSet):
     queryset = Recipe.objects.all()
     serializer_class = RecipeSerializer
     permission_classes = [IsAuthenticatedOrReadOnly, IsAuthorOrReadOnly]
     pagination_class = CustomPageNumberPagination
 
     def get_queryset(self):
-        queryset = super().get_queryset()
+        queryset = (
+            super()
+            .get_queryset()
+            .with_related()
+            .with_user_flags(self.request.user)
+        )
 
         author = self.request.query_params.get("author")
         if author:
@@ -81,17 +173,122 @@ class RecipeViewSet(viewsets.ModelViewSet):
         if is_in_shopping_cart == "1" and self.request.user.is_authenticated:
             queryset = queryset.filter(shopping_lists__user=self.request.user)
 
+        search = self.request.query_params.get("search")
+        if search:
+            queryset = queryset.search(search)
+
+        ordering = self.get_freshness_ordering()
+        if ordering:
+            queryset = queryset.order_by(*ordering)
+
+        if self.action in ("update", "partial_update", "destroy"):
+            # Связи для записи и удаления не нужны, ответ на правку
+            # строится в reload_instance.
+            queryset = queryset.prefetch_related(None)
         return queryset
 
+    def get_freshness_ordering(self):
+        ordering = self.request.query_params.get("ordering")
+        if ordering not in RECIPE_ORDERINGS:
+            return None
+        return (ordering, "-pk" if ordering.startswith("-") else "pk")
+
+    def get_cursor_ordering(self):
+        ordering = self.get_freshness_ordering()
+        if ordering:
+            return ordering
+        if self.request.query_params.get("search"):
+            return ("-rank", "-pk")
+        return ("-pk",)
+
+    def retrieve(self, request, *args, **kwargs):
+        # Условный GET обходится одним запросом за рецептом с флагами
+        # пользователя; теги и ингредиенты догружаются, только если
+        # клиенту нужен новый ответ.
+        instance = get_object_or_404(
+            self.get_queryset().prefetch_related(None), pk=kwargs["pk"]
+        )
+        self.check_object_permissions(request, instance)
+        response = self.get_conditional_response(instance)
+        if response is None:
+            prefetch_related_objects([instance], *get_recipe_prefetches())
+            response = Response(self.get_serializer(instance).data)
+        return self.set_cache_headers(response, instance)
+
+    def get_conditional_response(self, instance):
+        # Без Last-Modified: ответ зависит от флагов пользователя и
+        # данных автора, которые не меняют updated_at рецепта.
+        return get_conditional_response(
+            self.request, etag=self.get_recipe_etag(instance)
+        )
+
+    def set_cache_headers(self, response, instance):
+        response["ETag"] = self.get_recipe_etag(instance)
+        response["Cache-Control"] = "private, no-cache"
+        patch_vary_headers(response, ["Authorization", "Cookie"])
+        return response
+
+    def get_recipe_etag(self, instance):
+        fingerprint = ":".join(
+            str(value)
+            for value in (
+                instance.pk,
+                instance.updated_at.isoformat(),
+                catalog.get_version(),
+                self.request.user.pk,
+                *(getattr(instance, flag, None) for flag in USER_FLAGS),
+                *(getattr(instance.author, field) for field in AUTHOR_FIELDS),
+            )
+        )
+        digest = hashlib.md5(fingerprint.encode()).hexdigest()
+        return quote_etag(f"recipe-{digest}")
+
+    @action(detail=False, permission_classes=[IsAuthenticated])
+    def feed(self, request):
+        paginator = FeedPagination()
+        entries = paginator.paginate_sources(
+            get_feed_sources(request.user), request, self
+        )
+        recipes = (
+            Recipe.objects.with_related()
+            .with_user_flags(request.user)
+            .in_bulk([entry.recipe_id for entry in entries])
+        )
+        # Рецепт мог быть удалён между чтением ленты и самих рецептов.
+        serializer = self.get_serializer(
+            [
+                recipes[entry.recipe_id]
+                for entry in entries
+                if entry.recipe_id in recipes
+            ],
+            many=True,
+        )
+        return paginator.get_paginated_response(serializer.data)
+
     def perform_create(self, serializer):
-        instance = serializer.save(author=self.request.user)
-        return instance
+        serializer.save(author=self.request.user)
+        self.reload_instance(serializer)
+
+    def perform_update(self, serializer):
+        serializer.save()
+        self.reload_instance(serializer)
+
+    def reload_instance(self, serializer):
+        # Ответ строится по рецепту, заново выбранному с тегами,
+        # ингредиентами и флагами пользователя, а не запросом на связь.
+        serializer.instance = (
+            Recipe.objects.with_related()
+            .with_user_flags(self.request.user)
+            .get(pk=serializer.instance.pk)
+        )
 
 
 class RedirectShortLinkView(View):
     def get(self, request, short_hash):
-        recipe = get_object_or_404(Recipe, short_link=short_hash)
-        return redirect(f"{settings.BASE_URL}recipes/{recipe.id}/")
+        recipe_id = short_link_resolver.resolve(short_hash)
+        if recipe_id is None:
+            raise Http404
+        return redirect(f"{settings.BASE_URL}recipes/{recipe_id}/")
 
 
 class GetShortLinkView(APIView):
@@ -120,8 +317,12 @@ class ShoppingCartMixin:
     def get_recipe(self, recipe_id):
         return get_object_or_404(Recipe, id=recipe_id)
 
+    @transaction.atomic
     def add_item(self, request, model, name, *args, **kwargs):
         recipe = self.get_recipe(self.kwargs.get("recipe_id"))
+        # Та же блокировка, что у пакетных представлений: иначе
+        # параллельная пачка вставит ту же связь между exists() и create().
+        lock_user(request.user)
 
         if model.objects.filter(user=request.user, recipe=recipe).exists():
             return Response(
@@ -167,80 +368,18 @@ class ManageShoppingCart(APIView, ShoppingCartMixin):
 
 class DownloadShoppingCart(APIView):
     permission_classes = [IsAuthenticated]
+    renderer_classes = [PlainTextRenderer, CSVRenderer, JSONRenderer]
 
     def get(self, request):
-        user = request.user
-
-        try:
-            shopping_list = ShoppingList.objects.get(user=user)
-        except ShoppingList.DoesNotExist:
-            return Response("No shopping list found.", status=404)
-
-        ingredients = (
-            RecipeIngredient.objects.filter(
-                recipe__in=shopping_list.recipe.all()
-            )
-            .values("ingredient__name", "ingredient__measurement_unit")
-            .annotate(total_amount=Sum("amount"))
-        )
-
-        max_len_name = max(
-            len("Ингредиент"),
-            max(len(item["ingredient__name"]) for item in ingredients),
-        )
-        max_len_unit = max(
-            len("Единица измерения"),
-            max(
-                len(item["ingredient__measurement_unit"])
-                for item in ingredients
-            ),
+        renderer = request.accepted_renderer
+        rows = get_shopping_list(request.user)
+        response = StreamingHttpResponse(
+            WRITERS[renderer.format](rows, request.user),
+            content_type=f"{renderer.media_type}; charset=utf-8",
         )
-        max_len_amount = max(
-            len("Количество"),
-            max(len(f"{item['total_amount']:.2f}") for item in ingredients),
+        response["Content-Disposition"] = (
+            f'attachment; filename="shopping_list.{renderer.format}"'
         )
-
-        file_path = os.path.join(
-            os.path.dirname(__file__), "shopping_list.txt"
-        )
-
-        with open(file_path, "w", encoding="utf-8") as file:
-            file.write(f"Список покупок для пользователя: {user.email}\n\n")
-
-            file.write(
-                (
-                    f"{'Ингредиент'.ljust(max_len_name)} | "
-                    f"{'Единица измерения'.ljust(max_len_unit)}"
-                    f" | {'Количество'.rjust(max_len_amount)}\n"
-                )
-            )
-            file.write(
-                "-" * (max_len_name + max_len_unit + max_len_amount + 6) + "\n"
-            )
-
-            for item in ingredients:
-                name = item["ingredient__name"].ljust(max_len_name)
-                measurement_unit = item["ingredient__measurement_unit"].ljust(
-                    max_len_unit
-                )
-                total_amount = item["total_amount"]
-
-                if total_amount == total_amount.to_integral_value():
-                    total_amount = f"{int(total_amount)}"
-                else:
-                    total_amount = f"{total_amount:.2f}"
-
-                total_amount = total_amount.rjust(max_len_amount)
-                file.write(f"{name} | {measurement_unit} | {total_amount}\n")
-
-        with open(file_path, "r", encoding="utf-8") as file:
-            response = HttpResponse(file.read(), content_type="text/plain")
-            response["Content-Disposition"] = (
-                'attachment; filename="shopping_list.txt"'
-            )
-
-        os.remove(file_path)
-
         return response
 
 
@@ -253,9 +392,10 @@ class FavoriteRecipeViewSet(viewsets.ViewSet, ShoppingCartMixin):
         )
 
     def destroy(self, request, recipe_id):
-        recipe, favorite_recipe = self.get_recipe_and_shopping_list(
-            request.user, recipe_id, FavoriteRecipe
-        )
+        recipe = self.get_recipe(recipe_id)
+        favorite_recipe = FavoriteRecipe.objects.filter(
+            user=request.user, recipe=recipe
+        ).first()
 
         if not favorite_recipe:
             return Response(
@@ -268,3 +408,61 @@ class FavoriteRecipeViewSet(viewsets.ViewSet, ShoppingCartMixin):
             {"detail": "Recipe removed from favorites."},
             status=status.HTTP_204_NO_CONTENT,
         )
+
+
+class BatchShoppingCartView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    @transaction.atomic
+    def post(self, request):
+        add, remove, ids = get_batch(request)
+        lock_user(request.user)
+        found = set(
+            Recipe.objects.filter(pk__in=ids).values_list("pk", flat=True)
+        )
+        shopping_list = ShoppingList.objects.filter(user=request.user).first()
+        if shopping_list is None:
+            # Пользователь заблокирован lock_user, поэтому список создаётся
+            # без get_or_create, и в новом списке искать рецепты незачем.
+            shopping_list = ShoppingList.objects.create(user=request.user)
+            existing = set()
+        else:
+            existing = set(
+                shopping_list.recipe.filter(pk__in=ids).values_list(
+                    "pk", flat=True
+                )
+            )
+        results, added, removed = plan_batch(add, remove, found, existing)
+        # Итоги списка покупок пересчитываются сигналом m2m_changed один
+        # раз на всю пачку.
+        if added:
+            shopping_list.recipe.add(*added)
+        if removed:
+            shopping_list.recipe.remove(*removed)
+        return Response({"results": results})
+
+
+class BatchFavoriteView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    @transaction.atomic
+    def post(self, request):
+        add, remove, ids = get_batch(request)
+        lock_user(request.user)
+        found = set(
+            Recipe.objects.filter(pk__in=ids).values_list("pk", flat=True)
+        )
+        favorites = FavoriteRecipe.objects.filter(
+            user=request.user, recipe_id__in=ids
+        )
+        existing = set(favorites.values_list("recipe_id", flat=True))
+        results, added, removed = plan_batch(add, remove, found, existing)
+        FavoriteRecipe.objects.bulk_create(
+            FavoriteRecipe(user=request.user, recipe_id=recipe_id)
+            for recipe_id in added
+        )
+        if removed:
+            delete_rows(favorites.filter(recipe_id__in=removed))
+        favorites_created(added)
+        favorites_deleted(removed)
+        return Response({"results": results})
@@ -0,0 +1,8 @@
+from django.urls import include, path
+
+from foodgram.urls import urlpatterns as sync_urlpatterns
+
+urlpatterns = [
+    path("api/", include("food.async_urls")),
+    *sync_urlpatterns,
+]
@@ -0,0 +1,68 @@
+import threading
+import time
+
+from django.db.backends.postgresql.base import (
+    DatabaseWrapper as PostgresDatabaseWrapper,
+)
+
+try:
+    from psycopg_pool import PoolTimeout
+except ImportError:
+    PoolTimeout = None
+
+
+class ConnectionStats:
+    # Счётчики получения соединений в рамках одного процесса-воркера.
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.checkouts = 0
+        self.checkout_time = 0.0
+        self.max_checkout_time = 0.0
+        self.timeouts = 0
+
+    def record(self, duration, timeout=False):
+        with self.lock:
+            if timeout:
+                self.timeouts += 1
+                return
+            self.checkouts += 1
+            self.checkout_time += duration
+            self.max_checkout_time = max(self.max_checkout_time, duration)
+
+    def as_dict(self):
+        with self.lock:
+            return {
+                "checkouts": self.checkouts,
+                "checkout_ms_total": round(self.checkout_time * 1000, 3),
+                "checkout_ms_max": round(self.max_checkout_time * 1000, 3),
+                "timeouts": self.timeouts,
+            }
+
+
+connection_stats = {}
+
+
+def get_connection_stats(alias):
+    return connection_stats.setdefault(alias, ConnectionStats())
+
+
+class DatabaseWrapper(PostgresDatabaseWrapper):
+    # PostgreSQL с замером времени получения соединения: нового
+    # подключения или выдачи из пула, включая ожидание свободного.
+    def get_new_connection(self, conn_params):
+        stats = get_connection_stats(self.alias)
+        start = time.perf_counter()
+        try:
+            connection = super().get_new_connection(conn_params)
+        except Exception as error:
+            if PoolTimeout is not None and isinstance(error, PoolTimeout):
+                stats.record(time.perf_counter() - start, timeout=True)
+            raise
+        stats.record(time.perf_counter() - start)
+        return connection
+
+    def get_pool_stats(self):
+        stats = get_connection_stats(self.alias).as_dict()
+        stats["persistent"] = self.settings_dict["CONN_MAX_AGE"] != 0
+        stats["pool"] = self.pool.get_stats() if self.pool else None
+        return stats
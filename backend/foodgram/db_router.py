@@ -0,0 +1,46 @@
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+
+# Реплика, выбранная для чтения в текущем запросе: все его запросы
+# видят одно и то же состояние данных. Вне запросов (команды, фоновые
+# потоки, сигналы) всё идёт в основную базу.
+read_replica = ContextVar("read_replica", default=None)
+
+
+def choose_replica():
+    return random.choice(settings.REPLICA_DATABASES)
+
+
+def is_pinned(request):
+    return request.COOKIES.get(settings.REPLICA_PIN_COOKIE) is not None
+
+
+def pin(response):
+    response.set_cookie(
+        settings.REPLICA_PIN_COOKIE,
+        "1",
+        max_age=settings.REPLICA_PIN_SECONDS,
+        httponly=True,
+        samesite="Lax",
+    )
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        replica = read_replica.get()
+        if replica is None or connections["default"].in_atomic_block:
+            return "default"
+        return replica
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики содержат те же данные, что и основная база.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == "default"
@@ -0,0 +1,99 @@
+import os
+
+from prometheus_client import (
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+METHODS = {"GET", "HEAD", "OPTIONS", "POST", "PUT", "PATCH", "DELETE"}
+
+REQUEST_DURATION = Histogram(
+    "foodgram_request_duration_seconds",
+    "Request latency by view",
+    ["view", "method"],
+    buckets=LATENCY_BUCKETS,
+)
+REQUESTS = Counter(
+    "foodgram_requests",
+    "Requests by view and status code",
+    ["view", "method", "status"],
+)
+REQUEST_QUERIES = Histogram(
+    "foodgram_request_db_queries",
+    "SQL queries per request by view",
+    ["view"],
+    buckets=QUERY_BUCKETS,
+)
+REQUEST_DB_DURATION = Histogram(
+    "foodgram_request_db_duration_seconds",
+    "Time spent in SQL per request by view",
+    ["view"],
+    buckets=LATENCY_BUCKETS,
+)
+RESPONSE_SIZE = Histogram(
+    "foodgram_response_size_bytes",
+    "Response body size by view",
+    ["view"],
+    buckets=SIZE_BUCKETS,
+)
+CACHE_LOOKUPS = Counter(
+    "foodgram_cache_lookups",
+    "In-process cache lookups",
+    ["cache", "result"],
+)
+
+
+def get_view_name(request):
+    # Имя класса DRF с действием (RecipeViewSet.list) или имя функции;
+    # нераспознанные адреса сводятся в одну метку.
+    match = request.resolver_match
+    if match is None:
+        return "unresolved"
+    cls = getattr(match.func, "cls", None)
+    if cls is None:
+        return match.func.__name__
+    action = (getattr(match.func, "actions", None) or {}).get(
+        request.method.lower()
+    )
+    return f"{cls.__name__}.{action}" if action else cls.__name__
+
+
+def get_response_size(response):
+    if not response.streaming:
+        return len(response.content)
+    if response.has_header("Content-Length"):
+        return int(response["Content-Length"])
+    return None
+
+
+def observe_request(request, response, duration, stats):
+    view = get_view_name(request)
+    method = request.method if request.method in METHODS else "other"
+    REQUEST_DURATION.labels(view, method).observe(duration)
+    REQUESTS.labels(view, method, response.status_code).inc()
+    REQUEST_QUERIES.labels(view).observe(stats.count)
+    REQUEST_DB_DURATION.labels(view).observe(stats.duration)
+    size = get_response_size(response)
+    if size is not None:
+        RESPONSE_SIZE.labels(view).observe(size)
+
+
+def observe_cache(cache, hit):
+    CACHE_LOOKUPS.labels(cache, "hit" if hit else "miss").inc()
+
+
+def render_metrics():
+    # Под gunicorn (gunicorn.conf.py) каждый воркер пишет значения в
+    # файлы PROMETHEUS_MULTIPROC_DIR, здесь они суммируются.
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        return generate_latest(REGISTRY)
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry)
@@ -0,0 +1,164 @@
+import logging
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from asgiref.sync import (
+    iscoroutinefunction,
+    markcoroutinefunction,
+    sync_to_async,
+)
+from django.conf import settings
+from django.db import connections
+
+from foodgram.db_router import choose_replica, is_pinned, pin, read_replica
+from foodgram.metrics import observe_request
+
+logger = logging.getLogger("foodgram.queries")
+
+
+class QueryStats:
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            self.statements[sql] += 1
+
+    @property
+    def duplicates(self):
+        # Одинаковый SQL с разными параметрами — характерный признак N+1.
+        return sum(n - 1 for n in self.statements.values() if n > 1)
+
+
+def get_query_budget(url_name, method):
+    budgets = settings.QUERY_BUDGETS
+    if (url_name, method) in budgets:
+        return budgets[url_name, method]
+    return budgets.get(url_name, settings.QUERY_BUDGET_DEFAULT)
+
+
+class QueryCountMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        stats = QueryStats()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            self.wrap_connections(stack, stats)
+            response = self.get_response(request)
+        return self.report(
+            request, response, stats, time.perf_counter() - start
+        )
+
+    async def __acall__(self, request):
+        # Асинхронный ORM выполняет запросы в отдельном потоке запроса,
+        # поэтому обёртки ставятся на соединения именно этого потока.
+        stats = QueryStats()
+        start = time.perf_counter()
+        stack = ExitStack()
+        await sync_to_async(self.wrap_connections)(stack, stats)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+        return self.report(
+            request, response, stats, time.perf_counter() - start
+        )
+
+    @staticmethod
+    def wrap_connections(stack, stats):
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(stats))
+
+    def report(self, request, response, stats, duration):
+        observe_request(request, response, duration, stats)
+        url_name = (
+            request.resolver_match.url_name if request.resolver_match else None
+        )
+        budget = get_query_budget(url_name, request.method)
+        if stats.count > budget:
+            logger.warning(
+                "%s %s (%s) exceeded query budget: %d > %d, "
+                "%.1f ms, %d duplicate(s)",
+                request.method,
+                request.path,
+                url_name,
+                stats.count,
+                budget,
+                stats.duration * 1000,
+                stats.duplicates,
+            )
+
+        if settings.QUERY_COUNT_HEADER:
+            response["X-DB-Query-Count"] = stats.count
+            response["X-DB-Query-Time"] = f"{stats.duration * 1000:.1f}"
+            response["X-DB-Duplicate-Queries"] = stats.duplicates
+            response["X-DB-Query-Budget"] = budget
+        return response
+
+
+class ReplicaRoutingMiddleware:
+    # Читающие запросы идут на реплики; после записи клиент получает
+    # cookie и REPLICA_PIN_SECONDS читает только основную базу, чтобы
+    # не увидеть данные, ещё не дошедшие до реплики.
+    sync_capable = True
+    async_capable = True
+    safe_methods = ("GET", "HEAD", "OPTIONS")
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        token = read_replica.set(self.get_replica(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            read_replica.reset(token)
+        return self.process_response(request, response)
+
+    async def __acall__(self, request):
+        token = read_replica.set(self.get_replica(request))
+        try:
+            response = await self.get_response(request)
+        finally:
+            read_replica.reset(token)
+        return self.process_response(request, response)
+
+    def get_replica(self, request):
+        if (
+            settings.REPLICA_DATABASES
+            and request.method in self.safe_methods
+            and not is_pinned(request)
+        ):
+            return choose_replica()
+        return None
+
+    def process_response(self, request, response):
+        if (
+            settings.REPLICA_DATABASES
+            and request.method not in self.safe_methods
+        ):
+            pin(response)
+        return response
@@ -1,4 +1,5 @@
 import os
+from datetime import timedelta
 from pathlib import Path
 
 from django.core.management.utils import get_random_secret_key
@@ -23,6 +24,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "food.apps.FoodConfig",
     "rest_framework",
     "rest_framework.authtoken",
@@ -31,6 +33,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "foodgram.middleware.QueryCountMiddleware",
+    "foodgram.middleware.ReplicaRoutingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -40,7 +44,11 @@ MIDDLEWARE = [
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
-ROOT_URLCONF = "foodgram.urls"
+# Под ASGI (foodgram/asgi.py) читающие эндпоинты рецептов, тегов,
+# ингредиентов и коротких ссылок обслуживаются асинхронными
+# представлениями.
+ASYNC_VIEWS = os.getenv("ASYNC_VIEWS", "").lower() == "true"
+ROOT_URLCONF = "foodgram.asgi_urls" if ASYNC_VIEWS else "foodgram.urls"
 
 TEMPLATES = [
     {
@@ -71,14 +79,51 @@ if DEBUG:
 else:
     DATABASES = {
         "default": {
-            "ENGINE": "django.db.backends.postgresql",
+            "ENGINE": "foodgram.db_backend",
             "NAME": os.getenv("POSTGRES_DB", "django"),
             "USER": os.getenv("POSTGRES_USER", "django"),
             "PASSWORD": os.getenv("POSTGRES_PASSWORD", ""),
             "HOST": os.getenv("DB_HOST", ""),
             "PORT": os.getenv("DB_PORT", 5432),
+            # Соединение проверяется перед повторным использованием.
+            "CONN_HEALTH_CHECKS": True,
         }
     }
+    # DB_POOL=true включает пул psycopg в каждом воркере, иначе
+    # соединение живёт DB_CONN_MAX_AGE секунд между запросами. Под ASGI
+    # запросы обслуживаются в разных потоках, поэтому постоянные
+    # соединения там по умолчанию выключены — используйте пул.
+    if os.getenv("DB_POOL", "").lower() == "true":
+        DATABASES["default"]["OPTIONS"] = {
+            "pool": {
+                "min_size": int(os.getenv("DB_POOL_MIN_SIZE", 1)),
+                "max_size": int(os.getenv("DB_POOL_MAX_SIZE", 4)),
+                "timeout": float(os.getenv("DB_POOL_TIMEOUT", 10)),
+            }
+        }
+    else:
+        DATABASES["default"]["CONN_MAX_AGE"] = int(
+            os.getenv("DB_CONN_MAX_AGE", 0 if ASYNC_VIEWS else 60)
+        )
+
+# Реплики только для чтения: через запятую хосты PostgreSQL, а в режиме
+# SQLite — пути к файлам (копиям основной базы).
+REPLICA_DATABASES = []
+for number, replica in enumerate(
+    filter(None, os.getenv("DB_REPLICAS", "").split(",")), 1
+):
+    alias = f"replica{number}"
+    DATABASES[alias] = {
+        **DATABASES["default"],
+        ("NAME" if DEBUG else "HOST"): replica.strip(),
+        "TEST": {"MIRROR": "default"},
+    }
+    REPLICA_DATABASES.append(alias)
+DATABASE_ROUTERS = ["foodgram.db_router.ReplicaRouter"]
+# Сколько секунд после записи клиент читает только из основной базы;
+# должно превышать типичное отставание реплик.
+REPLICA_PIN_SECONDS = int(os.getenv("REPLICA_PIN_SECONDS", 10))
+REPLICA_PIN_COOKIE = "db_pin"
 
 
 AUTH_USER_MODEL = "users.CustomUser"
@@ -99,6 +144,7 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
+        "users.authentication.SignedTokenAuthentication",
         "rest_framework.authentication.TokenAuthentication",
     ),
     "DEFAULT_PERMISSION_CLASSES": (
@@ -111,7 +157,27 @@ REST_FRAMEWORK = {
         "rest_framework.pagination." "LimitOffsetPagination"
     ),
     "PAGE_SIZE": 10,
+    "EXCEPTION_HANDLER": "users.exceptions.exception_handler",
 }
+# SIGNED_TOKENS=true: auth/token/login/ выдаёт подписанные токены
+# доступа (в поле auth_token) и обновления; запросы с ними
+# аутентифицируются без обращения к базе. Ключи, выданные раньше,
+# продолжают работать.
+SIGNED_TOKENS = os.getenv("SIGNED_TOKENS", "").lower() == "true"
+SIMPLE_JWT = {
+    "ACCESS_TOKEN_LIFETIME": timedelta(
+        minutes=int(os.getenv("JWT_ACCESS_MINUTES", 15))
+    ),
+    "REFRESH_TOKEN_LIFETIME": timedelta(
+        days=int(os.getenv("JWT_REFRESH_DAYS", 7))
+    ),
+    "ROTATE_REFRESH_TOKENS": True,
+    "AUTH_HEADER_TYPES": ("Token", "Bearer"),
+}
+# Список отозванных токенов перечитывается не чаще раза в
+# JWT_DENYLIST_TTL секунд.
+JWT_DENYLIST_TTL = int(os.getenv("JWT_DENYLIST_TTL", 5))
+
 DJOSER = {
     "HIDE_USERS": False,
     "PERMISSIONS": {
@@ -125,6 +191,105 @@ DJOSER = {
     },
 }
 
+# Допустимое число SQL-запросов на запрос к эндпоинту: по имени маршрута
+# или по паре (имя маршрута, метод), если запись дороже чтения.
+# Учитывается и запрос аутентификации по токену.
+QUERY_COUNT_HEADER = DEBUG
+QUERY_BUDGET_DEFAULT = 10
+QUERY_BUDGETS = {
+    "api-root": 1,
+    "tag-list": 2,
+    "tag-detail": 2,
+    "ingredient-list": 2,
+    "ingredient-detail": 2,
+    "recipe-list": 6,
+    # Вставка рецепта со связями и раскладка по лентам; плюс чтение
+    # справочников для проверки id при холодном кэше.
+    ("recipe-list", "POST"): 15,
+    # Плюс чтение версии справочников не чаще раза в CATALOG_VERSION_TTL.
+    "recipe-detail": 5,
+    # Разница связей, пересчёт списков покупок с этим рецептом и чтение
+    # справочников при холодном кэше.
+    ("recipe-detail", "PATCH"): 20,
+    ("recipe-detail", "PUT"): 20,
+    ("recipe-detail", "DELETE"): 12,
+    "recipe-favorite": 5,
+    # Добавление блокирует пользователя в транзакции, как пакетные
+    # представления.
+    ("recipe-favorite", "POST"): 8,
+    "recipe-get-link": 2,
+    "manage-shopping-cart": 9,
+    # Первое добавление создаёт список покупок; пользователь блокируется
+    # в транзакции, как в пакетных представлениях.
+    ("manage-shopping-cart", "POST"): 14,
+    # Плюс построение индекса ингредиентов раз в INGREDIENT_INDEX_TTL.
+    "download-shopping-cart": 2,
+    "short_link": 1,
+    # Плюс чтение отозванных подписанных токенов раз в JWT_DENYLIST_TTL.
+    "user-me": 2,
+    "user-avatar-update": 3,
+    "user-subscriptions-list": 4,
+    # Плюс заполнение ленты подписчика рецептами автора.
+    "user-unsubscribe": 10,
+    "customuser-list": 3,
+    "customuser-detail": 3,
+    "customuser-me": 2,
+    "login": 6,
+    "logout": 5,
+    "token-refresh": 5,
+    "shopping-cart-batch": 12,
+    "favorite-batch": 8,
+    # Плюс заполнение лент подписчиков, когда у автора остаётся
+    # FEED_FANOUT_LIMIT подписчиков.
+    "subscription-batch": 10,
+    "recipe-feed": 6,
+}
+
+# Сколько id можно передать в одном пакетном запросе.
+BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", 100))
+
+# Рецепты авторов, у которых подписчиков не больше FEED_FANOUT_LIMIT,
+# раскладываются по лентам при публикации; остальные лента читает
+# напрямую. При подписке в ленту добавляются FEED_BACKFILL_SIZE
+# последних рецептов автора.
+FEED_FANOUT_LIMIT = int(os.getenv("FEED_FANOUT_LIMIT", 1000))
+FEED_BACKFILL_SIZE = int(os.getenv("FEED_BACKFILL_SIZE", 100))
+FEED_BATCH_SIZE = 500
+
+INGREDIENT_SEARCH_LIMIT = int(os.getenv("INGREDIENT_SEARCH_LIMIT", 50))
+# Индекс также перечитывается по таймауту, чтобы подхватить изменения,
+# сделанные другими процессами.
+INGREDIENT_INDEX_TTL = int(os.getenv("INGREDIENT_INDEX_TTL", 300))
+
+# Версия справочников перечитывается из базы не чаще раза в
+# CATALOG_VERSION_TTL секунд.
+CATALOG_VERSION_TTL = int(os.getenv("CATALOG_VERSION_TTL", 5))
+CATALOG_CACHE_SIZE = int(os.getenv("CATALOG_CACHE_SIZE", 1000))
+
+SHORT_LINK_CACHE_SIZE = int(os.getenv("SHORT_LINK_CACHE_SIZE", 10000))
+# Вне MEDIA_ROOT: каталог media nginx раздаёт всем.
+SHORT_LINK_MAP_PATH = os.getenv(
+    "SHORT_LINK_MAP_PATH",
+    os.path.join(BASE_DIR, "short_links/short_links.map"),
+)
+
+# Уменьшенные копии изображений рецептов и аватаров: имя -> (ширина,
+# высота), в WebP и запасном формате. Строятся пулом потоков после
+# коммита; при IMAGE_WORKERS=0 — синхронно в том же потоке.
+IMAGE_VARIANTS = {
+    "thumbnail": (320, 320),
+    "card": (640, 640),
+    "full": (1280, 1280),
+}
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", 2))
+IMAGE_MAX_PIXELS = int(os.getenv("IMAGE_MAX_PIXELS", 40_000_000))
+# Предел размера загружаемого файла; nginx пропускает тела до 20 МБ.
+IMAGE_UPLOAD_MAX_SIZE = int(os.getenv("IMAGE_UPLOAD_MAX_SIZE", 10 * 2**20))
+
+# Токен для /api/internal/metrics/ (заголовок Authorization: Bearer);
+# пустой — доступ не проверяется.
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
 
 LANGUAGE_CODE = "ru-ru"
 
@@ -3,8 +3,16 @@ from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path
 
+from foodgram.views import database_stats_view, metrics_view
+
 urlpatterns = [
     path("admin/", admin.site.urls),
+    path(
+        "api/internal/db-stats/",
+        database_stats_view,
+        name="database-stats",
+    ),
+    path("api/internal/metrics/", metrics_view, name="metrics"),
     path("api/", include("users.urls")),
     path("api/", include("food.urls")),
 ]
@@ -0,0 +1,36 @@
+import os
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+from prometheus_client import CONTENT_TYPE_LATEST
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+
+from foodgram.metrics import render_metrics
+
+
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+def database_stats_view(request):
+    # Статистика соединений и пула того воркера, что обработал запрос.
+    return Response(
+        {
+            "pid": os.getpid(),
+            "databases": {
+                connection.alias: connection.get_pool_stats()
+                for connection in connections.all()
+                if hasattr(connection, "get_pool_stats")
+            },
+        }
+    )
+
+
+def metrics_view(request):
+    # Без обращений к базе и аутентификации DRF: адрес закрыт на nginx,
+    # сборщик ходит к бэкенду напрямую, при METRICS_TOKEN — с токеном.
+    token = settings.METRICS_TOKEN
+    if token and request.headers.get("Authorization") != f"Bearer {token}":
+        return HttpResponseForbidden()
+    return HttpResponse(render_metrics(), content_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,140 @@
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.test import AsyncClient, Client, TestCase, override_settings
+from rest_framework.authtoken.models import Token
+
+from food.catalog import catalog
+from food.models import (
+    FavoriteRecipe,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    Tag,
+)
+from users.models import CustomUser
+
+ASYNC_URLS = override_settings(
+    ROOT_URLCONF="foodgram.asgi_urls", QUERY_COUNT_HEADER=True
+)
+LIST_URLS = (
+    "/api/recipes/",
+    "/api/recipes/?limit=2&page=2",
+    "/api/recipes/?cursor=&limit=2",
+    "/api/recipes/?tags=lunch&ordering=-updated_at",
+    "/api/recipes/?is_favorited=1",
+    "/api/tags/",
+    "/api/ingredients/?name=со",
+)
+
+
+class AsyncViewsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(
+            email="user@example.com",
+            password="password",
+            username="user",
+            first_name="Имя",
+            last_name="Фамилия",
+        )
+        cls.token = Token.objects.create(user=cls.user)
+        cls.tag = Tag.objects.create(name="Обед", slug="lunch")
+        cls.ingredient = Ingredient.objects.create(
+            name="соль", measurement_unit="г"
+        )
+        cls.recipes = []
+        for i in range(5):
+            recipe = Recipe.objects.create(
+                name=f"Рецепт {i}",
+                text="Описание",
+                author=cls.user,
+                cooking_time=10,
+            )
+            recipe.tags.set([cls.tag] if i % 2 else [])
+            RecipeIngredient.objects.create(
+                recipe=recipe, ingredient=cls.ingredient, amount=i + 1
+            )
+            cls.recipes.append(recipe)
+        FavoriteRecipe.objects.create(user=cls.user, recipe=cls.recipes[0])
+
+    def setUp(self):
+        catalog.invalidate()
+        self.auth = {"authorization": f"Token {self.token.key}"}
+        self.sync_client = Client()
+        self.async_client = AsyncClient()
+
+    async def get_both(self, url, **headers):
+        # Сначала синхронный ответ: он же заполняет кэш справочников.
+        headers = {**self.auth, **headers}
+        expected = await sync_to_async(self.sync_client.get)(
+            url, headers=headers
+        )
+        with ASYNC_URLS:
+            response = await self.async_client.get(url, headers=headers)
+            self.assertTrue(iscoroutinefunction(response.resolver_match.func))
+        return expected, response
+
+    async def test_lists_match_sync_views(self):
+        for url in LIST_URLS:
+            with self.subTest(url=url):
+                expected, response = await self.get_both(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.content, expected.content)
+
+    async def test_recipe_detail_and_conditional_get(self):
+        url = f"/api/recipes/{self.recipes[0].pk}/"
+        expected, response = await self.get_both(url)
+        self.assertEqual(response.content, expected.content)
+        self.assertEqual(response["ETag"], expected["ETag"])
+        self.assertEqual(response["X-DB-Query-Count"], "4")
+
+        with ASYNC_URLS:
+            response = await self.async_client.get(
+                url, headers={**self.auth, "if-none-match": expected["ETag"]}
+            )
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["X-DB-Query-Count"], "2")
+
+    async def test_anonymous_and_errors_fall_back_to_drf(self):
+        anonymous = AsyncClient()
+        for url, status in (
+            ("/api/recipes/", 200),
+            (f"/api/recipes/{self.recipes[1].pk}/", 200),
+            ("/api/recipes/0/", 404),
+            ("/api/recipes/?page=100", 404),
+            ("/api/recipes/?cursor=broken", 404),
+        ):
+            with self.subTest(url=url):
+                expected, response = await self.get_both(url)
+                self.assertEqual(response.status_code, status)
+                self.assertEqual(response.content, expected.content)
+
+        with ASYNC_URLS:
+            response = await anonymous.get("/api/recipes/")
+            self.assertEqual(response.status_code, 200)
+            self.assertFalse(response.json()["results"][0]["is_favorited"])
+            response = await anonymous.get(
+                "/api/recipes/", headers={"authorization": "Token wrong"}
+            )
+            self.assertEqual(response.status_code, 401)
+            response = await anonymous.post("/api/recipes/", {})
+            self.assertEqual(response.status_code, 401)
+
+    async def test_catalog_not_modified_without_queries(self):
+        _, response = await self.get_both("/api/tags/")
+        with ASYNC_URLS:
+            response = await self.async_client.get(
+                "/api/tags/", headers={"if-none-match": response["ETag"]}
+            )
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["X-DB-Query-Count"], "0")
+
+    async def test_short_link_redirect(self):
+        recipe = self.recipes[2]
+        with ASYNC_URLS:
+            response = await self.async_client.get(
+                f"/api/s/{recipe.short_link}/"
+            )
+            missing = await self.async_client.get("/api/s/zzzzzz/")
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(response["Location"].endswith(f"/{recipe.pk}/"))
+        self.assertEqual(missing.status_code, 404)
@@ -0,0 +1,187 @@
+from decimal import Decimal
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from food.models import (
+    FavoriteRecipe,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    ShoppingList,
+)
+from users.models import CustomUser, Subscription
+
+
+class BatchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(
+            email="user@example.com",
+            password="password",
+            username="user",
+            first_name="Имя",
+            last_name="Фамилия",
+        )
+        cls.authors = [
+            CustomUser.objects.create_user(
+                email=f"author{i}@example.com",
+                password="password",
+                username=f"author{i}",
+                first_name="Имя",
+                last_name="Фамилия",
+            )
+            for i in range(3)
+        ]
+        sugar = Ingredient.objects.create(name="сахар", measurement_unit="г")
+        cls.recipes = []
+        for i in range(30):
+            recipe = Recipe.objects.create(
+                name=f"Рецепт {i}",
+                text="Описание",
+                author=cls.authors[i % 3],
+                cooking_time=5,
+            )
+            RecipeIngredient.objects.create(
+                recipe=recipe, ingredient=sugar, amount=10
+            )
+            cls.recipes.append(recipe)
+        cls.sugar = sugar
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def post(self, url, add=(), remove=(), status=200):
+        response = self.client.post(
+            url, {"add": list(add), "remove": list(remove)}, format="json"
+        )
+        self.assertEqual(response.status_code, status, response.data)
+        return response
+
+    def get_statuses(self, response):
+        return [
+            (result["id"], result["action"], result["status"])
+            for result in response.data["results"]
+        ]
+
+    def test_shopping_cart(self):
+        url = "/api/recipes/shopping_cart/batch/"
+        first, second, third = (recipe.pk for recipe in self.recipes[:3])
+        self.post(url, add=[first])
+        response = self.post(
+            url, add=[first, second, third, 10**6], remove=[10**6 + 1]
+        )
+        self.assertEqual(
+            self.get_statuses(response),
+            [
+                (first, "add", "exists"),
+                (second, "add", "added"),
+                (third, "add", "added"),
+                (10**6, "add", "not_found"),
+                (10**6 + 1, "remove", "not_found"),
+            ],
+        )
+        shopping_list = ShoppingList.objects.get(user=self.user)
+        self.assertEqual(
+            Decimal(shopping_list.ingredients[str(self.sugar.pk)]), 30
+        )
+
+        response = self.post(url, remove=[first, self.recipes[5].pk])
+        self.assertEqual(
+            self.get_statuses(response),
+            [
+                (first, "remove", "removed"),
+                (self.recipes[5].pk, "remove", "absent"),
+            ],
+        )
+        shopping_list.refresh_from_db()
+        self.assertEqual(
+            set(shopping_list.recipe.values_list("pk", flat=True)),
+            {second, third},
+        )
+        self.assertEqual(
+            Decimal(shopping_list.ingredients[str(self.sugar.pk)]), 20
+        )
+
+    def test_favorites_update_counters(self):
+        url = "/api/recipes/favorite/batch/"
+        recipe_ids = [recipe.pk for recipe in self.recipes[:5]]
+        self.post(url, add=recipe_ids)
+        self.assertEqual(
+            FavoriteRecipe.objects.filter(user=self.user).count(), 5
+        )
+        response = self.post(url, add=recipe_ids[:1], remove=recipe_ids[1:3])
+        self.assertEqual(
+            [result["status"] for result in response.data["results"]],
+            ["exists", "removed", "removed"],
+        )
+        self.assertEqual(
+            dict(
+                Recipe.objects.filter(pk__in=recipe_ids).values_list(
+                    "pk", "favorites_count"
+                )
+            ),
+            dict(zip(recipe_ids, [1, 0, 0, 1, 1])),
+        )
+
+    def test_subscriptions(self):
+        url = "/api/users/subscriptions/batch/"
+        author_ids = [author.pk for author in self.authors]
+        response = self.post(url, add=[*author_ids, self.user.pk])
+        self.assertEqual(response.data["results"][-1]["status"], "forbidden")
+        self.post(url, remove=author_ids[:1])
+        self.assertEqual(
+            set(
+                Subscription.objects.filter(user=self.user).values_list(
+                    "subscribed_to_id", flat=True
+                )
+            ),
+            set(author_ids[1:]),
+        )
+        self.assertEqual(
+            list(
+                CustomUser.objects.filter(pk__in=author_ids)
+                .order_by("pk")
+                .values_list("subscribers_count", flat=True)
+            ),
+            [0, 1, 1],
+        )
+
+    @override_settings(BATCH_MAX_SIZE=3)
+    def test_invalid_batches_rejected(self):
+        url = "/api/recipes/favorite/batch/"
+        self.post(url, status=400)
+        self.post(url, add=[1, 2], remove=[3, 4], status=400)
+        self.post(url, add=[1], remove=[1], status=400)
+        self.post(url, add=["x"], status=400)
+        self.assertFalse(FavoriteRecipe.objects.exists())
+
+    def test_queries_do_not_grow_with_batch(self):
+        def count(url, ids):
+            with CaptureQueriesContext(connection) as queries:
+                self.post(url, add=ids)
+            with CaptureQueriesContext(connection) as removal:
+                self.post(url, remove=ids)
+            return len(queries), len(removal)
+
+        ShoppingList.objects.create(user=self.user)
+        small = [recipe.pk for recipe in self.recipes[:2]]
+        large = [recipe.pk for recipe in self.recipes[2:]]
+        for url in (
+            "/api/recipes/shopping_cart/batch/",
+            "/api/recipes/favorite/batch/",
+        ):
+            with self.subTest(url=url):
+                self.assertEqual(count(url, small), count(url, large))
+
+    def test_favorite_delete_does_not_create(self):
+        response = self.client.delete(
+            f"/api/recipes/{self.recipes[0].pk}/favorite/"
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(FavoriteRecipe.objects.exists())
+        self.recipes[0].refresh_from_db()
+        self.assertEqual(self.recipes[0].favorites_count, 0)
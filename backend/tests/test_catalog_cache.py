@@ -0,0 +1,59 @@
+from django.db.models import F
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from food.catalog import catalog
+from food.models import CatalogVersion, Ingredient, Tag
+
+
+class CatalogCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        Tag.objects.create(name="Завтрак", slug="breakfast")
+        Ingredient.objects.create(name="соль", measurement_unit="г")
+
+    def setUp(self):
+        catalog.invalidate()
+        self.client = APIClient()
+
+    def test_conditional_get_skips_database(self):
+        response = self.client.get("/api/tags/")
+        etag = response["ETag"]
+        self.assertTrue(etag.startswith('"catalog-'))
+        with self.assertNumQueries(0):
+            cached = self.client.get("/api/tags/")
+            not_modified = self.client.get(
+                "/api/tags/", HTTP_IF_NONE_MATCH=etag
+            )
+        self.assertEqual(cached.content, response.content)
+        self.assertEqual(cached["ETag"], etag)
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified["ETag"], etag)
+
+    def test_write_changes_version(self):
+        etag = self.client.get("/api/ingredients/", {"name": "со"})["ETag"]
+        Ingredient.objects.create(name="соус", measurement_unit="мл")
+        response = self.client.get(
+            "/api/ingredients/", {"name": "со"}, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(
+            [item["name"] for item in response.json()], ["соль", "соус"]
+        )
+
+    @override_settings(CATALOG_VERSION_TTL=0)
+    def test_picks_up_writes_from_other_processes(self):
+        etag = self.client.get("/api/tags/")["ETag"]
+        Tag.objects.bulk_create([Tag(name="Ужин", slug="dinner")])
+        CatalogVersion.objects.update(version=F("version") + 1)
+        response = self.client.get("/api/tags/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 2)
+
+    def test_detail_and_missing_objects(self):
+        tag = Tag.objects.get()
+        response = self.client.get(f"/api/tags/{tag.pk}/")
+        self.assertEqual(response.json()["slug"], "breakfast")
+        self.assertIn("ETag", response)
+        self.assertEqual(self.client.get("/api/tags/0/").status_code, 404)
@@ -0,0 +1,86 @@
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from food.models import FavoriteRecipe, Recipe
+from users.models import CustomUser, Subscription
+
+
+class CounterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user, cls.author = (
+            CustomUser.objects.create_user(
+                email=f"{name}@example.com",
+                password="password",
+                username=name,
+                first_name="Имя",
+                last_name="Фамилия",
+            )
+            for name in ("user", "author")
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_recipe(self):
+        return Recipe.objects.create(
+            name="Рецепт", text="Описание", author=self.author, cooking_time=5
+        )
+
+    def assertCounters(self, recipes=0, subscribers=0, favorites=None):
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.recipes_count, recipes)
+        self.assertEqual(self.author.subscribers_count, subscribers)
+        if favorites is not None:
+            recipe, count = favorites
+            recipe.refresh_from_db()
+            self.assertEqual(recipe.favorites_count, count)
+
+    def test_counters_follow_writes(self):
+        recipe = self.create_recipe()
+        second = self.create_recipe()
+        self.assertCounters(recipes=2)
+
+        self.client.post(f"/api/recipes/{recipe.pk}/favorite/")
+        self.client.post(f"/api/users/{self.author.pk}/subscribe/")
+        self.assertCounters(recipes=2, subscribers=1, favorites=(recipe, 1))
+
+        response = self.client.get("/api/users/subscriptions/")
+        self.assertEqual(response.data["results"][0]["recipes_count"], 2)
+
+        self.client.delete(f"/api/recipes/{recipe.pk}/favorite/")
+        self.client.delete(f"/api/users/{self.author.pk}/subscribe/")
+        second.delete()
+        self.assertCounters(recipes=1, favorites=(recipe, 0))
+
+    def test_full_save_keeps_counters(self):
+        recipe = self.create_recipe()
+        stale = Recipe.objects.get(pk=recipe.pk)
+        FavoriteRecipe.objects.create(user=self.user, recipe=recipe)
+        stale.name = "Новое название"
+        stale.save()
+        author = CustomUser.objects.get(pk=self.author.pk)
+        Subscription.objects.create(user=self.user, subscribed_to=self.author)
+        author.first_name = "Другое"
+        author.save()
+        self.assertCounters(recipes=1, subscribers=1, favorites=(recipe, 1))
+
+    def test_reconcile_fixes_drift(self):
+        recipe = self.create_recipe()
+        FavoriteRecipe.objects.bulk_create(
+            [FavoriteRecipe(user=self.user, recipe=recipe)]
+        )
+        Subscription.objects.bulk_create(
+            [Subscription(user=self.user, subscribed_to=self.author)]
+        )
+        CustomUser.objects.filter(pk=self.author.pk).update(recipes_count=7)
+
+        with self.assertRaises(CommandError):
+            call_command("reconcile_counters", check=True, stdout=StringIO())
+        call_command("reconcile_counters", batch_size=1, stdout=StringIO())
+        self.assertCounters(recipes=1, subscribers=1, favorites=(recipe, 1))
+        call_command("reconcile_counters", check=True, stdout=StringIO())
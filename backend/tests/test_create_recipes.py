@@ -0,0 +1,62 @@
+import os
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db.models import Count, F
+from django.test import TestCase
+
+from food.base62 import encode
+from food.models import FavoriteRecipe, Recipe, RecipeIngredient, ShoppingList
+from users.models import CustomUser, Subscription
+
+INGREDIENTS = os.path.join(
+    os.path.dirname(settings.BASE_DIR), "data", "ingredients.csv"
+)
+
+
+class CreateRecipesTests(TestCase):
+    def generate(self, **options):
+        call_command(
+            "create_recipes",
+            ingredients=INGREDIENTS,
+            batch_size=7,
+            stdout=StringIO(),
+            **options,
+        )
+
+    def test_generates_requested_volume(self):
+        self.generate(
+            users=20, recipes=60, favorites=200, carts=8, subscriptions=50
+        )
+        self.assertEqual(CustomUser.objects.count(), 21)
+        self.assertEqual(Recipe.objects.count(), 60)
+        for pk, short_link in Recipe.objects.values_list("pk", "short_link"):
+            self.assertEqual(short_link, encode(pk))
+        per_recipe = RecipeIngredient.objects.values("recipe").annotate(
+            count=Count("id")
+        )
+        self.assertTrue(all(1 <= row["count"] <= 5 for row in per_recipe))
+        self.assertTrue(0 < FavoriteRecipe.objects.count() <= 200)
+        self.assertTrue(0 < Subscription.objects.count() <= 50)
+        self.assertFalse(
+            Subscription.objects.filter(user=F("subscribed_to")).exists()
+        )
+        self.assertEqual(ShoppingList.objects.count(), 8)
+        call_command("rebuild_shopping_lists", check=True, stdout=StringIO())
+
+    def test_popularity_is_skewed(self):
+        self.generate(users=50, recipes=100, favorites=2000)
+        counts = sorted(
+            FavoriteRecipe.objects.values("recipe")
+            .annotate(count=Count("id"))
+            .values_list("count", flat=True),
+            reverse=True,
+        )
+        self.assertGreater(counts[0], 5 * counts[len(counts) // 2])
+
+    def test_rerun_adds_new_users(self):
+        self.generate(users=3, recipes=2)
+        self.generate(users=3, recipes=2)
+        self.assertEqual(CustomUser.objects.count(), 7)
+        self.assertEqual(Recipe.objects.count(), 4)
@@ -0,0 +1,122 @@
+from django.db import router, transaction
+from django.http import HttpResponse
+from django.test import (
+    RequestFactory,
+    SimpleTestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from food.catalog import catalog
+from food.ingredient_index import ingredient_index
+from food.models import Ingredient, Recipe, Tag
+from foodgram.db_router import read_replica
+from foodgram.middleware import ReplicaRoutingMiddleware
+from users.authentication import token_denylist
+
+REPLICAS = override_settings(REPLICA_DATABASES=["replica1", "replica2"])
+
+
+class ReplicaRoutingTests(SimpleTestCase):
+    databases = {"default"}
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.used = []
+
+    def get_response(self, request):
+        self.used.append(
+            (router.db_for_read(Recipe), router.db_for_write(Recipe))
+        )
+        return HttpResponse()
+
+    async def aget_response(self, request):
+        return self.get_response(request)
+
+    def run_request(self, method="get", cookies=None):
+        request = getattr(self.factory, method)("/api/recipes/")
+        request.COOKIES.update(cookies or {})
+        return ReplicaRoutingMiddleware(self.get_response)(request)
+
+    @REPLICAS
+    def test_reads_go_to_replicas_and_writes_pin_client(self):
+        response = self.run_request()
+        self.assertIn(self.used[-1][0], ["replica1", "replica2"])
+        self.assertEqual(self.used[-1][1], "default")
+        self.assertNotIn("db_pin", response.cookies)
+
+        response = self.run_request("post")
+        self.assertEqual(self.used[-1], ("default", "default"))
+        pin = response.cookies["db_pin"]
+        self.assertEqual(pin["max-age"], 10)
+
+        self.run_request(cookies={"db_pin": pin.value})
+        self.assertEqual(self.used[-1][0], "default")
+
+    @REPLICAS
+    def test_one_replica_per_request(self):
+        def read_many(request):
+            for _ in range(20):
+                self.get_response(request)
+            return HttpResponse()
+
+        for _ in range(5):
+            self.used.clear()
+            ReplicaRoutingMiddleware(read_many)(self.factory.get("/"))
+            self.assertEqual(len({read for read, _ in self.used}), 1)
+            self.assertIn(self.used[0][0], ["replica1", "replica2"])
+
+    @REPLICAS
+    def test_primary_outside_requests_and_in_transactions(self):
+        self.assertEqual(router.db_for_read(Recipe), "default")
+
+        def read_in_atomic(request):
+            with transaction.atomic():
+                self.get_response(request)
+            return HttpResponse()
+
+        ReplicaRoutingMiddleware(read_in_atomic)(self.factory.get("/"))
+        self.assertEqual(self.used[-1][0], "default")
+
+    @REPLICAS
+    async def test_async_requests(self):
+        middleware = ReplicaRoutingMiddleware(self.aget_response)
+        await middleware(self.factory.get("/api/recipes/"))
+        self.assertIn(self.used[-1][0], ["replica1", "replica2"])
+        response = await middleware(self.factory.delete("/api/recipes/1/"))
+        self.assertEqual(self.used[-1][0], "default")
+        self.assertIn("db_pin", response.cookies)
+
+    def test_without_replicas_nothing_changes(self):
+        response = self.run_request("post")
+        self.run_request()
+        self.assertEqual(self.used, [("default", "default")] * 2)
+        self.assertNotIn("db_pin", response.cookies)
+
+
+class CacheFillTests(TransactionTestCase):
+    # Реплик в тестовом окружении нет: чтение с них упало бы с ошибкой
+    # подключения. Вне транзакции теста, иначе роутер и так выбрал бы
+    # основную базу.
+    def setUp(self):
+        Tag.objects.create(name="Обед", slug="lunch")
+        Ingredient.objects.create(name="соль", measurement_unit="г")
+        catalog.invalidate()
+        ingredient_index.invalidate()
+        token_denylist.invalidate()
+
+    @REPLICAS
+    def test_caches_filled_from_primary(self):
+        client = APIClient()
+        for url in ("/api/tags/", "/api/ingredients/?name=со"):
+            self.assertEqual(client.get(url).status_code, 200)
+
+        token = read_replica.set("replica1")
+        try:
+            catalog.get_tag_ids()
+            ingredient_index.get_many([0])
+            self.assertFalse(token_denylist.is_revoked(AccessToken()))
+        finally:
+            read_replica.reset(token)
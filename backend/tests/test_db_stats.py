@@ -0,0 +1,49 @@
+import os
+
+from django.test import SimpleTestCase, TestCase
+from rest_framework.test import APIClient
+
+from foodgram.db_backend.base import ConnectionStats
+from users.models import CustomUser
+
+
+class DatabaseStatsTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            email="user@example.com",
+            password="password",
+            username="user",
+            first_name="Имя",
+            last_name="Фамилия",
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_only_staff(self):
+        response = self.client.get("/api/internal/db-stats/")
+        self.assertEqual(response.status_code, 403)
+
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.get("/api/internal/db-stats/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["pid"], os.getpid())
+        # В тестах SQLite: инструментированных соединений нет.
+        self.assertEqual(response.data["databases"], {})
+
+
+class ConnectionStatsTests(SimpleTestCase):
+    def test_record(self):
+        stats = ConnectionStats()
+        stats.record(0.002)
+        stats.record(0.004)
+        stats.record(1.0, timeout=True)
+        self.assertEqual(
+            stats.as_dict(),
+            {
+                "checkouts": 2,
+                "checkout_ms_total": 6.0,
+                "checkout_ms_max": 4.0,
+                "timeouts": 1,
+            },
+        )
@@ -0,0 +1,180 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from food.models import FeedEntry, Recipe
+from food.pagination import FeedPagination
+from users.models import CustomUser, Subscription
+
+
+def create_user(name):
+    return CustomUser.objects.create_user(
+        email=f"{name}@example.com",
+        password="password",
+        username=name,
+        first_name="Имя",
+        last_name="Фамилия",
+    )
+
+
+@override_settings(FEED_FANOUT_LIMIT=2)
+class FeedTests(TestCase):
+    url = "/api/recipes/feed/"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user("reader")
+        cls.author = create_user("author")
+        cls.popular = create_user("popular")
+        cls.other = create_user("other")
+        for fan in ("fan1", "fan2", "fan3"):
+            Subscription.objects.create(
+                user=create_user(fan), subscribed_to=cls.popular
+            )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def publish(self, author, count=1):
+        return [
+            Recipe.objects.create(
+                name=f"Рецепт {i}", text="Текст", author=author, cooking_time=5
+            ).pk
+            for i in range(count)
+        ]
+
+    def get_feed_ids(self, limit=100):
+        ids = []
+        url = f"{self.url}?limit={limit}"
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids.extend(recipe["id"] for recipe in response.data["results"])
+            url = response.data["next"]
+        return ids
+
+    def test_feed_merges_timeline_and_popular_authors(self):
+        Subscription.objects.create(user=self.user, subscribed_to=self.author)
+        Subscription.objects.create(user=self.user, subscribed_to=self.popular)
+        recipe_ids = []
+        for _ in range(4):
+            recipe_ids += self.publish(self.author) + self.publish(
+                self.popular
+            )
+        self.publish(self.other)
+
+        # Рецепты популярного автора не раскладываются по лентам.
+        self.assertEqual(
+            set(
+                FeedEntry.objects.filter(user=self.user).values_list(
+                    "author_id", flat=True
+                )
+            ),
+            {self.author.pk},
+        )
+        self.assertEqual(self.get_feed_ids(), recipe_ids[::-1])
+        self.assertEqual(self.get_feed_ids(limit=3), recipe_ids[::-1])
+
+    def test_previous_link(self):
+        Subscription.objects.create(user=self.user, subscribed_to=self.author)
+        recipe_ids = self.publish(self.author, 5)[::-1]
+        response = self.client.get(self.url, {"limit": 2})
+        response = self.client.get(response.data["next"])
+        self.assertEqual(
+            [recipe["id"] for recipe in response.data["results"]],
+            recipe_ids[2:4],
+        )
+        response = self.client.get(response.data["previous"])
+        self.assertEqual(
+            [recipe["id"] for recipe in response.data["results"]],
+            recipe_ids[:2],
+        )
+
+    @override_settings(FEED_BACKFILL_SIZE=2)
+    def test_subscription_backfills_and_unsubscribe_clears(self):
+        recipe_ids = self.publish(self.author, 3)
+        url = f"/api/users/{self.author.pk}/subscribe/"
+        self.client.post(url)
+        self.assertEqual(self.get_feed_ids(), recipe_ids[:0:-1])
+        self.client.delete(url)
+        self.assertEqual(self.get_feed_ids(), [])
+        self.assertFalse(FeedEntry.objects.exists())
+
+    def test_batch_subscriptions_update_feed(self):
+        url = "/api/users/subscriptions/batch/"
+        recipe_ids = self.publish(self.author, 2) + self.publish(self.popular)
+        self.client.post(
+            url, {"add": [self.author.pk, self.popular.pk]}, format="json"
+        )
+        self.assertEqual(self.get_feed_ids(), recipe_ids[::-1])
+        self.client.post(url, {"remove": [self.author.pk]}, format="json")
+        self.assertEqual(self.get_feed_ids(), recipe_ids[2:])
+
+    def test_deleted_recipe_leaves_feed(self):
+        Subscription.objects.create(user=self.user, subscribed_to=self.author)
+        first, second = self.publish(self.author, 2)
+        Recipe.objects.get(pk=second).delete()
+        self.assertEqual(self.get_feed_ids(), [first])
+
+    def test_recipe_deleted_while_reading_feed(self):
+        Subscription.objects.create(user=self.user, subscribed_to=self.author)
+        first, second = self.publish(self.author, 2)
+        paginate_sources = FeedPagination.paginate_sources
+
+        def paginate_then_delete(paginator, *args, **kwargs):
+            entries = paginate_sources(paginator, *args, **kwargs)
+            Recipe.objects.filter(pk=second).delete()
+            return entries
+
+        with mock.patch.object(
+            FeedPagination, "paginate_sources", paginate_then_delete
+        ):
+            self.assertEqual(self.get_feed_ids(), [first])
+
+    def test_author_below_limit_backfills_feeds(self):
+        # Подписка и рецепты появились, пока автор был сверх лимита.
+        Subscription.objects.create(user=self.user, subscribed_to=self.popular)
+        recipe_ids = self.publish(self.popular, 2)
+        self.assertFalse(FeedEntry.objects.exists())
+
+        fan1, fan2, fan3 = CustomUser.objects.filter(
+            username__startswith="fan"
+        ).order_by("username")
+        Subscription.objects.get(
+            user=fan1, subscribed_to=self.popular
+        ).delete()
+        self.assertFalse(FeedEntry.objects.exists())
+
+        client = APIClient()
+        client.force_authenticate(fan2)
+        client.post(
+            "/api/users/subscriptions/batch/",
+            {"remove": [self.popular.pk]},
+            format="json",
+        )
+        self.assertEqual(
+            set(FeedEntry.objects.values_list("user_id", "recipe_id")),
+            {
+                (user.pk, recipe_id)
+                for user in (self.user, fan3)
+                for recipe_id in recipe_ids
+            },
+        )
+        self.assertEqual(self.get_feed_ids(), recipe_ids[::-1])
+
+    def test_rebuild_feeds_command(self):
+        recipe_ids = self.publish(self.author, 2) + self.publish(self.popular)
+        Subscription.objects.bulk_create(
+            Subscription(user=self.user, subscribed_to=author)
+            for author in (self.author, self.popular)
+        )
+        call_command("rebuild_feeds", stdout=StringIO())
+        self.assertEqual(FeedEntry.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(self.get_feed_ids(), recipe_ids[::-1])
+
+    def test_requires_authentication(self):
+        self.assertEqual(APIClient().get(self.url).status_code, 401)
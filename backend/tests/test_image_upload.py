@@ -0,0 +1,151 @@
+import base64
+import io
+import json
+import shutil
+import tempfile
+import tracemalloc
+
+from django.test import TestCase, override_settings
+from PIL import Image
+from rest_framework.test import (
+    APIClient,
+    APIRequestFactory,
+    force_authenticate,
+)
+
+from food.models import Ingredient, Recipe, Tag
+from food.views import RecipeViewSet
+from users.models import CustomUser
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def make_image(size=(20, 20), format="PNG", noise=False):
+    buffer = io.BytesIO()
+    if noise:
+        image = Image.effect_noise(size, 64)
+    else:
+        image = Image.new("RGB", size, "white")
+    image.save(buffer, format=format)
+    buffer.seek(0)
+    buffer.name = f"image.{format.lower()}"
+    return buffer
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ImageUploadTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(
+            email="user@example.com",
+            password="password",
+            username="user",
+            first_name="Имя",
+            last_name="Фамилия",
+        )
+        cls.tags = [
+            Tag.objects.create(name=f"Тег {i}", slug=f"tag{i}")
+            for i in range(2)
+        ]
+        cls.ingredient = Ingredient.objects.create(
+            name="соль", measurement_unit="г"
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def recipe_form(self, image):
+        return {
+            "name": "Рецепт",
+            "text": "Описание",
+            "cooking_time": 10,
+            "image": image,
+            "tags": [tag.pk for tag in self.tags],
+            "ingredients": json.dumps(
+                [{"id": self.ingredient.pk, "amount": 3}]
+            ),
+        }
+
+    def test_multipart_recipe_create_and_update(self):
+        response = self.client.post(
+            "/api/recipes/", self.recipe_form(make_image()), format="multipart"
+        )
+        self.assertEqual(response.status_code, 201, response.data)
+        recipe = Recipe.objects.get(pk=response.data["id"])
+        self.assertTrue(recipe.image.name.startswith("recipes/images/"))
+        self.assertEqual(recipe.tags.count(), 2)
+        self.assertEqual(
+            recipe.recipeingredient_set.get().ingredient, self.ingredient
+        )
+
+        form = self.recipe_form(make_image(format="JPEG"))
+        form["tags"] = [self.tags[0].pk]
+        response = self.client.patch(
+            f"/api/recipes/{recipe.pk}/", form, format="multipart"
+        )
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(list(recipe.tags.all()), [self.tags[0]])
+
+    def test_multipart_avatar(self):
+        response = self.client.put(
+            "/api/users/me/avatar/",
+            {"avatar": make_image()},
+            format="multipart",
+        )
+        self.assertEqual(response.status_code, 200, response.data)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.avatar.name.startswith("users/images/"))
+
+    def test_header_checks(self):
+        cases = [
+            (make_image(format="BMP"), {}),
+            (make_image(), {"IMAGE_MAX_PIXELS": 100}),
+            (make_image(), {"IMAGE_UPLOAD_MAX_SIZE": 10}),
+            (io.BytesIO(b"not an image"), {}),
+        ]
+        for image, limits in cases:
+            for encode in (False, True):
+                value = image.getvalue() if encode else image
+                if encode:
+                    value = base64.b64encode(value).decode()
+                    value = f"data:image/png;base64,{value}"
+                else:
+                    image.seek(0)
+                    image.name = getattr(image, "name", "image.png")
+                with self.subTest(limits=limits, base64=encode):
+                    with override_settings(**limits):
+                        response = self.client.put(
+                            "/api/users/me/avatar/",
+                            {"avatar": value},
+                            format="json" if encode else "multipart",
+                        )
+                    self.assertEqual(response.status_code, 400)
+                    self.assertIn("avatar", response.data)
+
+    def test_multipart_peak_memory_is_bounded(self):
+        image = make_image((1500, 1500), noise=True)
+        size = len(image.getvalue())
+        request = APIRequestFactory().post(
+            "/api/recipes/", self.recipe_form(image), format="multipart"
+        )
+        force_authenticate(request, user=self.user)
+        view = RecipeViewSet.as_view({"post": "create"})
+
+        tracemalloc.start()
+        try:
+            response = view(request)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+            request.close()
+        self.assertEqual(response.status_code, 201, response.data)
+        # Файл пишется во временный файл кусками и проверяется по пути,
+        # поэтому пик памяти не зависит от размера изображения.
+        self.assertGreater(size, 1_500_000)
+        self.assertLess(peak, size // 3)
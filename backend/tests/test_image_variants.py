@@ -0,0 +1,184 @@
+import base64
+import io
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from PIL import Image
+from rest_framework.test import APIClient
+
+from food.models import Ingredient, Recipe, Tag
+from users.models import CustomUser
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def make_image(size=(2000, 1000), mode="RGB", format="PNG"):
+    buffer = io.BytesIO()
+    Image.new(mode, size, "white").save(buffer, format=format)
+    return buffer.getvalue()
+
+
+def as_base64(content):
+    return f"data:image/png;base64,{base64.b64encode(content).decode()}"
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, IMAGE_WORKERS=0)
+class ImageVariantsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(
+            email="user@example.com",
+            password="password",
+            username="user",
+            first_name="Имя",
+            last_name="Фамилия",
+        )
+        cls.tag = Tag.objects.create(name="Обед", slug="lunch")
+        cls.ingredient = Ingredient.objects.create(
+            name="соль", measurement_unit="г"
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_recipe(self, content):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                "/api/recipes/",
+                {
+                    "name": "Рецепт",
+                    "text": "Описание",
+                    "cooking_time": 10,
+                    "image": as_base64(content),
+                    "tags": [self.tag.pk],
+                    "ingredients": [{"id": self.ingredient.pk, "amount": 1}],
+                },
+                format="json",
+            )
+        self.assertEqual(response.status_code, 201)
+        return Recipe.objects.get(pk=response.data["id"])
+
+    def test_upload_builds_resized_variants(self):
+        recipe = self.create_recipe(make_image())
+        variants = recipe.image_variants
+        self.assertEqual(variants["source"], recipe.image.name)
+        for variant, width in (("thumbnail", 320), ("full", 1280)):
+            with default_storage.open(variants[variant]["webp"]) as file:
+                image = Image.open(file)
+                self.assertEqual(image.format, "WEBP")
+                self.assertEqual(image.size, (width, width // 2))
+            self.assertTrue(variants[variant]["fallback"].endswith(".jpg"))
+
+        response = self.client.get(f"/api/recipes/{recipe.pk}/")
+        urls = response.data["image_variants"]["card"]
+        self.assertTrue(urls["webp"].startswith("http://testserver/media/"))
+        self.assertTrue(urls["webp"].endswith("_card.webp"))
+
+        reader = CustomUser.objects.create_user(
+            email="reader@example.com",
+            password="password",
+            username="reader",
+            first_name="Имя",
+            last_name="Фамилия",
+        )
+        self.client.force_authenticate(reader)
+        self.client.post(f"/api/users/{self.user.pk}/subscribe/")
+        response = self.client.get("/api/users/subscriptions/")
+        preview = response.data["results"][0]["recipes"][0]
+        self.assertEqual(preview["image_variants"]["card"], urls)
+
+    def test_transparent_image_falls_back_to_png(self):
+        recipe = self.create_recipe(make_image((100, 100), mode="RGBA"))
+        fallback = recipe.image_variants["thumbnail"]["fallback"]
+        self.assertTrue(fallback.endswith(".png"))
+
+    def test_pending_variants_serve_original(self):
+        recipe = self.create_recipe(make_image((10, 10)))
+        Recipe.objects.filter(pk=recipe.pk).update(image_variants={})
+        response = self.client.get(f"/api/recipes/{recipe.pk}/")
+        self.assertEqual(
+            response.data["image_variants"]["full"],
+            {
+                "webp": response.data["image"],
+                "fallback": response.data["image"],
+            },
+        )
+
+    def test_avatar_variants_follow_avatar(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.put(
+                "/api/users/me/avatar/",
+                {"avatar": as_base64(make_image((50, 50)))},
+                format="json",
+            )
+        self.user.refresh_from_db()
+        files = [
+            path
+            for variant in ("thumbnail", "card", "full")
+            for path in self.user.avatar_variants[variant].values()
+        ]
+        self.assertTrue(all(default_storage.exists(path) for path in files))
+        response = self.client.get("/api/users/me/")
+        self.assertIn("thumbnail", response.data["avatar_variants"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete("/api/users/me/avatar/")
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.avatar_variants, {})
+        self.assertFalse(any(default_storage.exists(path) for path in files))
+
+    def test_backfill_processes_existing_images(self):
+        name = default_storage.save(
+            "recipes/images/old.png", ContentFile(make_image((900, 900)))
+        )
+        recipe = Recipe.objects.create(
+            name="Старый рецепт",
+            text="Описание",
+            author=self.user,
+            cooking_time=5,
+            image=name,
+        )
+        broken = Recipe.objects.create(
+            name="Битый рецепт",
+            text="Описание",
+            author=self.user,
+            cooking_time=5,
+            image=default_storage.save(
+                "recipes/images/broken.png", ContentFile(b"not an image")
+            ),
+        )
+        stderr = StringIO()
+        call_command(
+            "build_image_variants", workers=1, stdout=StringIO(), stderr=stderr
+        )
+        recipe.refresh_from_db()
+        broken.refresh_from_db()
+        self.assertEqual(recipe.image_variants["source"], name)
+        self.assertTrue(
+            os.path.exists(
+                os.path.join(
+                    MEDIA_ROOT, recipe.image_variants["card"]["webp"]
+                )
+            )
+        )
+        self.assertEqual(broken.image_variants, {})
+        self.assertIn("broken.png", stderr.getvalue())
+
+        # Повторный запуск не трогает уже обработанные изображения.
+        stdout = StringIO()
+        call_command(
+            "build_image_variants", workers=1, stdout=stdout, stderr=StringIO()
+        )
+        self.assertIn("Обработано изображений: 0", stdout.getvalue())
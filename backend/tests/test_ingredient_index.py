@@ -0,0 +1,71 @@
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from food.ingredient_index import ingredient_index
+from food.models import Ingredient
+
+
+class IngredientIndexTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        Ingredient.objects.bulk_create(
+            Ingredient(name=name, measurement_unit="г")
+            for name in (
+                "сахарная пудра",
+                "Сахар",
+                "кость сахарная",
+                "сахар ванильный",
+                "соль",
+            )
+        )
+
+    def setUp(self):
+        ingredient_index.invalidate()
+        self.client = APIClient()
+
+    def get_names(self, query):
+        response = self.client.get("/api/ingredients/", {"name": query})
+        self.assertEqual(response.status_code, 200)
+        return [item["name"] for item in response.json()]
+
+    def test_prefix_matches_first_then_word_matches(self):
+        self.assertEqual(
+            self.get_names("сах"),
+            ["Сахар", "сахар ванильный", "сахарная пудра", "кость сахарная"],
+        )
+
+    def test_blank_query_matches_nothing(self):
+        self.assertEqual(ingredient_index.search("  "), [])
+        self.assertEqual(self.get_names(" "), [])
+
+    def test_lookups_do_not_hit_database(self):
+        self.get_names("сах")
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get_names("СОЛ"), ["соль"])
+
+    def test_refreshes_on_ingredient_change(self):
+        self.assertEqual(self.get_names("перец"), [])
+        ingredient = Ingredient.objects.create(
+            name="перец", measurement_unit="г"
+        )
+        self.assertEqual(self.get_names("перец"), ["перец"])
+        ingredient.name = "паприка"
+        ingredient.save()
+        self.assertEqual(self.get_names("перец"), [])
+
+    def test_get_many_reads_only_missing_ids(self):
+        known = Ingredient.objects.get(name="соль")
+        ingredient_index.get_many([known.id])
+        # bulk_create не шлёт сигналов, как запись из другого процесса.
+        added = Ingredient.objects.bulk_create(
+            [Ingredient(name="перец", measurement_unit="г")]
+        )[0]
+        for _ in range(2):
+            with self.assertNumQueries(1):
+                found = ingredient_index.get_many([known.id, added.id])
+            self.assertEqual(found[added.id]["name"], "перец")
+            self.assertEqual(found[known.id]["name"], "соль")
+
+    @override_settings(INGREDIENT_SEARCH_LIMIT=2)
+    def test_result_cap(self):
+        self.assertEqual(self.get_names("сах"), ["Сахар", "сахар ванильный"])
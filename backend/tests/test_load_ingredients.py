@@ -0,0 +1,98 @@
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest import mock, skipUnless
+
+from django.conf import settings
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase
+
+from food.management.commands.load_ingredients import Command
+from food.models import Ingredient
+
+DATA_DIR = os.path.join(os.path.dirname(settings.BASE_DIR), "data")
+
+
+class LoadIngredientsTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def write(self, name, content):
+        path = os.path.join(self.directory.name, name)
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(content)
+        return path
+
+    def load(self, path, **options):
+        stdout = StringIO()
+        call_command("load_ingredients", path, stdout=stdout, **options)
+        return stdout.getvalue()
+
+    def test_csv_is_deduplicated_and_rerunnable(self):
+        Ingredient.objects.create(name="соль", measurement_unit="г")
+        path = self.write(
+            "ingredients.csv",
+            "соль,г\nсахар,г\n\nсахар , г\nсыр, твёрдый,г\nмолоко,мл\n,г\n",
+        )
+        output = self.load(path, batch_size=2)
+        self.assertIn("добавлено 3, пропущено дубликатов 2", output)
+        self.assertIn("некорректных строк 1", output)
+        self.assertEqual(
+            set(Ingredient.objects.values_list("name", "measurement_unit")),
+            {
+                ("соль", "г"),
+                ("сахар", "г"),
+                ("сыр, твёрдый", "г"),
+                ("молоко", "мл"),
+            },
+        )
+        output = self.load(path)
+        self.assertIn("добавлено 0, пропущено дубликатов 5", output)
+
+    def test_json_array_is_streamed(self):
+        items = [
+            {"name": f"ингредиент {i}", "measurement_unit": "г"}
+            for i in range(50)
+        ]
+        path = self.write("catalog.data", json.dumps(items, indent=1))
+        output = self.load(path, format="json", batch_size=7)
+        self.assertIn("прочитано 50, добавлено 50", output)
+        self.assertEqual(Ingredient.objects.count(), 50)
+
+    def test_bundled_catalogs_match(self):
+        self.load(os.path.join(DATA_DIR, "ingredients.csv"))
+        count = Ingredient.objects.count()
+        output = self.load(os.path.join(DATA_DIR, "ingredients.json"))
+        self.assertIn("добавлено 0", output)
+        self.assertEqual(Ingredient.objects.count(), count)
+
+    def test_broken_file_is_rolled_back(self):
+        path = self.write("broken.json", '[{"name": "соль", "measurement')
+        with self.assertRaises(CommandError):
+            self.load(path)
+        path = self.write("broken.csv", "соль,г\nбез единицы\n")
+        with self.assertRaises(CommandError):
+            self.load(path)
+        self.assertFalse(Ingredient.objects.exists())
+
+    @skipUnless(connection.vendor == "postgresql", "COPY есть только в PG")
+    def test_copy_escapes_special_characters(self):
+        names = ["соль\tморская", "сыр\\плавленый", "перец\nчёрный"]
+        path = self.write(
+            "ingredients.json",
+            json.dumps(
+                [{"name": name, "measurement_unit": "г"} for name in names]
+            ),
+        )
+        with mock.patch.object(
+            Command, "copy", autospec=True, side_effect=Command.copy
+        ) as copy:
+            output = self.load(path, batch_size=2)
+        self.assertEqual(copy.call_count, 2)
+        self.assertIn("добавлено 3", output)
+        self.assertEqual(
+            set(Ingredient.objects.values_list("name", flat=True)), set(names)
+        )
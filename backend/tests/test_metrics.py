@@ -0,0 +1,107 @@
+from django.test import TestCase, override_settings
+from prometheus_client import REGISTRY
+from rest_framework.test import APIClient
+
+from food.catalog import catalog
+from food.models import Recipe, Tag
+from users.models import CustomUser
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+class MetricsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(
+            email="user@example.com",
+            password="password",
+            username="user",
+            first_name="Имя",
+            last_name="Фамилия",
+        )
+        Tag.objects.create(name="Обед", slug="lunch")
+        cls.recipe = Recipe.objects.create(
+            name="Рецепт", text="Описание", author=cls.user, cooking_time=5
+        )
+
+    def setUp(self):
+        catalog.invalidate()
+        self.client = APIClient()
+
+    def test_requests_recorded_per_view(self):
+        labels = {"view": "RecipeViewSet.list", "method": "GET"}
+        before = {
+            "count": sample("foodgram_requests_total", status="200", **labels),
+            "latency": sample(
+                "foodgram_request_duration_seconds_count", **labels
+            ),
+            "queries": sample(
+                "foodgram_request_db_queries_sum", view=labels["view"]
+            ),
+            "size": sample(
+                "foodgram_response_size_bytes_sum", view=labels["view"]
+            ),
+        }
+        response = self.client.get("/api/recipes/")
+        self.client.get(f"/api/recipes/{self.recipe.pk}/")
+        self.client.get("/api/recipes/0/")
+
+        self.assertEqual(
+            sample("foodgram_requests_total", status="200", **labels)
+            - before["count"],
+            1,
+        )
+        self.assertEqual(
+            sample("foodgram_request_duration_seconds_count", **labels)
+            - before["latency"],
+            1,
+        )
+        self.assertGreater(
+            sample("foodgram_request_db_queries_sum", view=labels["view"]),
+            before["queries"],
+        )
+        self.assertEqual(
+            sample("foodgram_response_size_bytes_sum", view=labels["view"])
+            - before["size"],
+            len(response.content),
+        )
+        self.assertGreater(
+            sample(
+                "foodgram_requests_total",
+                view="RecipeViewSet.retrieve",
+                method="GET",
+                status="404",
+            ),
+            0,
+        )
+
+    def test_cache_lookups(self):
+        labels = {"cache": "catalog"}
+        name = "foodgram_cache_lookups_total"
+        misses = sample(name, result="miss", **labels)
+        hits = sample(name, result="hit", **labels)
+        self.client.get("/api/tags/")
+        self.client.get("/api/tags/")
+        self.assertEqual(sample(name, result="miss", **labels) - misses, 1)
+        self.assertEqual(sample(name, result="hit", **labels) - hits, 1)
+
+    def test_endpoint(self):
+        self.client.get("/api/tags/")
+        response = self.client.get("/api/internal/metrics/")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain"))
+        self.assertIn(
+            'foodgram_requests_total{method="GET",status="200",'
+            'view="TagViewSet.list"}',
+            response.content.decode(),
+        )
+
+        with override_settings(METRICS_TOKEN="secret"):
+            response = self.client.get("/api/internal/metrics/")
+            self.assertEqual(response.status_code, 403)
+            response = self.client.get(
+                "/api/internal/metrics/", HTTP_AUTHORIZATION="Bearer secret"
+            )
+            self.assertEqual(response.status_code, 200)
@@ -0,0 +1,110 @@
+import json
+from base64 import urlsafe_b64encode
+
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from food.models import Recipe
+from users.models import CustomUser, Subscription
+
+
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(
+            email="user@example.com",
+            password="password",
+            username="user",
+            first_name="Имя",
+            last_name="Фамилия",
+        )
+        cls.recipes = Recipe.objects.bulk_create(
+            Recipe(
+                name=f"Рецепт {i}",
+                author=cls.user,
+                text="Описание",
+                cooking_time=10,
+                short_link=f"r{i}",
+            )
+            for i in range(7)
+        )
+        cls.authors = [
+            CustomUser.objects.create_user(
+                email=f"author{i}@example.com",
+                password="password",
+                username=f"author{i}",
+                first_name="Имя",
+                last_name="Фамилия",
+            )
+            for i in range(3)
+        ]
+        for author in reversed(cls.authors):
+            Subscription.objects.create(user=cls.user, subscribed_to=author)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def walk(self, url, link="next"):
+        ids, pages = [], []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            pages.append(response.data)
+            ids.extend(item["id"] for item in response.data["results"])
+            url = response.data[link]
+        return ids, pages
+
+    def test_recipes_forward_and_back(self):
+        ids, pages = self.walk("/api/recipes/?cursor=&limit=3")
+        expected = sorted((recipe.id for recipe in self.recipes), reverse=True)
+        self.assertEqual(ids, expected)
+        self.assertEqual([len(page["results"]) for page in pages], [3, 3, 1])
+        self.assertEqual(pages[0]["count"], 7)
+        self.assertIsNone(pages[0]["previous"])
+
+        back_ids, _ = self.walk(pages[-1]["previous"], link="previous")
+        self.assertEqual(
+            sorted(back_ids, reverse=True), expected[: len(back_ids)]
+        )
+        self.assertEqual(len(back_ids), 6)
+
+    def test_timestamp_cursor_keeps_microseconds(self):
+        ids, _ = self.walk("/api/recipes/?cursor=&limit=2&ordering=created_at")
+        self.assertEqual(ids, [recipe.id for recipe in self.recipes])
+
+    def test_count_can_be_skipped(self):
+        response = self.client.get("/api/recipes/?cursor=&count=none")
+        self.assertIsNone(response.data["count"])
+        self.assertEqual(len(response.data["results"]), 7)
+
+    def test_invalid_cursor(self):
+        response = self.client.get("/api/recipes/?cursor=broken")
+        self.assertEqual(response.status_code, 404)
+
+    def test_malformed_cursor_values(self):
+        for url, cursor in (
+            ("/api/recipes/", {"p": ["x"]}),
+            ("/api/recipes/", {"p": [None]}),
+            ("/api/recipes/", {"p": [{"a": 1}]}),
+            ("/api/recipes/", [{"a": 1}]),
+            ("/api/recipes/?ordering=created_at", {"p": ["x", 1]}),
+            ("/api/recipes/?ordering=created_at", {"p": [1, 1]}),
+            ("/api/recipes/feed/", {"p": [None, 1]}),
+        ):
+            encoded = urlsafe_b64encode(json.dumps(cursor).encode()).decode()
+            with self.subTest(url=url, cursor=cursor):
+                response = self.client.get(url, {"cursor": encoded})
+                self.assertEqual(response.status_code, 404)
+
+    def test_page_number_contract_unchanged(self):
+        response = self.client.get("/api/recipes/?page=3&limit=3")
+        self.assertEqual(response.data["count"], 7)
+        self.assertEqual(len(response.data["results"]), 1)
+        self.assertIsNone(response.data["next"])
+
+    def test_subscriptions_follow_subscription_order(self):
+        ids, _ = self.walk("/api/users/subscriptions/?cursor=&limit=2")
+        self.assertEqual(ids, [author.id for author in reversed(self.authors)])
+        response = self.client.get("/api/users/subscriptions/?limit=2")
+        self.assertEqual(response.data["count"], 3)
@@ -0,0 +1,326 @@
+import base64
+import io
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.test import TestCase, override_settings
+from django.urls import URLPattern
+from PIL import Image
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from food import urls as food_urls
+from food.ingredient_index import ingredient_index
+from food.models import (
+    FavoriteRecipe,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    ShoppingList,
+    Tag,
+)
+from foodgram.middleware import get_query_budget
+from users import urls as users_urls
+from users.models import CustomUser, Subscription
+
+MEDIA_ROOT = tempfile.mkdtemp()
+PAGE_SIZES = (1, 10, 50)
+
+
+def make_image():
+    buffer = io.BytesIO()
+    Image.new("RGB", (2, 2), "white").save(buffer, format="PNG")
+    encoded = base64.b64encode(buffer.getvalue()).decode()
+    return f"data:image/png;base64,{encoded}"
+
+
+@override_settings(QUERY_COUNT_HEADER=True, MEDIA_ROOT=MEDIA_ROOT)
+class QueryBudgetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.ingredients = Ingredient.objects.bulk_create(
+            Ingredient(name=f"ингредиент {i}", measurement_unit="г")
+            for i in range(20)
+        )
+        cls.tags = [
+            Tag.objects.create(name=f"Тег {i}", slug=f"tag{i}")
+            for i in range(3)
+        ]
+        cls.user = CustomUser.objects.create_user(
+            email="user@example.com",
+            password="password",
+            username="user",
+            first_name="Имя",
+            last_name="Фамилия",
+        )
+        cls.authors = [
+            CustomUser.objects.create_user(
+                email=f"author{i}@example.com",
+                password="password",
+                username=f"author{i}",
+                first_name="Имя",
+                last_name="Фамилия",
+            )
+            for i in range(max(PAGE_SIZES))
+        ]
+        cls.token = Token.objects.create(user=cls.user)
+
+        recipes = []
+        for i, author in enumerate(cls.authors):
+            for j in range(2):
+                recipes.append(
+                    Recipe(
+                        name=f"Рецепт {i}-{j}",
+                        author=author,
+                        text="Описание",
+                        cooking_time=10,
+                        short_link=f"s{i}x{j}",
+                    )
+                )
+        cls.recipes = Recipe.objects.bulk_create(recipes)
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(recipe=recipe, ingredient=ingredient, amount=1)
+            for recipe in cls.recipes
+            for ingredient in cls.ingredients[:3]
+        )
+        for recipe in cls.recipes:
+            recipe.tags.set(cls.tags[:2])
+
+        FavoriteRecipe.objects.bulk_create(
+            FavoriteRecipe(user=cls.user, recipe=recipe)
+            for recipe in cls.recipes[::2]
+        )
+        shopping_list = ShoppingList.objects.create(user=cls.user)
+        shopping_list.recipe.add(*cls.recipes[1::2])
+        Subscription.objects.bulk_create(
+            Subscription(user=cls.user, subscribed_to=author)
+            for author in cls.authors[1:]
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+        self.anon_client = APIClient()
+
+    def assertWithinBudget(self, response, url_name):
+        self.assertLess(response.status_code, 500)
+        count = int(response["X-DB-Query-Count"])
+        self.assertIn(url_name, settings.QUERY_BUDGETS)
+        budget = get_query_budget(url_name, response.request["REQUEST_METHOD"])
+        self.assertLessEqual(
+            count,
+            budget,
+            f"{url_name}: {count} queries, budget {budget}, "
+            f"{response['X-DB-Duplicate-Queries']} duplicate(s)",
+        )
+        return count
+
+    def assertConstantAcrossPageSizes(self, url, url_name, client=None):
+        client = client or self.client
+        counts = {}
+        for page_size in PAGE_SIZES:
+            response = client.get(url, {"limit": page_size})
+            self.assertEqual(response.status_code, 200)
+            counts[page_size] = self.assertWithinBudget(response, url_name)
+        self.assertEqual(
+            len(set(counts.values())),
+            1,
+            f"{url_name}: query count grows with page size {counts}",
+        )
+
+    def test_budgets_cover_api_routes(self):
+        patterns = [
+            *food_urls.urlpatterns,
+            *food_urls.router.urls,
+            *users_urls.urlpatterns,
+        ]
+        for pattern in patterns:
+            if isinstance(pattern, URLPattern):
+                self.assertIn(pattern.name, settings.QUERY_BUDGETS)
+
+    def test_recipe_list(self):
+        self.assertConstantAcrossPageSizes("/api/recipes/", "recipe-list")
+        self.assertConstantAcrossPageSizes(
+            "/api/recipes/", "recipe-list", client=self.anon_client
+        )
+
+    def test_recipe_list_filters(self):
+        for params in (
+            "is_favorited=1",
+            "is_in_shopping_cart=1",
+            f"tags={self.tags[0].slug}&tags={self.tags[1].slug}",
+            f"author={self.authors[0].id}",
+        ):
+            self.assertConstantAcrossPageSizes(
+                f"/api/recipes/?{params}", "recipe-list"
+            )
+
+    def test_recipe_detail(self):
+        for client in (self.client, self.anon_client):
+            response = client.get(f"/api/recipes/{self.recipes[0].id}/")
+            self.assertWithinBudget(response, "recipe-detail")
+
+    def test_reference_data(self):
+        for url, url_name in (
+            ("/api/tags/", "tag-list"),
+            (f"/api/tags/{self.tags[0].id}/", "tag-detail"),
+            ("/api/ingredients/?name=ингр", "ingredient-list"),
+            (
+                f"/api/ingredients/{self.ingredients[0].id}/",
+                "ingredient-detail",
+            ),
+        ):
+            self.assertWithinBudget(self.client.get(url), url_name)
+
+    def test_subscription_list(self):
+        self.assertConstantAcrossPageSizes(
+            "/api/users/subscriptions/?recipes_limit=1",
+            "user-subscriptions-list",
+        )
+
+    def test_user_list(self):
+        self.assertConstantAcrossPageSizes("/api/users/", "customuser-list")
+        response = self.client.get("/api/users/", {"limit": 3})
+        self.assertEqual(
+            [user["is_subscribed"] for user in response.data["results"]],
+            [False, False, True],
+        )
+
+    def test_user_endpoints(self):
+        for url, url_name in (
+            ("/api/users/me/", "user-me"),
+            (f"/api/users/{self.authors[0].id}/", "customuser-detail"),
+        ):
+            self.assertWithinBudget(self.client.get(url), url_name)
+
+    def test_short_links(self):
+        recipe = self.recipes[0]
+        response = self.client.get(f"/api/recipes/{recipe.id}/get-link/")
+        self.assertWithinBudget(response, "recipe-get-link")
+        response = self.anon_client.get(f"/api/s/{recipe.short_link}/")
+        self.assertWithinBudget(response, "short_link")
+
+    def test_download_shopping_cart(self):
+        # Первый запрос строит индекс ингредиентов в памяти процесса.
+        ingredient_index.invalidate()
+        self.client.get("/api/recipes/download_shopping_cart/")
+        response = self.client.get("/api/recipes/download_shopping_cart/")
+        self.assertWithinBudget(response, "download-shopping-cart")
+
+    def test_favorite_and_shopping_cart(self):
+        recipe = Recipe.objects.create(
+            name="Рецепт",
+            author=self.authors[0],
+            text="Описание",
+            cooking_time=1,
+        )
+        for url, url_name in (
+            (f"/api/recipes/{recipe.id}/favorite/", "recipe-favorite"),
+            (
+                f"/api/recipes/{recipe.id}/shopping_cart/",
+                "manage-shopping-cart",
+            ),
+        ):
+            response = self.client.post(url)
+            self.assertEqual(response.status_code, 201)
+            self.assertWithinBudget(response, url_name)
+            response = self.client.delete(url)
+            self.assertEqual(response.status_code, 204)
+            self.assertWithinBudget(response, url_name)
+
+    def test_subscribe(self):
+        url = f"/api/users/{self.authors[0].id}/subscribe/"
+        response = self.client.post(url, {"recipes_limit": 1})
+        self.assertEqual(response.status_code, 201)
+        self.assertWithinBudget(response, "user-unsubscribe")
+        response = self.client.delete(url)
+        self.assertEqual(response.status_code, 204)
+        self.assertWithinBudget(response, "user-unsubscribe")
+
+    def test_feed(self):
+        self.client.post(
+            "/api/users/subscriptions/batch/",
+            {"add": [author.id for author in self.authors]},
+            format="json",
+        )
+        response = self.client.get("/api/recipes/feed/")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data["results"])
+        self.assertWithinBudget(response, "recipe-feed")
+
+    def test_batches(self):
+        # Первый запрос создаёт список покупок.
+        ShoppingList.objects.filter(user=self.user).delete()
+        recipe_ids = list(
+            Recipe.objects.values_list("pk", flat=True).order_by("pk")[:20]
+        )
+        author_ids = [author.id for author in self.authors]
+        for url, ids, url_name in (
+            (
+                "/api/recipes/shopping_cart/batch/",
+                recipe_ids,
+                "shopping-cart-batch",
+            ),
+            ("/api/recipes/favorite/batch/", recipe_ids, "favorite-batch"),
+            (
+                "/api/users/subscriptions/batch/",
+                author_ids,
+                "subscription-batch",
+            ),
+        ):
+            for action in ("add", "remove"):
+                response = self.client.post(url, {action: ids}, format="json")
+                self.assertEqual(response.status_code, 200)
+                self.assertWithinBudget(response, url_name)
+
+    def test_recipe_write(self):
+        payload = {
+            "name": "Новый рецепт",
+            "text": "Описание",
+            "cooking_time": 5,
+            "image": make_image(),
+            "tags": [tag.id for tag in self.tags],
+            "ingredients": [
+                {"id": ingredient.id, "amount": 2}
+                for ingredient in self.ingredients[:10]
+            ],
+        }
+        response = self.client.post("/api/recipes/", payload, format="json")
+        self.assertEqual(response.status_code, 201)
+        self.assertWithinBudget(response, "recipe-list")
+
+        url = f"/api/recipes/{response.data['id']}/"
+        payload.pop("image")
+        response = self.client.patch(url, payload, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertWithinBudget(response, "recipe-detail")
+
+        response = self.client.delete(url)
+        self.assertEqual(response.status_code, 204)
+        self.assertWithinBudget(response, "recipe-detail")
+
+    def test_avatar(self):
+        response = self.client.put(
+            "/api/users/me/avatar/", {"avatar": make_image()}, format="json"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertWithinBudget(response, "user-avatar-update")
+
+    def test_token_login_logout(self):
+        response = self.anon_client.post(
+            "/api/auth/token/login/",
+            {"email": "author0@example.com", "password": "password"},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertWithinBudget(response, "login")
+        self.anon_client.credentials(
+            HTTP_AUTHORIZATION=f"Token {response.data['auth_token']}"
+        )
+        response = self.anon_client.post("/api/auth/token/logout/")
+        self.assertWithinBudget(response, "logout")
@@ -0,0 +1,128 @@
+from datetime import timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+from django.utils.http import http_date
+from rest_framework.test import APIClient
+
+from food.models import FavoriteRecipe, Ingredient, Recipe, Tag
+from users.models import CustomUser, Subscription
+
+
+class RecipeConditionalGetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = CustomUser.objects.create_user(
+            email="author@example.com",
+            password="password",
+            username="author",
+            first_name="Имя",
+            last_name="Фамилия",
+        )
+        cls.reader = CustomUser.objects.create_user(
+            email="reader@example.com",
+            password="password",
+            username="reader",
+            first_name="Имя",
+            last_name="Фамилия",
+        )
+        cls.tag = Tag.objects.create(name="Обед", slug="lunch")
+        cls.ingredient = Ingredient.objects.create(
+            name="соль", measurement_unit="г"
+        )
+        cls.recipes = [
+            Recipe.objects.create(
+                name=f"Рецепт {i}",
+                text="Описание",
+                author=cls.author,
+                cooking_time=10,
+            )
+            for i in range(3)
+        ]
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.reader)
+        self.url = f"/api/recipes/{self.recipes[0].pk}/"
+
+    def test_not_modified_after_single_query(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                self.url, HTTP_IF_NONE_MATCH=response["ETag"]
+            )
+        self.assertEqual(response.status_code, 304)
+
+    def test_etag_depends_on_user_flags(self):
+        response = self.client.get(self.url)
+        self.assertNotIn("Last-Modified", response)
+        etag = response["ETag"]
+        FavoriteRecipe.objects.create(user=self.reader, recipe=self.recipes[0])
+        response = self.client.get(
+            self.url,
+            HTTP_IF_NONE_MATCH=etag,
+            HTTP_IF_MODIFIED_SINCE=http_date(
+                (timezone.now() + timedelta(minutes=1)).timestamp()
+            ),
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data["is_favorited"])
+
+        anonymous = APIClient().get(self.url)
+        self.assertNotEqual(anonymous["ETag"], response["ETag"])
+
+    def test_etag_depends_on_author(self):
+        etag = self.client.get(self.url)["ETag"]
+        CustomUser.objects.filter(pk=self.author.pk).update(first_name="Новое")
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["author"]["first_name"], "Новое")
+
+        etag = response["ETag"]
+        Subscription.objects.create(
+            user=self.reader, subscribed_to=self.author
+        )
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data["author"]["is_subscribed"])
+
+    def test_update_bumps_updated_at(self):
+        recipe = self.recipes[0]
+        etag = self.client.get(self.url)["ETag"]
+        self.client.force_authenticate(self.author)
+        response = self.client.patch(
+            self.url,
+            {
+                "tags": [self.tag.pk],
+                "ingredients": [{"id": self.ingredient.pk, "amount": 2}],
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+        updated = Recipe.objects.get(pk=recipe.pk)
+        self.assertGreater(updated.updated_at, recipe.updated_at)
+        self.assertEqual(updated.created_at, recipe.created_at)
+
+        self.client.force_authenticate(self.reader)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_list_ordered_by_freshness(self):
+        stale = self.recipes[0]
+        stale.name = "Обновлённый рецепт"
+        stale.save()
+        response = self.client.get("/api/recipes/?ordering=-updated_at")
+        self.assertEqual(response.data["results"][0]["id"], stale.pk)
+        response = self.client.get("/api/recipes/?ordering=created_at")
+        self.assertEqual(
+            [item["id"] for item in response.data["results"]],
+            [recipe.pk for recipe in self.recipes],
+        )
+        ids, url = [], "/api/recipes/?cursor=&limit=2&ordering=-updated_at"
+        while url:
+            response = self.client.get(url)
+            ids.extend(item["id"] for item in response.data["results"])
+            url = response.data["next"]
+        self.assertEqual(ids[0], stale.pk)
+        self.assertEqual(sorted(ids), [recipe.pk for recipe in self.recipes])
@@ -0,0 +1,49 @@
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from food.models import Recipe, Tag
+from users.models import CustomUser
+
+
+class RecipeSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = CustomUser.objects.create_user(
+            email="author@example.com",
+            password="password",
+            username="author",
+            first_name="Имя",
+            last_name="Фамилия",
+        )
+        cls.tag = Tag.objects.create(name="Завтрак", slug="breakfast")
+        cls.recipes = {}
+        for name, text in (
+            ("omelette", "eggs and milk"),
+            ("pancakes", "flour, milk and eggs"),
+            ("milkshake", "banana"),
+        ):
+            cls.recipes[name] = Recipe.objects.create(
+                name=name, text=text, author=author, cooking_time=10
+            )
+        cls.recipes["omelette"].tags.add(cls.tag)
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def get_names(self, params):
+        response = self.client.get("/api/recipes/", params)
+        self.assertEqual(response.status_code, 200)
+        return [recipe["name"] for recipe in response.data["results"]]
+
+    def test_name_matches_rank_above_text_matches(self):
+        self.assertEqual(
+            self.get_names({"search": "milk"}),
+            ["milkshake", "pancakes", "omelette"],
+        )
+        self.assertEqual(self.get_names({"search": "omelette"}), ["omelette"])
+
+    def test_search_combines_with_filters(self):
+        self.assertEqual(
+            self.get_names({"search": "milk", "tags": self.tag.slug}),
+            ["omelette"],
+        )
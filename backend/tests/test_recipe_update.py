@@ -0,0 +1,262 @@
+import shutil
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from food.catalog import catalog
+from food.ingredient_index import ingredient_index
+from food.models import Ingredient, Recipe, RecipeIngredient, ShoppingList, Tag
+from users.models import CustomUser
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+class RecipeUpdateTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(
+            email="user@example.com",
+            password="password",
+            username="user",
+            first_name="Имя",
+            last_name="Фамилия",
+        )
+        cls.tags = [
+            Tag.objects.create(name=f"Тег {i}", slug=f"tag{i}")
+            for i in range(3)
+        ]
+        cls.ingredients = [
+            Ingredient.objects.create(
+                name=f"ингредиент {i}", measurement_unit="г"
+            )
+            for i in range(3)
+        ]
+        cls.recipe = Recipe.objects.create(
+            name="Рецепт", text="Описание", author=cls.user, cooking_time=5
+        )
+        cls.recipe.tags.set(cls.tags[:2])
+        for ingredient in cls.ingredients[:2]:
+            RecipeIngredient.objects.create(
+                recipe=cls.recipe, ingredient=ingredient, amount=10
+            )
+        ShoppingList.objects.create(user=cls.user).recipe.add(cls.recipe)
+        ShoppingList.objects.filter(user=cls.user).update(
+            ingredients={
+                str(ingredient.id): "10" for ingredient in cls.ingredients[:2]
+            }
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = f"/api/recipes/{self.recipe.pk}/"
+        # Отодвигаем отметку, чтобы заметить её обновление.
+        Recipe.objects.filter(pk=self.recipe.pk).update(
+            updated_at=self.recipe.updated_at - timedelta(days=1)
+        )
+
+    def patch(self, payload):
+        response = self.client.patch(self.url, payload, format="json")
+        self.assertEqual(response.status_code, 200, response.data)
+        return response
+
+    def get_rows(self):
+        return dict(
+            RecipeIngredient.objects.filter(recipe=self.recipe).values_list(
+                "ingredient_id", "pk"
+            )
+        )
+
+    def get_updated_at(self):
+        return Recipe.objects.get(pk=self.recipe.pk).updated_at
+
+    def test_patch_without_nested_keeps_relations(self):
+        rows = self.get_rows()
+        response = self.patch({"cooking_time": 7})
+        self.assertEqual(response.data["cooking_time"], 7)
+        self.assertEqual(len(response.data["tags"]), 2)
+        self.assertEqual(len(response.data["ingredients"]), 2)
+        self.assertEqual(self.get_rows(), rows)
+
+    def test_ingredient_diff_keeps_unchanged_rows(self):
+        first, second, third = self.ingredients
+        rows = self.get_rows()
+        self.patch(
+            {
+                "ingredients": [
+                    {"id": first.id, "amount": 10},
+                    {"id": third.id, "amount": 5},
+                ]
+            }
+        )
+        new_rows = self.get_rows()
+        self.assertEqual(new_rows[first.id], rows[first.id])
+        self.assertNotIn(second.id, new_rows)
+        totals = ShoppingList.objects.get(user=self.user).ingredients
+        self.assertEqual(
+            {int(key): Decimal(amount) for key, amount in totals.items()},
+            {first.id: 10, third.id: 5},
+        )
+
+    def test_tags_only_change_bumps_updated_at(self):
+        updated_at = self.get_updated_at()
+        self.patch({"tags": [self.tags[2].id]})
+        self.assertEqual(
+            list(self.recipe.tags.values_list("id", flat=True)),
+            [self.tags[2].id],
+        )
+        self.assertGreater(self.get_updated_at(), updated_at)
+
+    def test_unchanged_patch_writes_nothing(self):
+        updated_at = self.get_updated_at()
+        self.patch(
+            {
+                "name": "Рецепт",
+                "tags": [tag.id for tag in self.tags[:2]],
+                "ingredients": [
+                    {"id": ingredient.id, "amount": 10}
+                    for ingredient in self.ingredients[:2]
+                ],
+            }
+        )
+        self.assertEqual(self.get_updated_at(), updated_at)
+
+    def test_failure_rolls_back_whole_update(self):
+        with mock.patch(
+            "food.serializers.apply_recipe_change", side_effect=RuntimeError
+        ):
+            with self.assertRaises(RuntimeError):
+                self.client.patch(
+                    self.url,
+                    {
+                        "name": "Другое",
+                        "tags": [self.tags[2].id],
+                        "ingredients": [
+                            {"id": self.ingredients[2].id, "amount": 1}
+                        ],
+                    },
+                    format="json",
+                )
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.name, "Рецепт")
+        self.assertEqual(self.recipe.tags.count(), 2)
+        self.assertEqual(
+            set(self.get_rows()), {i.id for i in self.ingredients[:2]}
+        )
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class RecipeValidationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(
+            email="user@example.com",
+            password="password",
+            username="user",
+            first_name="Имя",
+            last_name="Фамилия",
+        )
+        cls.tag = Tag.objects.create(name="Тег", slug="tag")
+        cls.ingredient = Ingredient.objects.create(
+            name="сахар", measurement_unit="г"
+        )
+        cls.recipe = Recipe.objects.create(
+            name="Рецепт", text="Описание", author=cls.user, cooking_time=5
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        catalog.invalidate()
+        ingredient_index.invalidate()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = f"/api/recipes/{self.recipe.pk}/"
+
+    def patch(self, tags=None, ingredients=None):
+        return self.client.patch(
+            self.url,
+            {
+                "tags": tags or [self.tag.id],
+                "ingredients": ingredients
+                or [{"id": self.ingredient.id, "amount": 1}],
+            },
+            format="json",
+        )
+
+    def test_decimal_amounts(self):
+        for amount in ("0.5", 0.25, "9999.99"):
+            response = self.patch(
+                ingredients=[{"id": self.ingredient.id, "amount": amount}]
+            )
+            self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(
+            str(RecipeIngredient.objects.get(recipe=self.recipe).amount),
+            "9999.99",
+        )
+        for amount in ("0", "-1", "0.125", "10000", "много", None):
+            response = self.patch(
+                ingredients=[{"id": self.ingredient.id, "amount": amount}]
+            )
+            self.assertEqual(response.status_code, 400, amount)
+
+    def test_unknown_ids_rejected(self):
+        self.assertEqual(self.patch(tags=[self.tag.id + 100]).status_code, 400)
+        self.assertEqual(self.patch(tags=["x"]).status_code, 400)
+        self.assertEqual(self.patch(tags=[self.tag.id + 0.9]).status_code, 400)
+        response = self.patch(
+            ingredients=[{"id": self.ingredient.id + 0.5, "amount": 1}]
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            self.patch(tags=[float(self.tag.id)]).status_code, 200
+        )
+        response = self.patch(
+            ingredients=[{"id": self.ingredient.id + 100, "amount": 1}]
+        )
+        self.assertEqual(response.status_code, 400)
+        response = self.patch(ingredients=[{"amount": 1}])
+        self.assertEqual(response.status_code, 400)
+
+    def test_ids_added_elsewhere_accepted(self):
+        self.assertEqual(self.patch().status_code, 200)
+        # bulk_create не шлёт сигналов: так выглядят записи, добавленные
+        # другим процессом до истечения CATALOG_VERSION_TTL.
+        tag = Tag.objects.bulk_create([Tag(name="Новый", slug="new")])[0]
+        ingredient = Ingredient.objects.bulk_create(
+            [Ingredient(name="соль", measurement_unit="г")]
+        )[0]
+        response = self.patch(
+            tags=[tag.id], ingredients=[{"id": ingredient.id, "amount": 1}]
+        )
+        self.assertEqual(response.status_code, 200, response.data)
+
+    def test_no_reads_before_insert(self):
+        self.assertEqual(self.patch().status_code, 200)
+        payload = {
+            "name": "Новый",
+            "text": "Описание",
+            "cooking_time": 5,
+            "image": "data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAAB"
+            "CAIAAACQd1PeAAAADElEQVR4nGP4//8/AAX+Av4N70a4AAAAAElFTkSuQmCC",
+            "tags": [self.tag.id],
+            "ingredients": [{"id": self.ingredient.id, "amount": "0.5"}],
+        }
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(
+                "/api/recipes/", payload, format="json"
+            )
+        self.assertEqual(response.status_code, 201, response.data)
+        statements = [query["sql"].split()[0] for query in queries]
+        self.assertEqual(
+            statements[: statements.index("INSERT")], ["SAVEPOINT"]
+        )
@@ -0,0 +1,178 @@
+import json
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from food.models import Ingredient, Recipe, RecipeIngredient, ShoppingList, Tag
+from users.models import CustomUser
+
+
+class DownloadShoppingCartTests(TestCase):
+    url = "/api/recipes/download_shopping_cart/"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(
+            email="user@example.com",
+            password="password",
+            username="user",
+            first_name="Имя",
+            last_name="Фамилия",
+        )
+        sugar = Ingredient.objects.create(name="сахар", measurement_unit="г")
+        milk = Ingredient.objects.create(name="молоко", measurement_unit="мл")
+        shopping_list = ShoppingList.objects.create(user=cls.user)
+        for amounts in ((100, "0.5"), (50, 1)):
+            recipe = Recipe.objects.create(
+                name="Рецепт", author=cls.user, text="Текст", cooking_time=5
+            )
+            RecipeIngredient.objects.create(
+                recipe=recipe, ingredient=sugar, amount=amounts[0]
+            )
+            RecipeIngredient.objects.create(
+                recipe=recipe, ingredient=milk, amount=amounts[1]
+            )
+            shopping_list.recipe.add(recipe)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def download(self, **kwargs):
+        response = self.client.get(self.url, **kwargs)
+        self.assertEqual(response.status_code, 200)
+        return response, b"".join(response.streaming_content).decode()
+
+    def test_txt_is_default(self):
+        response, content = self.download()
+        self.assertTrue(response["Content-Type"].startswith("text/plain"))
+        self.assertEqual(
+            content,
+            "Список покупок для пользователя: user@example.com\n\n"
+            "Ингредиент | Единица измерения | Количество\n"
+            "-------------------------------------------\n"
+            "молоко     | мл                |       1.50\n"
+            "сахар      | г                 |        150\n",
+        )
+
+    def test_csv_by_accept_header(self):
+        response, content = self.download(HTTP_ACCEPT="text/csv")
+        self.assertIn("shopping_list.csv", response["Content-Disposition"])
+        self.assertEqual(
+            content.splitlines(),
+            [
+                "Ингредиент,Единица измерения,Количество",
+                "молоко,мл,1.50",
+                "сахар,г,150",
+            ],
+        )
+
+    def test_json_by_query_param(self):
+        _, content = self.download(data={"format": "json"})
+        self.assertEqual(
+            json.loads(content),
+            [
+                {"name": "молоко", "measurement_unit": "мл", "amount": 1.5},
+                {"name": "сахар", "measurement_unit": "г", "amount": 150},
+            ],
+        )
+
+    def test_empty_cart(self):
+        ShoppingList.objects.all().delete()
+        _, content = self.download()
+        self.assertEqual(len(content.splitlines()), 4)
+
+
+class ShoppingListTotalsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(
+            email="user@example.com",
+            password="password",
+            username="user",
+            first_name="Имя",
+            last_name="Фамилия",
+        )
+        cls.sugar, cls.milk, cls.salt = Ingredient.objects.bulk_create(
+            Ingredient(name=name, measurement_unit="г")
+            for name in ("сахар", "молоко", "соль")
+        )
+        cls.tag = Tag.objects.create(name="Завтрак", slug="breakfast")
+        cls.recipes = []
+        for amount in (100, 50):
+            recipe = Recipe.objects.create(
+                name="Рецепт", author=cls.user, text="Текст", cooking_time=5
+            )
+            RecipeIngredient.objects.create(
+                recipe=recipe, ingredient=cls.sugar, amount=amount
+            )
+            RecipeIngredient.objects.create(
+                recipe=recipe, ingredient=cls.milk, amount="0.5"
+            )
+            cls.recipes.append(recipe)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def get_totals(self):
+        return {
+            int(key): Decimal(amount)
+            for key, amount in ShoppingList.objects.get(
+                user=self.user
+            ).ingredients.items()
+        }
+
+    def assertConsistent(self):
+        call_command("rebuild_shopping_lists", check=True, stdout=StringIO())
+
+    def test_cart_add_and_remove(self):
+        for recipe in self.recipes:
+            self.client.post(f"/api/recipes/{recipe.id}/shopping_cart/")
+        self.assertEqual(
+            self.get_totals(), {self.sugar.id: 150, self.milk.id: 1}
+        )
+        self.client.delete(f"/api/recipes/{self.recipes[0].id}/shopping_cart/")
+        self.assertEqual(
+            self.get_totals(),
+            {self.sugar.id: 50, self.milk.id: Decimal("0.5")},
+        )
+        self.assertConsistent()
+
+    def test_recipe_changes_update_carts(self):
+        recipe = self.recipes[0]
+        self.client.post(f"/api/recipes/{recipe.id}/shopping_cart/")
+        response = self.client.patch(
+            f"/api/recipes/{recipe.id}/",
+            {
+                "tags": [self.tag.id],
+                "ingredients": [
+                    {"id": self.sugar.id, "amount": 10},
+                    {"id": self.salt.id, "amount": 2},
+                ],
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            self.get_totals(), {self.sugar.id: 10, self.salt.id: 2}
+        )
+        self.assertConsistent()
+
+        self.client.delete(f"/api/recipes/{recipe.id}/")
+        self.assertEqual(self.get_totals(), {})
+        self.assertConsistent()
+
+    def test_rebuild_fixes_drift(self):
+        self.client.post(f"/api/recipes/{self.recipes[0].id}/shopping_cart/")
+        ShoppingList.objects.update(ingredients={})
+        with self.assertRaises(CommandError):
+            self.assertConsistent()
+        call_command("rebuild_shopping_lists", stdout=StringIO())
+        self.assertEqual(
+            self.get_totals(),
+            {self.sugar.id: 100, self.milk.id: Decimal("0.5")},
+        )
@@ -0,0 +1,93 @@
+import os
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from food.base62 import decode, encode
+from food.models import Recipe
+from food.short_links import short_link_resolver
+from users.models import CustomUser
+
+
+class ShortLinkTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = CustomUser.objects.create_user(
+            email="author@example.com",
+            password="password",
+            username="author",
+            first_name="Имя",
+            last_name="Фамилия",
+        )
+
+    def setUp(self):
+        short_link_resolver.clear()
+        self.client = APIClient()
+
+    def create_recipe(self, name="Рецепт"):
+        return Recipe.objects.create(
+            name=name, text="Описание", author=self.author, cooking_time=10
+        )
+
+    def test_base62_round_trip(self):
+        for number in (0, 1, 61, 62, 3843, 3844, 10**12):
+            self.assertEqual(decode(encode(number)), number)
+        self.assertEqual(encode(61), "Z")
+        self.assertEqual(encode(62), "10")
+        for code in ("", "01", "a-b"):
+            with self.assertRaises(ValueError):
+                decode(code)
+
+    def test_code_is_derived_from_pk(self):
+        recipes = [self.create_recipe(f"Рецепт {i}") for i in range(3)]
+        for recipe in recipes:
+            recipe.refresh_from_db()
+            self.assertEqual(recipe.short_link, encode(recipe.pk))
+            self.assertEqual(decode(recipe.short_link), recipe.pk)
+
+    def test_redirect_is_cached(self):
+        recipe = self.create_recipe()
+        url = f"/api/s/{recipe.short_link}/"
+        response = self.client.get(url)
+        self.assertRedirects(
+            response,
+            f"{settings.BASE_URL}recipes/{recipe.pk}/",
+            fetch_redirect_response=False,
+        )
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url).status_code, 302)
+
+    def test_deleted_recipe_is_forgotten(self):
+        recipe = self.create_recipe()
+        url = f"/api/s/{recipe.short_link}/"
+        self.assertEqual(self.client.get(url).status_code, 302)
+        recipe.delete()
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.assertEqual(self.client.get("/api/s/unknown/").status_code, 404)
+
+    def test_legacy_codes_still_resolve(self):
+        recipe = self.create_recipe()
+        Recipe.objects.filter(pk=recipe.pk).update(short_link="a1b2c3")
+        self.assertEqual(self.client.get("/api/s/a1b2c3/").status_code, 302)
+
+    def test_export_nginx_map(self):
+        recipes = [self.create_recipe(f"Рецепт {i}") for i in range(2)]
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, "short_links.map")
+            call_command(
+                "export_short_links", output=output, stdout=StringIO()
+            )
+            with open(output, encoding="utf-8") as map_file:
+                lines = map_file.read().splitlines()
+        self.assertEqual(
+            lines,
+            [
+                f"/api/s/{encode(recipe.pk)}/ "
+                f'"{settings.BASE_URL}recipes/{recipe.pk}/";'
+                for recipe in recipes
+            ],
+        )
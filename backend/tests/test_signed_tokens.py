@@ -0,0 +1,225 @@
+from django.db import connection
+from django.test import (
+    AsyncClient,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.utils import datetime_from_epoch
+
+from food.models import FavoriteRecipe, Recipe
+from users.authentication import token_denylist
+from users.models import CustomUser, RevokedToken
+
+SIGNED_TOKENS = override_settings(SIGNED_TOKENS=True)
+
+
+class SignedTokenTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(
+            email="user@example.com",
+            password="password",
+            username="user",
+            first_name="Имя",
+            last_name="Фамилия",
+        )
+        cls.recipe = Recipe.objects.create(
+            name="Рецепт", text="Описание", author=cls.user, cooking_time=5
+        )
+        FavoriteRecipe.objects.create(user=cls.user, recipe=cls.recipe)
+
+    def setUp(self):
+        token_denylist.invalidate()
+        self.client = APIClient()
+
+    def login(self):
+        response = self.client.post(
+            "/api/auth/token/login/",
+            {"email": "user@example.com", "password": "password"},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data
+
+    def get(self, url, token):
+        return self.client.get(url, HTTP_AUTHORIZATION=f"Token {token}")
+
+    def count_queries(self, url, token):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.get(url, token)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_login_issues_signed_tokens_only_when_enabled(self):
+        self.assertNotIn(".", self.login()["auth_token"])
+        with SIGNED_TOKENS:
+            tokens = self.login()
+        self.assertEqual(tokens["auth_token"].count("."), 2)
+        self.assertIn("refresh", tokens)
+
+    def test_requests_skip_token_lookup(self):
+        key = Token.objects.create(user=self.user).key
+        with SIGNED_TOKENS:
+            access = self.login()["auth_token"]
+        url = "/api/recipes/?is_favorited=1"
+        self.count_queries(url, access)
+        self.assertEqual(
+            self.count_queries(url, key) - self.count_queries(url, access),
+            1,
+        )
+        response = self.get(url, access)
+        self.assertEqual(response.data["results"][0]["id"], self.recipe.pk)
+
+    def test_user_loaded_lazily_in_one_query(self):
+        with SIGNED_TOKENS:
+            access = self.login()["auth_token"]
+        self.get("/api/users/me/", access)
+        with self.assertNumQueries(1):
+            response = self.get("/api/users/me/", access)
+        self.assertEqual(response.data["email"], "user@example.com")
+        self.assertEqual(response.data["first_name"], "Имя")
+
+    def test_refresh_rotates_and_logout_revokes(self):
+        with SIGNED_TOKENS:
+            tokens = self.login()
+        response = self.client.post(
+            "/api/auth/token/refresh/", {"refresh": tokens["refresh"]}
+        )
+        self.assertEqual(response.status_code, 200)
+        refresh = response.data["refresh"]
+        response = self.client.post(
+            "/api/auth/token/refresh/", {"refresh": tokens["refresh"]}
+        )
+        self.assertEqual(response.status_code, 401)
+
+        response = self.client.post(
+            "/api/auth/token/logout/",
+            {"refresh": refresh},
+            HTTP_AUTHORIZATION=f"Token {tokens['auth_token']}",
+        )
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(
+            self.get("/api/users/me/", tokens["auth_token"]).status_code, 401
+        )
+        response = self.client.post(
+            "/api/auth/token/refresh/", {"refresh": refresh}
+        )
+        self.assertEqual(response.status_code, 401)
+
+        # Другой процесс узнаёт об отзыве, перечитав список из базы.
+        token_denylist.invalidate()
+        self.assertEqual(
+            self.get("/api/users/me/", tokens["auth_token"]).status_code, 401
+        )
+
+    def test_refresh_rejected_for_inactive_user(self):
+        with SIGNED_TOKENS:
+            tokens = self.login()
+        CustomUser.objects.filter(pk=self.user.pk).update(is_active=False)
+        response = self.client.post(
+            "/api/auth/token/refresh/", {"refresh": tokens["refresh"]}
+        )
+        self.assertEqual(response.status_code, 401)
+
+    def test_refresh_claimed_once_across_processes(self):
+        with SIGNED_TOKENS:
+            tokens = self.login()
+        refresh = RefreshToken(tokens["refresh"])
+        self.assertFalse(token_denylist.is_revoked(refresh))
+        # Тот же токен только что обменял другой процесс: его список
+        # отозванных токенов этот процесс ещё не перечитал.
+        RevokedToken.objects.bulk_create(
+            [
+                RevokedToken(
+                    jti=refresh["jti"],
+                    expires_at=datetime_from_epoch(refresh["exp"]),
+                )
+            ]
+        )
+        response = self.client.post(
+            "/api/auth/token/refresh/", {"refresh": tokens["refresh"]}
+        )
+        self.assertEqual(response.status_code, 401)
+
+    def test_deleted_user_token_rejected(self):
+        with SIGNED_TOKENS:
+            tokens = self.login()
+        CustomUser.objects.filter(pk=self.user.pk).delete()
+        response = self.get("/api/users/me/", tokens["auth_token"])
+        self.assertEqual(response.status_code, 401)
+
+    def test_logout_ignores_malformed_body(self):
+        with SIGNED_TOKENS:
+            tokens = self.login()
+        response = self.client.post(
+            "/api/auth/token/logout/",
+            ["refresh"],
+            format="json",
+            HTTP_AUTHORIZATION=f"Token {tokens['auth_token']}",
+        )
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(
+            self.get("/api/users/me/", tokens["auth_token"]).status_code, 401
+        )
+
+    async def test_async_views_accept_signed_tokens(self):
+        with SIGNED_TOKENS:
+            tokens = await AsyncClient().post(
+                "/api/auth/token/login/",
+                {"email": "user@example.com", "password": "password"},
+            )
+        headers = {"authorization": f"Token {tokens.json()['auth_token']}"}
+        with override_settings(ROOT_URLCONF="foodgram.asgi_urls"):
+            response = await AsyncClient().get(
+                "/api/recipes/?is_favorited=1", headers=headers
+            )
+            broken = await AsyncClient().get(
+                "/api/recipes/", headers={"authorization": "Token a.b.c"}
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["count"], 1)
+        self.assertEqual(broken.status_code, 401)
+
+
+class DeletedUserWriteTests(TransactionTestCase):
+    # Вне транзакции теста, чтобы внешний ключ проверялся при записи.
+    def setUp(self):
+        token_denylist.invalidate()
+        author = CustomUser.objects.create_user(
+            email="author@example.com",
+            password="password",
+            username="author",
+            first_name="Автор",
+            last_name="Автор",
+        )
+        self.user = CustomUser.objects.create_user(
+            email="user@example.com",
+            password="password",
+            username="user",
+            first_name="Имя",
+            last_name="Фамилия",
+        )
+        self.recipe = Recipe.objects.create(
+            name="Рецепт", text="Описание", author=author, cooking_time=5
+        )
+        self.client = APIClient()
+
+    def test_deleted_user_cannot_write(self):
+        with SIGNED_TOKENS:
+            token = self.client.post(
+                "/api/auth/token/login/",
+                {"email": "user@example.com", "password": "password"},
+                format="json",
+            ).data["auth_token"]
+        CustomUser.objects.filter(pk=self.user.pk).delete()
+        response = self.client.post(
+            f"/api/recipes/{self.recipe.pk}/favorite/",
+            HTTP_AUTHORIZATION=f"Token {token}",
+        )
+        self.assertEqual(response.status_code, 401)
+        self.assertFalse(FavoriteRecipe.objects.exists())
@@ -7,13 +7,22 @@ from users.models import CustomUser, Subscription
 @admin.register(CustomUser)
 class MyUserAdmin(UserAdmin):
     model = CustomUser
-    list_display = ("username", "email", "first_name", "last_name")
+    list_display = (
+        "username",
+        "email",
+        "first_name",
+        "last_name",
+        "recipes_count",
+        "subscribers_count",
+    )
+    readonly_fields = ("recipes_count", "subscribers_count")
 
     fieldsets = (
         (None, {"fields": ("username", "password")}),
         ("Personal info", {"fields": ("first_name", "last_name", "email")}),
         ("Permissions", {"fields": ("is_active", "is_staff", "is_superuser")}),
         ("Important dates", {"fields": ("last_login",)}),
+        ("Statistics", {"fields": ("recipes_count", "subscribers_count")}),
     )
 
     add_fieldsets = (
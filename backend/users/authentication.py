@@ -0,0 +1,128 @@
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, router, transaction
+from django.utils import timezone
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import datetime_from_epoch
+
+from users.models import RevokedToken
+
+User = get_user_model()
+
+
+class TokenDenylist:
+    # Идентификаторы отозванных, но ещё не истёкших токенов. Процесс
+    # перечитывает список не чаще раза в JWT_DENYLIST_TTL секунд, свои
+    # отзывы видит сразу.
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._jtis = None
+        self._loaded_at = 0.0
+
+    def invalidate(self):
+        self._jtis = None
+
+    def _is_stale(self):
+        return (
+            self._jtis is None
+            or time.monotonic() - self._loaded_at > settings.JWT_DENYLIST_TTL
+        )
+
+    def _get_jtis(self):
+        if self._is_stale():
+            with self._lock:
+                if self._is_stale():
+                    self._jtis = set(
+                        RevokedToken.objects.using("default")
+                        .filter(expires_at__gt=timezone.now())
+                        .values_list("jti", flat=True)
+                    )
+                    self._loaded_at = time.monotonic()
+        return self._jtis
+
+    def is_revoked(self, token):
+        return token[api_settings.JTI_CLAIM] in self._get_jtis()
+
+    def revoke(self, *tokens):
+        # Истёкшие записи больше не нужны: такие токены не пройдут
+        # проверку подписи и срока.
+        RevokedToken.objects.filter(expires_at__lte=timezone.now()).delete()
+        RevokedToken.objects.bulk_create(
+            [
+                RevokedToken(
+                    jti=token[api_settings.JTI_CLAIM],
+                    expires_at=datetime_from_epoch(token["exp"]),
+                )
+                for token in tokens
+            ],
+            ignore_conflicts=True,
+        )
+        jtis = self._get_jtis()
+        with self._lock:
+            jtis.update(token[api_settings.JTI_CLAIM] for token in tokens)
+
+    def claim(self, token):
+        # Одноразовый токен принимается, только если запись о нём удалось
+        # вставить: из параллельных запросов с одним токеном пройдёт один.
+        jti = token[api_settings.JTI_CLAIM]
+        try:
+            with transaction.atomic():
+                RevokedToken.objects.create(
+                    jti=jti, expires_at=datetime_from_epoch(token["exp"])
+                )
+        except IntegrityError:
+            return False
+        jtis = self._get_jtis()
+        with self._lock:
+            jtis.add(jti)
+        return True
+
+
+token_denylist = TokenDenylist()
+
+
+def get_token_user(user_id):
+    # Экземпляр модели только с id: фильтры по пользователю и проверки
+    # авторства обходятся без запроса, остальные поля загружаются при
+    # первом обращении.
+    user = User.from_db(router.db_for_write(User), ["id"], [user_id])
+    user._from_token = True
+    return user
+
+
+class SignedTokenAuthentication(JWTAuthentication):
+    def get_raw_token(self, header):
+        raw_token = super().get_raw_token(header)
+        # Ключи TokenAuthentication без точек проверяет следующий класс.
+        if raw_token is None or b"." not in raw_token:
+            return None
+        return raw_token
+
+    def get_validated_token(self, raw_token):
+        token = super().get_validated_token(raw_token)
+        if token_denylist.is_revoked(token):
+            raise InvalidToken("Token is revoked.")
+        return token
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken("Token contained no user identification.")
+        return get_token_user(user_id)
+
+
+def get_signed_token_user(request):
+    # Для асинхронных представлений: None, если токен не подписанный или
+    # не принят — тогда ответ формирует синхронное представление.
+    try:
+        result = SignedTokenAuthentication().authenticate(request)
+    except AuthenticationFailed:
+        return None
+    return result[0] if result else None
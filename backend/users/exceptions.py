@@ -0,0 +1,26 @@
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, router
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.views import exception_handler as drf_exception_handler
+
+from users.models import TokenUserDeleted
+
+User = get_user_model()
+
+
+def exception_handler(exc, context):
+    # Токен доступа пережил своего пользователя: ленивая загрузка полей
+    # не находит строку, а запись со ссылкой на него не проходит проверку
+    # внешнего ключа. Вместо 500 — 401.
+    if isinstance(exc, IntegrityError):
+        user = getattr(context["request"], "user", None)
+        if (
+            isinstance(user, User)
+            and not User.objects.using(router.db_for_write(User))
+            .filter(pk=user.pk)
+            .exists()
+        ):
+            exc = TokenUserDeleted()
+    if isinstance(exc, TokenUserDeleted):
+        exc = AuthenticationFailed("User not found.")
+    return drf_exception_handler(exc, context)
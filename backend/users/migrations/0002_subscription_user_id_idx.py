@@ -0,0 +1,19 @@
+# Generated by Django 5.1 on 2026-10-17 04:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="subscription",
+            index=models.Index(
+                fields=["user", "id"], name="subscription_user_id_idx"
+            ),
+        ),
+    ]
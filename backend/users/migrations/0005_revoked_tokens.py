@@ -0,0 +1,45 @@
+# Generated by Django 5.1 on 2026-10-17 05:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0004_image_variants"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RevokedToken",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "jti",
+                    models.CharField(
+                        max_length=64,
+                        unique=True,
+                        verbose_name="Идентификатор токена",
+                    ),
+                ),
+                (
+                    "expires_at",
+                    models.DateTimeField(
+                        db_index=True, verbose_name="Истекает"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Отозванный токен",
+                "verbose_name_plural": "Отозванные токены",
+            },
+        ),
+    ]
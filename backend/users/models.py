@@ -7,6 +7,13 @@ from django.contrib.auth.models import (
 from django.core.validators import RegexValidator
 from django.db import models
 
+from users.counters import CounterFieldsMixin
+
+
+class TokenUserDeleted(Exception):
+    # Не ObjectDoesNotExist: поля сериализатора DRF его не глотают.
+    pass
+
 
 class CustomUserManager(BaseUserManager):
     def create_user(self, email, password=None, **extra_fields):
@@ -23,7 +30,7 @@ class CustomUserManager(BaseUserManager):
         return self.create_user(email, password, **extra_fields)
 
 
-class CustomUser(AbstractBaseUser, PermissionsMixin):
+class CustomUser(CounterFieldsMixin, AbstractBaseUser, PermissionsMixin):
     email = models.EmailField(unique=True, verbose_name="Электронная почта")
     username = models.CharField(
         max_length=150,
@@ -41,8 +48,22 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
     avatar = models.ImageField(
         upload_to="users/images/", blank=True, null=True, verbose_name="Аватар"
     )
+    avatar_variants = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        verbose_name="Уменьшенные копии аватара",
+    )
     is_active = models.BooleanField(default=True, verbose_name="Активен")
     is_staff = models.BooleanField(default=False, verbose_name="Сотрудник")
+    recipes_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name="Количество рецептов"
+    )
+    subscribers_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name="Количество подписчиков"
+    )
+
+    counter_fields = ("recipes_count", "subscribers_count")
 
     objects = CustomUserManager()
 
@@ -56,6 +77,20 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
     def __str__(self):
         return f"{self.first_name} {self.last_name} ({self.email})"
 
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        # Пользователь из подписанного токена загружается целиком при
+        # первом обращении к незагруженному полю, одним запросом.
+        from_token = self.__dict__.pop("_from_token", False)
+        if fields is not None and from_token:
+            fields = self.get_deferred_fields() | set(fields)
+        try:
+            super().refresh_from_db(using, fields, from_queryset)
+        except self.DoesNotExist:
+            if from_token:
+                # Пользователь удалён, а его токен доступа ещё не истёк.
+                raise TokenUserDeleted
+            raise
+
 
 class Subscription(models.Model):
     user = models.ForeignKey(
@@ -78,8 +113,28 @@ class Subscription(models.Model):
                 name="unique_user_subscription",
             )
         ]
+        indexes = [
+            # Список подписок упорядочен по id в пределах пользователя.
+            models.Index(
+                fields=["user", "id"], name="subscription_user_id_idx"
+            )
+        ]
         verbose_name = "Подписка"
         verbose_name_plural = "Подписки"
 
     def __str__(self):
         return f"{self.user.email} подписан на {self.subscribed_to.email}"
+
+
+class RevokedToken(models.Model):
+    jti = models.CharField(
+        max_length=64, unique=True, verbose_name="Идентификатор токена"
+    )
+    expires_at = models.DateTimeField(db_index=True, verbose_name="Истекает")
+
+    class Meta:
+        verbose_name = "Отозванный токен"
+        verbose_name_plural = "Отозванные токены"
+
+    def __str__(self):
+        return self.jti
@@ -1,6 +1,8 @@
 from rest_framework.pagination import PageNumberPagination
 
+from food.pagination import KeysetOptInMixin
 
-class CustomPagination(PageNumberPagination):
+
+class CustomPagination(KeysetOptInMixin, PageNumberPagination):
     page_size = 10
     page_size_query_param = "limit"
@@ -1,10 +1,16 @@
 from django.contrib.auth import get_user_model
 from djoser.serializers import UserCreateSerializer
-from drf_extra_fields.fields import Base64ImageField
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
 
+from food.images import variant_urls
 from food.models import Recipe
+from food.serializers import ImageVariantsField
+from food.uploads import ImageUploadField
+from users.authentication import token_denylist
 from users.models import CustomUser, Subscription
 
 CustomUser = get_user_model()  # noqa: F811
@@ -12,6 +18,8 @@ CustomUser = get_user_model()  # noqa: F811
 
 class IsSubscribedMixin:
     def get_is_subscribed(self, obj):
+        if hasattr(obj, "is_subscribed"):
+            return obj.is_subscribed
         request = self.context.get("request")
         if request and request.user.is_authenticated:
             return Subscription.objects.filter(
@@ -22,6 +30,7 @@ class IsSubscribedMixin:
 
 class CustomUserSerializer(serializers.ModelSerializer, IsSubscribedMixin):
     is_subscribed = serializers.SerializerMethodField()
+    avatar_variants = ImageVariantsField("avatar")
 
     class Meta:
         model = CustomUser
@@ -33,6 +42,7 @@ class CustomUserSerializer(serializers.ModelSerializer, IsSubscribedMixin):
             "last_name",
             "is_subscribed",
             "avatar",
+            "avatar_variants",
         )
 
 
@@ -57,7 +67,7 @@ class CustomUserCreateSerializer(UserCreateSerializer):
 
 
 class UserAvatarSerializer(CustomUserSerializer):
-    avatar = Base64ImageField()
+    avatar = ImageUploadField()
 
     class Meta:
         model = CustomUser
@@ -74,7 +84,7 @@ class CustomUserSubscriptionSerializer(
 ):
     is_subscribed = serializers.SerializerMethodField()
     recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.SerializerMethodField()
+    avatar_variants = ImageVariantsField("avatar")
 
     class Meta:
         model = CustomUser
@@ -88,16 +98,18 @@ class CustomUserSubscriptionSerializer(
             "recipes",
             "recipes_count",
             "avatar",
+            "avatar_variants",
         )
 
     def get_recipes(self, obj):
         request = self.context.get("request")
-        recipes_limit = self.context.get("recipes_limit")
-        recipes = Recipe.objects.filter(author=obj)
-
-        if recipes_limit is not None:
-            recipes_limit = int(recipes_limit)
-            recipes = recipes[:recipes_limit]
+        if hasattr(obj, "recipe_previews"):
+            recipes = obj.recipe_previews
+        else:
+            recipes = Recipe.objects.filter(author=obj).order_by("pk")
+            recipes_limit = self.context.get("recipes_limit")
+            if recipes_limit is not None:
+                recipes = recipes[:recipes_limit]
         return [
             {
                 "id": recipe.id,
@@ -107,10 +119,29 @@ class CustomUserSubscriptionSerializer(
                     if recipe.image
                     else None
                 ),
+                "image_variants": variant_urls(
+                    recipe.image,
+                    recipe.image_variants,
+                    request.build_absolute_uri,
+                ),
                 "cooking_time": recipe.cooking_time,
             }
             for recipe in recipes
         ]
 
-    def get_recipes_count(self, obj):
-        return Recipe.objects.filter(author=obj).count()
+
+class SignedTokenRefreshSerializer(TokenRefreshSerializer):
+    def validate(self, attrs):
+        refresh = self.token_class(attrs["refresh"])
+        if token_denylist.is_revoked(refresh):
+            raise InvalidToken("Token is revoked.")
+        # Токен доступа пользователь не проверяет, поэтому удалённые и
+        # заблокированные отсекаются здесь, при обновлении.
+        if not CustomUser.objects.filter(
+            pk=refresh[api_settings.USER_ID_CLAIM], is_active=True
+        ).exists():
+            raise InvalidToken("User not found or inactive.")
+        # Токен обновления ротируется: старый больше не принимается.
+        if not token_denylist.claim(refresh):
+            raise InvalidToken("Token is revoked.")
+        return super().validate(attrs)
@@ -0,0 +1,36 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from food.feed import add_authors, backfill_authors, remove_authors
+from food.images import image_pipeline
+from users.counters import change_counters
+from users.models import CustomUser, Subscription
+
+
+# Последствия подписки и отписки. Их вызывают и сигналы, и пакетное
+# представление, которое пишет без сигналов.
+def subscriptions_created(user_id, author_ids):
+    change_counters(CustomUser, author_ids, "subscribers_count", 1)
+    add_authors(user_id, author_ids)
+
+
+def subscriptions_deleted(user_id, author_ids):
+    change_counters(CustomUser, author_ids, "subscribers_count", -1)
+    remove_authors(user_id, author_ids)
+    backfill_authors(author_ids)
+
+
+@receiver(post_save, sender=Subscription)
+def handle_created_subscription(sender, instance, created, **kwargs):
+    if created:
+        subscriptions_created(instance.user_id, [instance.subscribed_to_id])
+
+
+@receiver(post_delete, sender=Subscription)
+def handle_deleted_subscription(sender, instance, **kwargs):
+    subscriptions_deleted(instance.user_id, [instance.subscribed_to_id])
+
+
+@receiver(post_save, sender=CustomUser)
+def build_avatar_variants(sender, instance, update_fields, **kwargs):
+    image_pipeline.schedule(instance, update_fields)
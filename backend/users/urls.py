@@ -1,6 +1,19 @@
-from django.urls import include, path
+from django.urls import include, path, re_path
+from rest_framework.routers import DefaultRouter
 
-from users.views import SubscriptionViewSet, UserAvatarUpdateView, user_me_view
+from users.views import (
+    BatchSubscriptionView,
+    CustomUserViewSet,
+    SignedTokenCreateView,
+    SignedTokenDestroyView,
+    SignedTokenRefreshView,
+    SubscriptionViewSet,
+    UserAvatarUpdateView,
+    user_me_view,
+)
+
+router = DefaultRouter()
+router.register("users", CustomUserViewSet)
 
 subscription_list = SubscriptionViewSet.as_view({"get": "list"})
 subscription_create = SubscriptionViewSet.as_view({"post": "create"})
@@ -12,14 +25,31 @@ urlpatterns = [
         subscription_list,
         name="user-subscriptions-list",
     ),
+    path(
+        "users/subscriptions/batch/",
+        BatchSubscriptionView.as_view(),
+        name="subscription-batch",
+    ),
     path(
         "users/<int:user_id>/subscribe/",
         SubscriptionViewSet.as_view({"delete": "destroy", "post": "create"}),
         name="user-unsubscribe",
     ),
     path("users/me/", user_me_view, name="user-me"),
-    path("", include("djoser.urls")),
-    path("auth/", include("djoser.urls.authtoken")),
+    path("", include(router.urls)),
+    re_path(
+        r"^auth/token/login/?$", SignedTokenCreateView.as_view(), name="login"
+    ),
+    re_path(
+        r"^auth/token/logout/?$",
+        SignedTokenDestroyView.as_view(),
+        name="logout",
+    ),
+    re_path(
+        r"^auth/token/refresh/?$",
+        SignedTokenRefreshView.as_view(),
+        name="token-refresh",
+    ),
     path(
         "users/me/avatar/",
         UserAvatarUpdateView.as_view(),
@@ -1,21 +1,41 @@
+from collections import defaultdict
+from collections.abc import Mapping
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.contrib.auth.signals import user_logged_in, user_logged_out
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef, Window
+from django.db.models.functions import RowNumber
+from djoser.views import TokenCreateView, TokenDestroyView, UserViewSet
 from rest_framework import generics, status, viewsets
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.views import APIView
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+from rest_framework_simplejwt.views import TokenRefreshView
 
+from food.batch import delete_rows, get_batch, lock_user, plan_batch
+from food.models import Recipe
+from food.uploads import TemporaryFileUploadMixin
+from users.authentication import token_denylist
 from users.models import Subscription
 from users.pagination import CustomPagination
 from users.serializers import (
     CustomUserSerializer,
     CustomUserSubscriptionSerializer,
+    SignedTokenRefreshSerializer,
     UserAvatarSerializer,
 )
+from users.signals import subscriptions_created, subscriptions_deleted
 
 CustomUser = get_user_model()
 
 
-class UserAvatarUpdateView(generics.UpdateAPIView):
+class UserAvatarUpdateView(TemporaryFileUploadMixin, generics.UpdateAPIView):
     queryset = CustomUser.objects.all()
     serializer_class = UserAvatarSerializer
     permission_classes = [IsAuthenticated]
@@ -48,6 +68,62 @@ class UserAvatarUpdateView(generics.UpdateAPIView):
         return Response({"avatar": None}, status=status.HTTP_204_NO_CONTENT)
 
 
+class CustomUserViewSet(UserViewSet):
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.request.user.is_authenticated:
+            # Подписка вычисляется в том же запросе, а не по запросу на
+            # каждого пользователя страницы.
+            queryset = queryset.annotate(
+                is_subscribed=Exists(
+                    Subscription.objects.filter(
+                        user=self.request.user, subscribed_to=OuterRef("pk")
+                    )
+                )
+            )
+        return queryset
+
+
+class SignedTokenCreateView(TokenCreateView):
+    # При SIGNED_TOKENS вместо ключа из базы выдаётся подписанный токен
+    # доступа в том же поле auth_token и токен обновления.
+    def _action(self, serializer):
+        if not settings.SIGNED_TOKENS:
+            return super()._action(serializer)
+        user = serializer.user
+        user_logged_in.send(
+            sender=user.__class__, request=self.request, user=user
+        )
+        refresh = RefreshToken.for_user(user)
+        return Response(
+            {"auth_token": str(refresh.access_token), "refresh": str(refresh)}
+        )
+
+
+class SignedTokenDestroyView(TokenDestroyView):
+    def post(self, request):
+        if not isinstance(request.auth, AccessToken):
+            return super().post(request)
+        tokens = [request.auth]
+        data = request.data if isinstance(request.data, Mapping) else {}
+        try:
+            refresh = RefreshToken(data.get("refresh", ""))
+        except TokenError:
+            pass
+        else:
+            if refresh[api_settings.USER_ID_CLAIM] == request.user.pk:
+                tokens.append(refresh)
+        token_denylist.revoke(*tokens)
+        user_logged_out.send(
+            sender=request.user.__class__, request=request, user=request.user
+        )
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class SignedTokenRefreshView(TokenRefreshView):
+    serializer_class = SignedTokenRefreshSerializer
+
+
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
 def user_me_view(request):
@@ -58,26 +134,65 @@ def user_me_view(request):
 class SubscriptionViewSet(viewsets.ViewSet):
     permission_classes = [IsAuthenticated]
     pagination_class = CustomPagination
+    cursor_ordering = ("pk",)
 
     def list(self, request):
-        recipes_limit = request.query_params.get("recipes_limit", None)
-        limit = request.query_params.get("limit", None)
-        subscriptions = Subscription.objects.filter(
-            user=request.user
-        ).values_list("subscribed_to", flat=True)
-        if limit:
-            subscriptions = subscriptions[: int(limit)]
+        recipes_limit = self.get_recipes_limit(request)
+        subscriptions = (
+            Subscription.objects.filter(user=request.user)
+            .select_related("subscribed_to")
+            .order_by("pk")
+        )
         paginator = self.pagination_class()
         paginated_subscriptions = paginator.paginate_queryset(
-            subscriptions, request
+            subscriptions, request, self
         )
+        authors = []
+        for subscription in paginated_subscriptions:
+            author = subscription.subscribed_to
+            author.is_subscribed = True
+            authors.append(author)
+        self.attach_recipe_previews(authors, recipes_limit)
         serializer = CustomUserSubscriptionSerializer(
-            CustomUser.objects.filter(id__in=paginated_subscriptions),
+            authors,
             many=True,
             context={"request": request, "recipes_limit": recipes_limit},
         )
         return paginator.get_paginated_response(serializer.data)
 
+    @staticmethod
+    def get_recipes_limit(request):
+        try:
+            recipes_limit = int(request.query_params["recipes_limit"])
+        except (KeyError, ValueError):
+            return None
+        return recipes_limit if recipes_limit >= 0 else None
+
+    @staticmethod
+    def attach_recipe_previews(authors, recipes_limit):
+        recipes = Recipe.objects.filter(author__in=authors).only(
+            "id",
+            "name",
+            "image",
+            "image_variants",
+            "cooking_time",
+            "author_id",
+        )
+        if recipes_limit is not None:
+            # Первые N рецептов каждого автора одним запросом.
+            recipes = recipes.annotate(
+                position=Window(
+                    RowNumber(),
+                    partition_by=F("author_id"),
+                    order_by=F("pk").asc(),
+                )
+            ).filter(position__lte=recipes_limit)
+        previews = defaultdict(list)
+        for recipe in recipes.order_by("author_id", "pk"):
+            previews[recipe.author_id].append(recipe)
+        for author in authors:
+            author.recipe_previews = previews[author.pk]
+
     def create(self, request, *args, **kwargs):
         user_id = self.kwargs.get("user_id")
         try:
@@ -102,7 +217,8 @@ class SubscriptionViewSet(viewsets.ViewSet):
                 {"detail": "Already subscribed."},
                 status=status.HTTP_400_BAD_REQUEST,
             )
-        recipes_limit = request.query_params.get("recipes_limit", None)
+        recipes_limit = self.get_recipes_limit(request)
+        user_to_subscribe.is_subscribed = True
 
         serializer = CustomUserSubscriptionSerializer(
             user_to_subscribe,
@@ -134,3 +250,33 @@ class SubscriptionViewSet(viewsets.ViewSet):
             {"detail": "Unsubscribed successfully."},
             status=status.HTTP_204_NO_CONTENT,
         )
+
+
+class BatchSubscriptionView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    @transaction.atomic
+    def post(self, request):
+        add, remove, ids = get_batch(request)
+        lock_user(request.user)
+        found = set(
+            CustomUser.objects.filter(pk__in=ids).values_list("pk", flat=True)
+        )
+        subscriptions = Subscription.objects.filter(
+            user=request.user, subscribed_to_id__in=ids
+        )
+        existing = set(
+            subscriptions.values_list("subscribed_to_id", flat=True)
+        )
+        results, added, removed = plan_batch(
+            add, remove, found, existing, forbidden={request.user.pk}
+        )
+        Subscription.objects.bulk_create(
+            Subscription(user=request.user, subscribed_to_id=author_id)
+            for author_id in added
+        )
+        if removed:
+            delete_rows(subscriptions.filter(subscribed_to_id__in=removed))
+        subscriptions_created(request.user.pk, added)
+        subscriptions_deleted(request.user.pk, removed)
+        return Response({"results": results})